@@ -1,14 +1,20 @@
 # agents/base_agent.py
+import time
 import asyncio
 import json
 import logging
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, AsyncIterator
 from abc import ABC, abstractmethod
 
-import openai
-from anthropic import Anthropic
+from config import Config
+from agents.llm_clients import LLMClientPool
+from agents.llm_cache import get_llm_cache, make_cache_key
+from agents.llm_scheduler import LLMScheduler, estimate_tokens
+from agents.json_stream import JSONArrayStreamParser
 from models import db, Agent, AgentTask, AgentMessage, SystemLog
+from task_leases import LeaseLost, heartbeat
+import vector_index
 
 class BaseAgent(ABC):
     """Base class for all AI agents"""
@@ -17,101 +23,361 @@ class BaseAgent(ABC):
         self.agent_id = agent_id
         self.config = config or {}
         self.logger = logging.getLogger(f"Agent-{agent_id}")
+        self.current_task_id = None
+        self.worker_id = None
+        self.task_priority = 'medium'
 
         # Load agent data from database
         self.agent_data = Agent.query.get(agent_id)
         if not self.agent_data:
             raise ValueError(f"Agent with ID {agent_id} not found")
 
-        # Initialize AI clients
-        self.anthropic_client = Anthropic(api_key=self.config.get('anthropic_api_key'))
-        self.openai_client = openai.Client(api_key=self.config.get('openai_api_key'))
+    @property
+    def anthropic_client(self):
+        """Shared async Anthropic client for the running event loop"""
+        return LLMClientPool.anthropic(self.config.get('anthropic_api_key'))
 
-    async def process_task(self, task_id: str) -> Dict[str, Any]:
-        """Main task processing method"""
+    @property
+    def openai_client(self):
+        """Shared async OpenAI client for the running event loop"""
+        return LLMClientPool.openai(self.config.get('openai_api_key'))
+
+    async def process_task(self, task_id: str, worker_id: str = None) -> Dict[str, Any]:
+        """Main task processing method
+
+        When ``worker_id`` is given the task has been leased by that worker and
+        the lease is kept alive with heartbeats until the task finishes. If the
+        lease is lost the work is cancelled, and the final status is only
+        written while we still own the lease, so a task handed to another
+        worker is never completed twice.
+        """
 
         # Get task from database
         task = AgentTask.query.filter_by(task_id=task_id).first()
         if not task:
             raise ValueError(f"Task {task_id} not found")
 
+        self.current_task_id = task_id
+        self.worker_id = worker_id
+        self.task_priority = task.priority or 'medium'
+
         # Update task status
         task.status = 'in_progress'
-        task.started_at = datetime.utcnow()
+        task.started_at = task.started_at or datetime.utcnow()
         db.session.commit()
 
+        execution = None
+        heartbeat_loop = None
+
         try:
             # Log task start
             self._log_event('INFO', 'task_started', f"Started processing task: {task.title}")
 
             # Execute specific agent logic
-            result = await self._execute_task(task)
+            execution = asyncio.ensure_future(self._execute_task(task))
+            if worker_id:
+                heartbeat_loop = asyncio.create_task(self._heartbeat_loop(execution))
+            try:
+                result = await execution
+            except asyncio.CancelledError:
+                if heartbeat_loop is not None and heartbeat_loop.done() and not heartbeat_loop.cancelled():
+                    raise LeaseLost(f"Lease on task {task_id} was lost")
+                raise
 
             # Update task completion
-            task.status = 'completed'
-            task.completed_at = datetime.utcnow()
-            task.output_data = result
-            task.progress_percentage = 100
-
+            completed_at = datetime.utcnow()
+            values = {
+                'status': 'completed',
+                'completed_at': completed_at,
+                'output_data': result,
+                'progress_percentage': 100,
+            }
             # Calculate actual duration
             if task.started_at:
-                duration = (datetime.utcnow() - task.started_at).total_seconds() / 60
-                task.actual_duration = int(duration)
+                values['actual_duration'] = int((completed_at - task.started_at).total_seconds() / 60)
 
-            db.session.commit()
+            if not self._finish_task(task, values):
+                raise LeaseLost(f"Lease on task {task_id} was lost before completion")
 
             self._log_event('INFO', 'task_completed', f"Completed task: {task.title}")
             return result
 
+        except LeaseLost as e:
+            # Another worker owns the task now; leave its row alone
+            db.session.rollback()
+            self._log_event('WARNING', 'lease_lost', f"Discarded result of task {task_id}: {str(e)}")
+            raise
+
         except Exception as e:
             # Handle task failure
-            task.status = 'failed'
-            task.error_message = str(e)
-            task.completed_at = datetime.utcnow()
+            db.session.rollback()
+            if self._finish_task(task, {'status': 'failed', 'error_message': str(e),
+                                        'completed_at': datetime.utcnow()}):
+                self._log_event('ERROR', 'task_failed', f"Task failed: {task.title}, Error: {str(e)}")
+            raise
+
+        finally:
+            if heartbeat_loop:
+                heartbeat_loop.cancel()
+            if execution is not None and not execution.done():
+                execution.cancel()
+
+    def _finish_task(self, task: AgentTask, values: Dict[str, Any]) -> bool:
+        """Write a final task state and drop the lease; False if the lease was lost
+
+        Leased tasks are updated with one UPDATE that only matches while this
+        worker is still the lease owner.
+        """
+
+        values = dict(values, lease_owner=None, lease_expires_at=None)
+        if not self.worker_id:
+            for column, value in values.items():
+                setattr(task, column, value)
             db.session.commit()
+            return True
 
-            self._log_event('ERROR', 'task_failed', f"Task failed: {task.title}, Error: {str(e)}")
-            raise
+        result = db.session.execute(
+            db.update(AgentTask)
+            .where(AgentTask.id == task.id, AgentTask.lease_owner == self.worker_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        db.session.expire(task)
+        return result.rowcount == 1
+
+    async def _heartbeat_loop(self, execution: asyncio.Future = None):
+        """Keep the task lease alive while the agent works, cancelling the work if it is lost
+
+        A renewal that errors (a dropped connection, a locked SQLite file) is
+        retried with backoff. If renewals keep failing until the lease could
+        run out, the work is cancelled as if the lease were lost, since
+        another worker may take the task over from then on.
+        """
+
+        interval = max(1, Config.TASK_LEASE_SECONDS // 3)
+        expires = time.monotonic() + Config.TASK_LEASE_SECONDS
+        delay, failures = interval, 0
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                held = await asyncio.to_thread(heartbeat, self.current_task_id, self.worker_id)
+            except Exception as e:
+                failures += 1
+                delay = min(interval, 0.5 * 2 ** (failures - 1))
+                if time.monotonic() + delay < expires:
+                    self.logger.warning(f"Renewing lease on task {self.current_task_id} failed "
+                                        f"(attempt {failures}), retrying: {str(e)}")
+                    continue
+                self.logger.error(f"Could not renew lease on task {self.current_task_id}: {str(e)}")
+                held = False
+
+            if not held:
+                self.logger.warning(f"Lost lease on task {self.current_task_id}")
+                if execution is not None:
+                    execution.cancel()
+                return
+            expires = time.monotonic() + Config.TASK_LEASE_SECONDS
+            delay, failures = interval, 0
+
+    async def report_progress(self, percentage: int):
+        """Record progress on the current task, renewing its lease if held
+
+        Progress is best effort; lease trouble is left to the heartbeat loop.
+        """
+
+        if not self.current_task_id:
+            return
+
+        if self.worker_id:
+            try:
+                await asyncio.to_thread(heartbeat, self.current_task_id, self.worker_id, progress=percentage)
+            except Exception as e:
+                self.logger.warning(f"Recording progress of task {self.current_task_id} failed: {str(e)}")
+        else:
+            AgentTask.query.filter_by(task_id=self.current_task_id).update(
+                {'progress_percentage': max(0, min(100, int(percentage)))}, synchronize_session=False)
+            db.session.commit()
 
     @abstractmethod
     async def _execute_task(self, task: AgentTask) -> Dict[str, Any]:
         """Agent-specific task execution logic"""
         pass
 
-    async def call_claude(self, prompt: str, system_prompt: str = None, max_tokens: int = 4000) -> str:
-        """Call Claude API with error handling and logging"""
+    async def call_claude(self, prompt: str, system_prompt: str = None, max_tokens: int = 4000,
+                          use_cache: bool = True) -> str:
+        """Call Claude API with error handling and logging
+
+        Identical requests are answered from the response cache unless
+        ``use_cache`` is False.
+        """
 
         try:
             system = system_prompt or self.agent_data.system_prompt
-
-            response = await self.anthropic_client.messages.create(
-                model=self.agent_data.model_name or "claude-sonnet-4",
-                max_tokens=max_tokens,
-                temperature=self.agent_data.temperature or 0.3,
-                system=system,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+            model = self.agent_data.model_name or "claude-sonnet-4"
+            temperature = self.agent_data.temperature or 0.3
+
+            cache = get_llm_cache() if use_cache else None
+            cache_key = make_cache_key('anthropic', model, system, prompt, temperature, max_tokens)
+            if cache:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+            client = self.anthropic_client
+            response = await LLMScheduler.for_current_loop().submit(
+                'anthropic',
+                lambda: client.messages.create(
+                    model=model,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    system=system,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                ),
+                tokens=estimate_tokens(system) + estimate_tokens(prompt) + max_tokens,
+                priority=self.task_priority
             )
 
-            return response.content[0].text
+            text = response.content[0].text
+            # Truncated completions are not worth replaying
+            if cache and response.stop_reason != 'max_tokens':
+                cache.set(cache_key, text)
+
+            return text
 
         except Exception as e:
             self._log_event('ERROR', 'api_call_failed', f"Claude API call failed: {str(e)}")
             raise
 
-    async def call_openai_reasoning(self, problem: str) -> str:
+    async def stream_claude(self, prompt: str, system_prompt: str = None, max_tokens: int = 4000,
+                            use_cache: bool = True) -> AsyncIterator[str]:
+        """Stream a Claude completion as text deltas
+
+        Holds one scheduler slot for the whole stream. A cached response is
+        replayed as a single delta.
+        """
+
+        system = system_prompt or self.agent_data.system_prompt
+        model = self.agent_data.model_name or "claude-sonnet-4"
+        temperature = self.agent_data.temperature or 0.3
+
+        cache = get_llm_cache() if use_cache else None
+        cache_key = make_cache_key('anthropic', model, system, prompt, temperature, max_tokens)
+        if cache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        try:
+            async with LLMScheduler.for_current_loop().slot(
+                    'anthropic',
+                    tokens=estimate_tokens(system) + estimate_tokens(prompt) + max_tokens,
+                    priority=self.task_priority):
+                async with self.anthropic_client.messages.stream(
+                    model=model,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    system=system,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                ) as stream:
+                    async for text in stream.text_stream:
+                        parts.append(text)
+                        yield text
+                    message = await stream.get_final_message()
+
+        except Exception as e:
+            self._log_event('ERROR', 'api_call_failed', f"Claude streaming call failed: {str(e)}")
+            raise
+
+        if message.stop_reason == 'max_tokens':
+            self._log_event('WARNING', 'response_truncated',
+                            f"Claude response hit max_tokens={max_tokens}; keeping elements parsed before the cut")
+        elif cache:
+            cache.set(cache_key, ''.join(parts))
+
+    async def stream_claude_json_array(self, prompt: str, system_prompt: str = None,
+                                       max_tokens: int = 4000, use_cache: bool = True) -> AsyncIterator[Any]:
+        """Stream a Claude completion that returns a JSON array, yielding each element as it closes"""
+
+        parser = JSONArrayStreamParser()
+        async for text in self.stream_claude(prompt, system_prompt, max_tokens, use_cache):
+            for element in parser.feed(text):
+                yield element
+
+        if parser.errors:
+            self._log_event('WARNING', 'json_parse_failed', f"Skipped {parser.errors} malformed array elements")
+
+    def relevant_passages(self, project_id: int, query: str, k: int = None,
+                          max_tokens: int = None) -> List[Dict[str, Any]]:
+        """Top-k document passages for a prompt, from the project's local search index
+
+        Each passage is cut to an excerpt around the query terms so that all
+        of them together stay within ``max_tokens``. Returns nothing when
+        search is unavailable, so prompts simply go without context.
+        """
+
+        if not vector_index.available():
+            return []
+        try:
+            passages = vector_index.relevant_passages(project_id, query, k)
+        except Exception as e:
+            self._log_event('WARNING', 'passage_search_failed', f"Passage search failed: {str(e)}")
+            return []
+
+        if max_tokens and passages:
+            # Same four-characters-per-token estimate the scheduler uses
+            width = max_tokens * 4 // len(passages)
+            for passage in passages:
+                passage['text'] = vector_index.snippet(passage['text'], query, width)
+        return passages
+
+    def refresh_search_index(self, project_id: int):
+        """Bring the project's search index up to date after new text or requirements"""
+
+        if not vector_index.available():
+            return
+        try:
+            vector_index.project_index(project_id)
+        except Exception as e:
+            self._log_event('WARNING', 'search_index_failed', f"Updating search index failed: {str(e)}")
+
+    async def call_openai_reasoning(self, problem: str, use_cache: bool = True) -> str:
         """Call OpenAI o1 for complex reasoning tasks"""
 
         try:
-            response = await self.openai_client.chat.completions.create(
-                model="o1-preview",
-                messages=[
-                    {"role": "user", "content": problem}
-                ]
+            model = "o1-preview"
+
+            cache = get_llm_cache() if use_cache else None
+            cache_key = make_cache_key('openai', model, None, problem, None, None)
+            if cache:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+            client = self.openai_client
+            response = await LLMScheduler.for_current_loop().submit(
+                'openai',
+                lambda: client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "user", "content": problem}
+                    ]
+                ),
+                tokens=estimate_tokens(problem),
+                priority=self.task_priority
             )
 
-            return response.choices[0].message.content
+            text = response.choices[0].message.content
+            if cache and response.choices[0].finish_reason != 'length':
+                cache.set(cache_key, text)
+
+            return text
 
         except Exception as e:
             self._log_event('ERROR', 'api_call_failed', f"OpenAI API call failed: {str(e)}")
@@ -0,0 +1,129 @@
+# agents/conflict_blocking.py
+import re
+import math
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Set, Tuple
+
+# Terms kept per requirement for blocking, rarest first
+KEY_TERMS = 8
+# Requirements sharing a term are only paired up while the term's block stays this small;
+# bigger blocks are split by requirement type and dropped if still too big
+MAX_BLOCK = 40
+
+WORD = re.compile(r'[a-z][a-z0-9\-]{2,}|\d+(?:\.\d+)?')
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'that', 'this', 'from', 'are', 'was', 'were', 'will', 'shall', 'must',
+    'should', 'can', 'could', 'may', 'might', 'have', 'has', 'had', 'been', 'being', 'not', 'all', 'any',
+    'each', 'such', 'other', 'into', 'onto', 'than', 'then', 'them', 'they', 'their', 'its', 'our', 'your',
+    'which', 'when', 'where', 'who', 'whom', 'what', 'able', 'also', 'only', 'per', 'via', 'use', 'used',
+    'using', 'provide', 'provided', 'support', 'supports', 'system', 'solution', 'requirement', 'required',
+    'ensure', 'allow', 'allows', 'within', 'least', 'more', 'less', 'including', 'include', 'includes',
+}
+
+SUFFIXES = ('ing', 'ed', 's')
+
+Pair = Tuple[str, str, float]
+
+
+def _terms(text: str) -> Set[str]:
+    terms = set()
+    for word in WORD.findall((text or '').lower()):
+        if word in STOPWORDS:
+            continue
+        # Crude suffix folding so "hosted", "hosting" and "hosts" block together
+        for suffix in SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 4 and not word.endswith('ss'):
+                word = word[:-len(suffix)]
+                break
+        terms.add(word)
+    return terms
+
+
+def candidate_pairs(requirements: List[Dict[str, Any]], threshold: float) -> List[Pair]:
+    """Pairs of requirements worth checking for conflicts, with their similarity
+
+    Requirements are blocked on their rarest shared terms, so only pairs
+    inside small blocks are ever compared. A pair is kept when the
+    IDF-weighted overlap of its term sets (shared weight over the smaller
+    set's weight) reaches ``threshold``; overlap rather than Jaccard, since
+    a short requirement contradicting a long one shares few of its terms.
+    Requirements need ``id``, ``title``, ``description`` and ``type``.
+    """
+
+    terms = {req['id']: _terms(f"{req.get('title', '')} {req.get('description', '')}") for req in requirements}
+    types = {req['id']: req.get('type') or 'other' for req in requirements}
+    frequency = Counter(term for req_terms in terms.values() for term in req_terms)
+    total = len(requirements)
+    idf = {term: math.log((1 + total) / count) for term, count in frequency.items()}
+
+    blocks: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+    for req_id, req_terms in terms.items():
+        shared = sorted((term for term in req_terms if frequency[term] > 1), key=lambda term: (-idf[term], term))
+        for term in shared[:KEY_TERMS]:
+            blocks[(term, '')].append(req_id)
+
+    for (term, _), members in list(blocks.items()):
+        if len(members) <= MAX_BLOCK:
+            continue
+        del blocks[(term, '')]
+        for req_id in members:
+            blocks[(term, types[req_id])].append(req_id)
+
+    weights = {req_id: sum(idf[term] for term in req_terms) for req_id, req_terms in terms.items()}
+
+    def similarity(first: str, second: str) -> float:
+        smaller = min(weights[first], weights[second])
+        if not smaller:
+            return 0.0
+        return sum(idf[term] for term in terms[first] & terms[second]) / smaller
+
+    pairs: Dict[Tuple[str, str], float] = {}
+    for members in blocks.values():
+        if len(members) > MAX_BLOCK:
+            continue
+        for position, first in enumerate(members):
+            for second in members[position + 1:]:
+                key = (first, second) if first < second else (second, first)
+                if key not in pairs:
+                    pairs[key] = similarity(first, second)
+
+    return sorted(((first, second, score) for (first, second), score in pairs.items() if score >= threshold),
+                  key=lambda pair: (-pair[2], pair[0], pair[1]))
+
+
+def conflict_groups(pairs: List[Pair], max_size: int) -> List[Dict[str, Any]]:
+    """Pack candidate pairs into groups of at most ``max_size`` requirements
+
+    Connected requirements stay in one group when they fit; larger clusters
+    are split, most similar pairs first. Every pair lands in exactly one group.
+    """
+
+    parent: Dict[str, str] = {}
+
+    def find(node: str) -> str:
+        while parent.setdefault(node, node) != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for first, second, _ in pairs:
+        parent[find(first)] = find(second)
+
+    clusters: Dict[str, List[Pair]] = defaultdict(list)
+    for pair in pairs:
+        clusters[find(pair[0])].append(pair)
+
+    groups = []
+    for cluster in clusters.values():
+        members: Set[str] = set()
+        current: List[Pair] = []
+        for pair in cluster:
+            needed = {pair[0], pair[1]} - members
+            if current and len(members) + len(needed) > max_size:
+                groups.append({'requirements': sorted(members), 'pairs': current})
+                members, current = set(), []
+            members |= {pair[0], pair[1]}
+            current.append(pair)
+        if current:
+            groups.append({'requirements': sorted(members), 'pairs': current})
+    return groups
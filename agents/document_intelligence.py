@@ -1,15 +1,20 @@
 # agents/document_intelligence.py
-import PyPDF2
-import docx
-import pytesseract
-from PIL import Image
 import json
 import hashlib
 import os
-from typing import Dict, Any, List
+import asyncio
+from typing import Dict, Any, AsyncIterator, List
 
 from agents.base_agent import BaseAgent
-from models import AgentTask, Document
+from agents.llm_scheduler import estimate_tokens
+from agents.text_chunker import SectionSplitter
+from extraction.pages import PAGE_SEPARATOR, UnsupportedDocumentError, aiter_in_thread, iter_document_pages
+from models import AgentTask, Document, DocumentChunk, db
+
+# How much of the document the structure analysis prompt sees
+STRUCTURE_SAMPLE_CHARS = 5000
+# Page and section rows written per INSERT while a document streams in
+CHUNK_INSERT_BATCH = 100
 
 class DocumentIntelligenceAgent(BaseAgent):
     """Specialized agent for document processing and analysis"""
@@ -36,15 +41,85 @@ class DocumentIntelligenceAgent(BaseAgent):
         if not document:
             raise ValueError(f"Document {document_id} not found")
 
-        # Extract text content
-        extracted_text = await self._extract_text_from_file(document.file_path, document.mime_type)
+        # Identical content may have finished analysis since this task was queued
+        twin = Document.find_analyzed_twin(document.file_hash, exclude_id=document.id)
+        if twin:
+            document.reuse_analysis_from(twin)
+            db.session.commit()
+            self.refresh_search_index(document.project_id)
+            self._log_event('INFO', 'analysis_reused', f"Reused analysis of document {twin.id} for {document.original_filename}")
+
+            return {
+                'document_id': document_id,
+                'duplicate_of': document.duplicate_of_id,
+                'metadata': document.extracted_metadata,
+                'word_count': len((document.extracted_text or '').split()),
+                'status': 'completed'
+            }
+
+        # Pages stream in from a worker thread; structure analysis starts as
+        # soon as the opening pages are in while the rest is still parsing
+        text_parts = []
+        page_stats = []
+        word_count = 0
+        structure_call = None
+        try:
+            async for page in self._iter_and_store_pages(document):
+                text_parts.append(page['text'])
+                page_stats.append(self._page_stats(page))
+                word_count += len(page['text'].split())
+                if structure_call is None and page['end'] >= STRUCTURE_SAMPLE_CHARS:
+                    structure_call = asyncio.create_task(
+                        self.call_claude(self._build_structure_prompt(document, text_parts)))
+
+            if structure_call is None:
+                structure_call = asyncio.create_task(
+                    self.call_claude(self._build_structure_prompt(document, text_parts)))
+            structure_analysis = await structure_call
+        except BaseException:
+            if structure_call is not None:
+                structure_call.cancel()
+            raise
+
+        extracted_text = PAGE_SEPARATOR.join(text_parts)
+        text_parts = None
+
+        # Update document in database
+        metadata = json.loads(structure_analysis)
+        if isinstance(metadata, dict):
+            metadata['extraction'] = self._extraction_stats(page_stats)
+        document.extracted_text = extracted_text
+        document.extracted_metadata = metadata
+        document.page_count = len(page_stats)
+        document.processing_status = 'completed'
+        db.session.commit()
+        self.refresh_search_index(document.project_id)
+
+        # The text itself stays on the document; task output only carries a summary
+        return {
+            'document_id': document_id,
+            'structure_analysis': structure_analysis,
+            'metadata': document.extracted_metadata,
+            'word_count': word_count,
+            'status': 'completed'
+        }
 
-        # Analyze document structure using Claude
-        structure_prompt = f"""
+    def _build_structure_prompt(self, document: Document, text_parts: List[str]) -> str:
+        """Structure analysis prompt over the opening of the document"""
+
+        sample = []
+        remaining = STRUCTURE_SAMPLE_CHARS
+        for text in text_parts:
+            if remaining <= 0:
+                break
+            sample.append(text[:remaining])
+            remaining -= len(text) + len(PAGE_SEPARATOR)
+
+        return f"""
         Analyze this document and extract its structure:
 
         Document Title: {document.original_filename}
-        Content: {extracted_text[:5000]}...
+        Content: {PAGE_SEPARATOR.join(sample)}...
 
         Please identify:
         1. Document type (RFP, technical specification, legal document, etc.)
@@ -56,79 +131,147 @@ class DocumentIntelligenceAgent(BaseAgent):
         Return the analysis as structured JSON.
         """
 
-        structure_analysis = await self.call_claude(structure_prompt)
+    async def _extract_text(self, document_id: int) -> Dict[str, Any]:
+        """Extract and store document text without any LLM analysis"""
 
-        # Update document in database
-        document.extracted_text = extracted_text
-        document.extracted_metadata = json.loads(structure_analysis)
-        document.processing_status = 'completed'
+        document = Document.query.get(document_id)
+        if not document:
+            raise ValueError(f"Document {document_id} not found")
+
+        text_parts = []
+        page_stats = []
+        word_count = 0
+        async for page in self._iter_and_store_pages(document):
+            text_parts.append(page['text'])
+            page_stats.append(self._page_stats(page))
+            word_count += len(page['text'].split())
+
+        document.extracted_text = PAGE_SEPARATOR.join(text_parts)
+        document.page_count = len(page_stats)
         db.session.commit()
+        self.refresh_search_index(document.project_id)
 
         return {
             'document_id': document_id,
-            'extracted_text': extracted_text,
-            'structure_analysis': structure_analysis,
-            'metadata': document.extracted_metadata,
-            'word_count': len(extracted_text.split()),
+            'extraction': self._extraction_stats(page_stats),
+            'word_count': word_count,
             'status': 'completed'
         }
 
-    async def _extract_text_from_file(self, file_path: str, mime_type: str) -> str:
-        """Extract text from various file formats"""
+    async def _iter_pages(self, file_path: str, mime_type: str, file_hash: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream pages with offsets as they are extracted
 
-        if mime_type == 'application/pdf':
-            return self._extract_from_pdf(file_path)
-        elif mime_type in ['application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document']:
-            return self._extract_from_word(file_path)
-        else:
-            # Try OCR for image files
-            return self._extract_with_ocr(file_path)
-
-    def _extract_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF"""
+        Parsing runs in a worker thread a few pages ahead of the consumer.
+        Output is cached by file hash and extractor version, so re-analysing
+        an unchanged file skips parsing and OCR entirely.
+        """
 
-        text = ""
+        yielded = 0
+        ocr_failures = []
+        text_layer_error = None
+        raw_chars = chars = boilerplate_lines = 0
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+            async for page in aiter_in_thread(iter_document_pages, file_path, mime_type, file_hash):
+                if page.get('ocr_failed'):
+                    ocr_failures.append(f"page {page['page']}: {page.get('ocr_error')}")
+                text_layer_error = text_layer_error or page.get('text_layer_error')
+                chars += len(page['text'])
+                raw_chars += page.get('raw_chars', len(page['text']))
+                boilerplate_lines += page.get('boilerplate_lines', 0)
+                yielded += 1
+                yield page
+        except UnsupportedDocumentError:
+            # Nothing to salvage; fail the task rather than analyse an empty page
+            raise
         except Exception as e:
-            self._log_event('ERROR', 'pdf_extraction_failed', f"Failed to extract PDF: {str(e)}")
-            # Fallback to OCR
-            text = self._extract_with_ocr(file_path)
+            self._log_event('ERROR', 'extraction_failed', f"Failed to extract {file_path}: {str(e)}")
+            if not yielded:
+                yield {'page': 1, 'text': '', 'seconds': None, 'start': 0, 'end': 0}
 
-        return text
+        if text_layer_error:
+            self._log_event('ERROR', 'pdf_extraction_failed', f"Failed to extract PDF: {text_layer_error}")
+        if ocr_failures:
+            self._log_event('ERROR', 'ocr_failed', f"OCR failed for {len(ocr_failures)} pages",
+                            {'pages': ocr_failures[:20]})
+        if raw_chars > chars:
+            saved = (raw_chars - chars) // 4
+            self._log_event('INFO', 'boilerplate_stripped',
+                            f"Normalization removed {boilerplate_lines} header/footer lines, about {saved} tokens",
+                            {'file': os.path.basename(file_path), 'raw_chars': raw_chars, 'chars': chars,
+                             'boilerplate_lines': boilerplate_lines, 'saved_tokens': saved})
 
-    def _extract_from_word(self, file_path: str) -> str:
-        """Extract text from Word documents"""
+    async def _iter_and_store_pages(self, document: Document) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a document's pages, saving page and section chunks as they pass
 
-        try:
-            doc = docx.Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
+        Rows are inserted in batches inside the caller's transaction, which
+        also replaces any chunks from an earlier run.
+        """
 
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        text += cell.text + "\t"
-                    text += "\n"
+        DocumentChunk.query.filter_by(document_id=document.id).delete(synchronize_session=False)
 
-            return text
+        splitter = SectionSplitter()
+        rows = []
+        sequences = {'page': 0, 'section': 0}
 
-        except Exception as e:
-            self._log_event('ERROR', 'word_extraction_failed', f"Failed to extract Word: {str(e)}")
-            return ""
+        def add_row(chunk_type: str, **values):
+            rows.append(dict(values, document_id=document.id, chunk_type=chunk_type, sequence=sequences[chunk_type]))
+            sequences[chunk_type] += 1
 
-    def _extract_with_ocr(self, file_path: str) -> str:
-        """Extract text using OCR for scanned documents"""
+        def add_sections(sections: List[Dict[str, Any]]):
+            for section in sections:
+                add_row('section', page_number=section['page'], end_page_number=section['end_page'],
+                        start_offset=section['start'], end_offset=section['end'],
+                        heading=(section['heading'] or '')[:500] or None, heading_level=section['level'],
+                        token_count=section['tokens'], text=section['text'])
 
-        try:
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
-            return text
-        except Exception as e:
-            self._log_event('ERROR', 'ocr_failed', f"OCR extraction failed: {str(e)}")
-            return ""
+        async for page in self._iter_pages(document.file_path, document.mime_type, document.file_hash):
+            # Label the page with the section it opens in, else its first heading
+            in_effect = splitter.current
+            finished = splitter.add(page)
+            add_sections(finished)
+            heading = in_effect or next((section for section in finished if section['heading']), splitter.current)
+            add_row('page', page_number=page['page'], end_page_number=page['page'],
+                    start_offset=page['start'], end_offset=page['end'],
+                    heading=((heading or {}).get('heading') or '')[:500] or None,
+                    heading_level=(heading or {}).get('level'),
+                    token_count=estimate_tokens(page['text']), text=page['text'])
+
+            if len(rows) >= CHUNK_INSERT_BATCH:
+                db.session.execute(db.insert(DocumentChunk), rows)
+                rows = []
+            yield page
+
+        add_sections(splitter.finish())
+        if rows:
+            db.session.execute(db.insert(DocumentChunk), rows)
+
+    def _page_stats(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        """Page metadata without its text"""
+
+        stats = {key: value for key, value in page.items() if key != 'text'}
+        stats['chars'] = len(page['text'])
+        return stats
+
+    def _extraction_stats(self, pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Per-page timing summary stored with the document metadata"""
+
+        timings = [page['seconds'] for page in pages if page.get('seconds') is not None]
+        slowest = sorted(pages, key=lambda page: page.get('seconds') or 0, reverse=True)[:5]
+        chars = sum(page.get('chars', 0) for page in pages)
+        raw_chars = sum(page.get('raw_chars', page.get('chars', 0)) for page in pages)
+
+        return {
+            'page_count': len(pages),
+            'ocr_pages': [page['page'] for page in pages if page.get('source') == 'ocr'],
+            'cached': bool(pages) and all(page.get('cached') for page in pages),
+            'total_seconds': round(sum(timings), 3),
+            'page_seconds': timings,
+            'slowest_pages': [page['page'] for page in slowest if page.get('seconds')],
+            # Same four-characters-per-token estimate the LLM scheduler uses
+            'normalization': {
+                'raw_tokens': raw_chars // 4,
+                'tokens': chars // 4,
+                'saved_tokens': (raw_chars - chars) // 4,
+                'boilerplate_lines': sum(page.get('boilerplate_lines', 0) for page in pages)
+            }
+        }
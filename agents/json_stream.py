@@ -0,0 +1,70 @@
+# agents/json_stream.py
+import json
+from typing import Any, Iterator, List
+
+
+class JSONArrayStreamParser:
+    """Incrementally parse a streamed JSON array, yielding each element as it closes
+
+    Text before the opening ``[`` (prose, markdown fences) is skipped. If the
+    stream is cut off, every element completed before the cut has already
+    been yielded; the partial element is discarded.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._element: List[str] = []
+        self.errors = 0
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def feed(self, text: str) -> Iterator[Any]:
+        """Consume the next piece of streamed text"""
+
+        for char in text:
+            if self._finished:
+                return
+
+            if not self._started:
+                if char == '[':
+                    self._started = True
+                continue
+
+            if self._depth == 0:
+                # Between elements of the top-level array
+                if char == ']':
+                    self._finished = True
+                elif char in '{[':
+                    self._depth = 1
+                    self._element = [char]
+                # Separators and stray scalars between elements are ignored
+                continue
+
+            self._element.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    raw = ''.join(self._element)
+                    self._element = []
+                    try:
+                        yield json.loads(raw)
+                    except json.JSONDecodeError:
+                        self.errors += 1
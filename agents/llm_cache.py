@@ -0,0 +1,181 @@
+# agents/llm_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from config import Config
+
+
+def make_cache_key(provider: str, model: str, system_prompt: Optional[str], prompt: str,
+                   temperature: Optional[float], max_tokens: Optional[int]) -> str:
+    """Stable key over everything that changes the completion"""
+
+    payload = json.dumps({
+        'provider': provider,
+        'model': model,
+        'system': system_prompt or '',
+        'prompt': prompt,
+        'temperature': temperature,
+        'max_tokens': max_tokens
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """Two-tier cache of LLM completions: in-memory LRU over a SQLite file
+
+    The SQLite tier is shared by every worker process on the host. Entries
+    expire after ``ttl`` seconds; once the file holds more than ``max_bytes``
+    of responses the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str, memory_entries: int = 256, ttl: int = 7 * 24 * 3600,
+                 max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats_counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed ON llm_cache (accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            self.stats_counters[counter] += amount
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.stats_counters['memory_hits'] += 1
+                    return response
+                del self._memory[key]
+
+        with self._connection() as conn:
+            row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+
+        if row is None:
+            self._count('misses')
+            return None
+
+        self._remember(key, row[0], row[1])
+        self._count('disk_hits')
+        return row[0]
+
+    def set(self, key: str, response: str):
+        now = time.time()
+        size = len(response.encode('utf-8'))
+
+        self._remember(key, response, now)
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now)
+            )
+        self._count('stores')
+        self._evict()
+
+    def _remember(self, key: str, response: str, created_at: float):
+        with self._lock:
+            self._memory[key] = (response, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones over the size budget"""
+
+        with self._connection() as conn:
+            expired = conn.execute("DELETE FROM llm_cache WHERE created_at < ?",
+                                   (time.time() - self.ttl,)).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+            evicted = 0
+            if total > self.max_bytes:
+                for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    total -= size
+                    evicted += 1
+
+        if expired or evicted:
+            self._count('evictions', expired + evicted)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        with self._connection() as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.stats_counters)
+            counters['memory_entries'] = len(self._memory)
+        with self._connection() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        counters['disk_entries'] = entries
+        counters['disk_bytes'] = size
+        lookups = counters['memory_hits'] + counters['disk_hits'] + counters['misses']
+        counters['hit_rate'] = round((counters['memory_hits'] + counters['disk_hits']) / lookups, 3) if lookups else 0.0
+        return counters
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Process-wide cache instance, or None when caching is disabled"""
+
+    global _cache
+    if not Config.LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(
+                Config.LLM_CACHE_PATH,
+                memory_entries=Config.LLM_CACHE_MEMORY_ENTRIES,
+                ttl=Config.LLM_CACHE_TTL,
+                max_bytes=Config.LLM_CACHE_MAX_BYTES
+            )
+        return _cache
@@ -0,0 +1,72 @@
+# agents/llm_clients.py
+import asyncio
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+import httpx
+from anthropic import AsyncAnthropic
+from openai import AsyncOpenAI
+
+from config import Config
+
+
+class LLMClientPool:
+    """Process-wide async LLM clients shared by every agent
+
+    httpx connection pools are bound to the event loop that created them, so
+    clients are kept per running loop. Worker threads keep one loop alive for
+    their lifetime, which means every task on that thread reuses the same
+    keep-alive connections instead of paying a TLS handshake per task.
+    """
+
+    _clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, Optional[str]], object]]" = \
+        weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _http_client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=Config.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=Config.LLM_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(Config.LLM_TIMEOUT, connect=10.0)
+        )
+
+    @classmethod
+    def _get(cls, provider: str, api_key: Optional[str], factory):
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            loop_clients = cls._clients.setdefault(loop, {})
+            key = (provider, api_key)
+            if key not in loop_clients:
+                loop_clients[key] = factory()
+            return loop_clients[key]
+
+    @classmethod
+    def anthropic(cls, api_key: Optional[str] = None) -> AsyncAnthropic:
+        return cls._get('anthropic', api_key, lambda: AsyncAnthropic(
+            api_key=api_key or Config.ANTHROPIC_API_KEY,
+            http_client=cls._http_client(),
+            max_retries=Config.LLM_MAX_RETRIES
+        ))
+
+    @classmethod
+    def openai(cls, api_key: Optional[str] = None) -> AsyncOpenAI:
+        return cls._get('openai', api_key, lambda: AsyncOpenAI(
+            api_key=api_key or Config.OPENAI_API_KEY,
+            http_client=cls._http_client(),
+            max_retries=Config.LLM_MAX_RETRIES
+        ))
+
+    @classmethod
+    async def aclose(cls):
+        """Close the clients bound to the current loop"""
+
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            loop_clients = cls._clients.pop(loop, {})
+        for client in loop_clients.values():
+            await client.close()
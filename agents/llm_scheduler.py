@@ -0,0 +1,189 @@
+# agents/llm_scheduler.py
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import redis
+
+from config import Config
+
+PRIORITY_LEVELS = {'high': 0, 'medium': 1, 'low': 2}
+
+# Atomic token bucket shared by all worker processes. Returns 0 when the
+# tokens were granted, otherwise the number of milliseconds to wait.
+REDIS_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = math.ceil((requested - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return wait
+"""
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Rough token count (about four characters per token for English prose)"""
+    return len(text or '') // 4 + 1
+
+
+class TokenBucket:
+    """Thread-safe in-process token bucket refilled continuously per minute"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, amount: float) -> float:
+        """Take ``amount`` tokens, or return the seconds to wait before retrying"""
+
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+
+class RedisTokenBucket:
+    """Token bucket whose state lives in Redis so every worker shares one budget"""
+
+    def __init__(self, client: "redis.Redis", key: str, per_minute: int):
+        self.client = client
+        self.key = key
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._script = client.register_script(REDIS_BUCKET_SCRIPT)
+
+    def try_acquire(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        wait_ms = self._script(keys=[self.key], args=[self.capacity, self.rate, amount, time.time()])
+        return int(wait_ms) / 1000.0
+
+
+class PrioritySemaphore:
+    """asyncio semaphore that wakes waiters in priority order, then FIFO"""
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters = []
+        self._counter = itertools.count()
+
+    async def acquire(self, priority: int = 1):
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # We were handed the slot just as we got cancelled; pass it on
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+
+def _make_buckets() -> Dict[str, Dict[str, Any]]:
+    limits = {
+        'anthropic': (Config.ANTHROPIC_REQUESTS_PER_MINUTE, Config.ANTHROPIC_TOKENS_PER_MINUTE),
+        'openai': (Config.OPENAI_REQUESTS_PER_MINUTE, Config.OPENAI_TOKENS_PER_MINUTE),
+    }
+
+    client = redis.Redis.from_url(Config.REDIS_URL) if Config.REDIS_URL else None
+
+    buckets = {}
+    for provider, (rpm, tpm) in limits.items():
+        if client is not None:
+            buckets[provider] = {
+                'requests': RedisTokenBucket(client, f'llm_rate:{provider}:requests', rpm),
+                'tokens': RedisTokenBucket(client, f'llm_rate:{provider}:tokens', tpm),
+            }
+        else:
+            buckets[provider] = {'requests': TokenBucket(rpm), 'tokens': TokenBucket(tpm)}
+    return buckets
+
+
+class LLMScheduler:
+    """Bounded-concurrency, rate-limited dispatcher for LLM calls
+
+    Concurrency is bounded per event loop; the request and token budgets are
+    shared process-wide, or across all workers when Redis is configured.
+    Calls from higher-priority tasks get free slots first.
+    """
+
+    _buckets: Optional[Dict[str, Dict[str, Any]]] = None
+    _buckets_lock = threading.Lock()
+    _instances: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LLMScheduler]" = weakref.WeakKeyDictionary()
+
+    def __init__(self, max_concurrency: int):
+        self.semaphores = {provider: PrioritySemaphore(max_concurrency)
+                           for provider in ('anthropic', 'openai')}
+
+    @classmethod
+    def for_current_loop(cls) -> 'LLMScheduler':
+        loop = asyncio.get_running_loop()
+        with cls._buckets_lock:
+            if cls._buckets is None:
+                cls._buckets = _make_buckets()
+            if loop not in cls._instances:
+                cls._instances[loop] = cls(Config.LLM_MAX_CONCURRENCY)
+            return cls._instances[loop]
+
+    async def _wait_for_budget(self, provider: str, tokens: int):
+        buckets = self._buckets[provider]
+        for name, amount in (('requests', 1), ('tokens', tokens)):
+            while True:
+                wait = buckets[name].try_acquire(amount)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(min(wait, 5.0))
+
+    @asynccontextmanager
+    async def slot(self, provider: str, tokens: int = 0, priority: str = 'medium'):
+        """Hold a concurrency slot with rate budget for the duration of a call or stream"""
+
+        semaphore = self.semaphores[provider]
+        await semaphore.acquire(PRIORITY_LEVELS.get(priority, 1))
+        try:
+            await self._wait_for_budget(provider, tokens)
+            yield
+        finally:
+            semaphore.release()
+
+    async def submit(self, provider: str, call: Callable[[], Awaitable[Any]], tokens: int = 0,
+                     priority: str = 'medium') -> Any:
+        """Run ``call`` once a concurrency slot and rate budget are available"""
+
+        async with self.slot(provider, tokens, priority):
+            return await call()
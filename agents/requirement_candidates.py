@@ -0,0 +1,183 @@
+# agents/requirement_candidates.py
+import re
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+from agents.llm_scheduler import estimate_tokens
+from agents.text_chunker import HEADING_PATTERN, SENTENCE_END
+
+# Normative wording that marks a requirement in tender documents
+MODAL_PATTERN = re.compile(
+    r'\b(?:shall|must|is\s+required\s+to|are\s+required\s+to|will\s+be\s+required\s+to|'
+    r'required\s+to|mandatory|should|is\s+to\s+be|are\s+to\s+be|needs?\s+to|has\s+to|have\s+to|'
+    r'(?:is|are)\s+expected\s+to|at\s+(?:least|minimum)|no\s+(?:more|less)\s+than|not\s+exceed)\b',
+    re.IGNORECASE
+)
+# "3.2.1 ...", "a) ...", "(iv) ...", "- ..." and other list or clause openers
+CLAUSE_START = re.compile(r'^\s*(?:\d+(?:\.\d+)+\.?|\d+[.)]|[a-z][.)]|\([a-z0-9ivx]+\)|[-*•▪●])\s+', re.IGNORECASE)
+# Table of contents entries end in dot leaders and a page number
+TOC_LINE = re.compile(r'(?:\.{4,}|…{2,}|\s{4,})\s*\d+\s*$')
+# Sections that never contain requirements, matched against the whole heading
+SKIPPED_SECTIONS = re.compile(
+    r'^(?:[\d.]+\s*|[A-Z]\.\s*|(?:section|chapter|annex|appendix|part)\s+[\w.]+\s*[:\-–]?\s*)?'
+    r'(?:table\s+of\s+contents|contents|index|glossary(?:\s+of\s+terms)?|abbreviations(?:\s+and\s+acronyms)?|'
+    r'acronyms|definitions(?:\s+and\s+\w+)?|revision\s+history|document\s+(?:history|control)|change\s+log|'
+    r'acknowledg(?:e)?ments?|disclaimer)\s*$',
+    re.IGNORECASE
+)
+
+# Unselected text kept before a matching clause, e.g. "The Contractor shall:"
+CONTEXT_CHARS = 400
+# Longer clauses (often whole PDF pages without blank lines) are cut down to
+# their normative sentences and one sentence either side
+MAX_CLAUSE_CHARS = 1500
+
+
+def _clauses(pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Group page lines into clauses at blank lines, headings and clause openers"""
+
+    clause = None
+    for page in pages:
+        position = page['start']
+        for line in page['text'].splitlines(keepends=True):
+            stripped = line.strip()
+            is_heading = bool(stripped) and len(stripped) < 120 and bool(HEADING_PATTERN.match(stripped)) \
+                and not MODAL_PATTERN.search(stripped)
+
+            if clause and (not stripped or is_heading or CLAUSE_START.match(line)):
+                yield clause
+                clause = None
+
+            if is_heading:
+                yield {'heading': stripped, 'start': position, 'end': position + len(line), 'page': page['page']}
+            elif stripped:
+                if clause is None:
+                    clause = {'lines': [], 'start': position, 'page': page['page']}
+                clause['lines'].append(stripped)
+                clause['end'] = position + len(line.rstrip())
+
+            position += len(line)
+        # Offsets assume pages joined with one newline
+        position += 1
+
+    if clause:
+        yield clause
+
+
+def _focus(text: str) -> str:
+    sentences = SENTENCE_END.split(text)
+    keep = set()
+    for number, sentence in enumerate(sentences):
+        if MODAL_PATTERN.search(sentence):
+            keep.update((number - 1, number, number + 1))
+
+    parts = []
+    previous = None
+    for number in sorted(n for n in keep if 0 <= n < len(sentences)):
+        if previous is not None and number != previous + 1:
+            parts.append('[...]')
+        parts.append(sentences[number])
+        previous = number
+    return ' '.join(parts)
+
+
+def select_candidates(pages: Iterable[Dict[str, Any]], context_chars: int = CONTEXT_CHARS) -> Iterator[Dict[str, Any]]:
+    """Yield passages likely to state requirements, with their page and section
+
+    A clause is selected when it uses normative wording outside skipped
+    sections (contents, glossary, revision history...). Table-of-contents
+    lines never match. The clause just before a selection is kept as context
+    when it is short, and list items following a selected lead-in such as
+    "The Contractor shall:" are selected with it.
+    """
+
+    heading = None
+    skipping = False
+    previous = None
+    last_end = -1
+    lead_in = False
+
+    for clause in _clauses(pages):
+        if 'heading' in clause:
+            heading = clause['heading']
+            skipping = bool(SKIPPED_SECTIONS.search(heading))
+            previous = None
+            lead_in = False
+            continue
+
+        text = ' '.join(clause['lines'])
+        listed = lead_in and bool(CLAUSE_START.match(clause['lines'][0]))
+        if skipping or TOC_LINE.search(text) or not (listed or MODAL_PATTERN.search(text)):
+            previous = clause
+            lead_in = False
+            continue
+
+        passage_lines = clause['lines']
+        start, page = clause['start'], clause['page']
+        if previous is not None and previous['start'] > last_end \
+                and sum(len(line) for line in previous['lines']) <= context_chars:
+            passage_lines = previous['lines'] + passage_lines
+            start, page = previous['start'], previous['page']
+
+        passage = "\n".join(passage_lines)
+        yield {
+            'heading': heading,
+            'page': page,
+            'end_page': clause['page'],
+            'start': start,
+            'end': clause['end'],
+            'text': _focus(passage) if len(passage) > MAX_CLAUSE_CHARS else passage
+        }
+        last_end = clause['end']
+        previous = None
+        lead_in = listed or text.endswith(':')
+
+
+def _passage_label(passage: Dict[str, Any]) -> str:
+    pages = f"Page {passage['page']}" if passage['page'] == passage['end_page'] \
+        else f"Pages {passage['page']}-{passage['end_page']}"
+    return f"[{pages}{' | ' + passage['heading'] if passage['heading'] else ''}]"
+
+
+def pack_candidates(passages: Iterable[Dict[str, Any]], max_tokens: int) -> Iterator[Dict[str, Any]]:
+    """Pack selected passages into prompt-sized chunks, each labelled with its page
+
+    Chunks carry ``start``/``end`` offsets spanning their passages and are
+    flagged ``excerpts`` so prompts can say the text is a selection.
+    """
+
+    current: List[str] = []
+    tokens = 0
+    start = end = None
+    index = 0
+    pending: Optional[Dict[str, Any]] = None
+
+    def make_chunk() -> Dict[str, Any]:
+        text = "\n\n".join(current)
+        return {'index': index, 'text': text, 'start': start, 'end': end,
+                'tokens': estimate_tokens(text), 'excerpts': True, 'last': False}
+
+    for passage in passages:
+        block = f"{_passage_label(passage)}\n{passage['text']}"
+        block_tokens = estimate_tokens(block)
+
+        if current and tokens + block_tokens > max_tokens:
+            if pending is not None:
+                yield pending
+                index += 1
+            pending = make_chunk()
+            current, tokens, start = [], 0, None
+
+        if start is None:
+            start = passage['start']
+        current.append(block)
+        tokens += block_tokens
+        end = passage['end']
+
+    if current:
+        if pending is not None:
+            yield pending
+            index += 1
+        pending = make_chunk()
+    if pending is not None:
+        pending['last'] = True
+        yield pending
@@ -0,0 +1,132 @@
+# agents/requirement_dedup.py
+import re
+import zlib
+import random
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # signatures are identical, just slower to compute
+    np = None
+
+# 16 bands of 4 rows: pairs at Jaccard 0.7 share a band with probability > 0.98,
+# pairs below 0.3 rarely do, so few candidates need checking
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+DEFAULT_THRESHOLD = 0.7
+
+# (a * h + b) mod p over 32-bit shingle hashes; a < 2**31 keeps products inside 64 bits
+PRIME = 4294967311
+_random = random.Random(20240917)
+_A = [_random.randrange(1, 1 << 31) for _ in range(NUM_PERM)]
+_B = [_random.randrange(0, PRIME) for _ in range(NUM_PERM)]
+if np is not None:
+    _A_ARRAY = np.array(_A, dtype=np.uint64)
+    _B_ARRAY = np.array(_B, dtype=np.uint64)
+
+WORD = re.compile(r'[a-z0-9]+')
+
+Signature = Tuple[int, ...]
+
+
+def shingles(text: str) -> List[int]:
+    """Hashes of overlapping word triples in lowercased text"""
+
+    words = WORD.findall((text or '').lower())
+    if len(words) < SHINGLE_WORDS:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = [' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return list({zlib.crc32(gram.encode('utf-8')) for gram in grams})
+
+
+def minhash(text: str) -> Optional[Signature]:
+    """MinHash signature of a text, or None when it has no words"""
+
+    hashes = shingles(text)
+    if not hashes:
+        return None
+
+    if np is not None:
+        values = np.array(hashes, dtype=np.uint64)
+        permuted = (np.outer(values, _A_ARRAY) + _B_ARRAY) % np.uint64(PRIME)
+        return tuple(permuted.min(axis=0).tolist())
+
+    return tuple(min((a * h + b) % PRIME for h in hashes) for a, b in zip(_A, _B))
+
+
+def similarity(first: Sequence[int], second: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(first, second)) / NUM_PERM
+
+
+def requirement_text(title: Optional[str], description: Optional[str]) -> str:
+    return f"{title or ''} {description or ''}"
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index for finding near-duplicate requirements
+
+    Each text is hashed into one bucket per band; only texts sharing a
+    bucket are compared, so adding and matching stay close to linear in the
+    number of requirements.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.signatures: Dict[Hashable, Signature] = {}
+        self.buckets: Dict[Tuple[int, Signature], List[Hashable]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def add(self, key: Hashable, signature: Optional[Signature]):
+        if signature is None:
+            return
+        self.signatures[key] = signature
+        for band in range(BANDS):
+            self.buckets[(band, signature[band * ROWS:(band + 1) * ROWS])].append(key)
+
+    def match(self, signature: Optional[Signature]) -> Optional[Tuple[Hashable, float]]:
+        """Closest indexed key at or above the threshold, with its similarity"""
+
+        if signature is None:
+            return None
+
+        candidates = set()
+        for band in range(BANDS):
+            candidates.update(self.buckets.get((band, signature[band * ROWS:(band + 1) * ROWS]), ()))
+
+        best = None
+        for key in candidates:
+            score = similarity(signature, self.signatures[key])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
+
+    def add_or_match(self, key: Hashable, text: str) -> Optional[Tuple[Hashable, float]]:
+        """Match ``text`` against the index, adding it only when it is new
+
+        Duplicates are not indexed, so every later match points at the first
+        copy seen.
+        """
+
+        signature = minhash(text)
+        found = self.match(signature)
+        if found is None:
+            self.add(key, signature)
+        return found
+
+
+def find_duplicates(items: Iterable[Tuple[Hashable, str]],
+                    threshold: float = DEFAULT_THRESHOLD) -> Iterator[Tuple[Hashable, Hashable, float]]:
+    """Yield (key, original key, similarity) for each item that repeats an earlier one"""
+
+    index = NearDuplicateIndex(threshold)
+    for key, text in items:
+        found = index.add_or_match(key, text)
+        if found is not None:
+            yield key, found[0], found[1]
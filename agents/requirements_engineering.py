@@ -1,9 +1,23 @@
 # agents/requirements_engineering.py
 import re
 import json
-from typing import Dict, Any, List, Tuple
+import asyncio
+import itertools
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from agents.base_agent import BaseAgent
-from models import AgentTask, Document, Requirement, db
+from agents.conflict_blocking import candidate_pairs, conflict_groups
+from agents.llm_scheduler import estimate_tokens
+from agents.requirement_candidates import pack_candidates, select_candidates
+from agents.requirement_dedup import NearDuplicateIndex, minhash, requirement_text
+from agents.text_chunker import chunk_pages, RequirementMerger
+from config import Config
+from dependency_graph import dependency_ids, project_graph
+from models import AgentTask, Document, DocumentChunk, Requirement, db
+from requirement_store import (RequirementNumbers, RequirementWriter, STREAM_BATCH, STREAM_WINDOW_SECONDS,
+                               update_requirements)
+
+# Stored pages fetched per query when re-chunking a document
+PAGE_FETCH_BATCH = 50
 
 class RequirementsEngineeringAgent(BaseAgent):
     """Specialized agent for requirement extraction and analysis"""
@@ -27,96 +41,321 @@ class RequirementsEngineeringAgent(BaseAgent):
         """Extract requirements from project documents"""
 
         # Get documents to analyze
+        # The text itself stays deferred; chunks are read from stored pages
+        query = Document.query.filter(Document.extracted_text.isnot(None))
         if document_ids:
-            documents = Document.query.filter(Document.id.in_(document_ids)).all()
+            documents = query.filter(Document.id.in_(document_ids)).all()
         else:
-            documents = Document.query.filter_by(project_id=project_id).all()
-
+            documents = query.filter_by(project_id=project_id).all()
+
+        # Reduce incrementally: each requirement is merged across chunk seams
+        # and numbered as soon as its JSON object closes in the stream, then
+        # saved in small batches within about a second. Numbers come from the
+        # project's counter row, shared with any other extraction of the project
+        numbers = RequirementNumbers(project_id, floor=self._last_requirement_number(project_id))
+        mergers = {document.id: RequirementMerger(numbers) for document in documents}
+        writer = RequirementWriter(batch_size=STREAM_BATCH, max_delay=STREAM_WINDOW_SECONDS)
         extracted_requirements = []
+        duplicates = 0
+        # The same clause often recurs in the main RFP, annexes and addenda;
+        # copies are saved for provenance but linked to the first one seen
+        dedup = self._project_duplicate_index(project_id, writer)
+        completed_chunks = 0
+        chunked_documents = 0
+        chunks_seen = 0
+        prompt_tokens = []
+
+        async def extract_chunk(document: Document, chunk: Dict[str, Any]):
+            nonlocal completed_chunks, duplicates
+            prompt = self._build_extraction_prompt(document, chunk)
 
-        for document in documents:
-            if not document.extracted_text:
-                continue
+            try:
+                async for req_data in self.stream_claude_json_array(prompt, max_tokens=8000):
+                    if not isinstance(req_data, dict) or not req_data.get('title') or not req_data.get('description'):
+                        continue
+
+                    status, merged = mergers[document.id].add(req_data)
+                    if status == 'new':
+                        row = self._build_requirement(project_id, document, merged,
+                                                      self._source_chunk(document, chunk, merged))
+                        signature = minhash(requirement_text(row['title'], row['description']))
+                        original = dedup.match(signature)
+                        if original:
+                            row['duplicate_of_id'] = writer.id_of(original[0])
+                            row['duplicate_score'] = round(original[1], 3)
+                            self._merge_duplicate(writer, original[0], merged)
+                            duplicates += 1
+                        else:
+                            dedup.add(row['requirement_id'], signature)
+                            extracted_requirements.append(merged)
+                        writer.add(row)
+                    elif status == 'replaced':
+                        writer.update(merged['requirement_id'], acceptance_criteria=merged.get('acceptance_criteria', []))
+
+                writer.flush()
+
+            except Exception as e:
+                # Requirements saved before the failure are kept
+                db.session.rollback()
+                self._log_event('ERROR', 'extraction_failed',
+                                f"Requirement extraction failed for {document.original_filename} "
+                                f"chunk {chunk['index'] + 1}: {str(e)}")
+
+            completed_chunks += 1
+            # The chunk total is only known once every document has been chunked
+            await self.report_progress(int(100 * completed_chunks / chunks_seen * chunked_documents / len(documents)))
+
+        async def flush_waiting_rows():
+            # Rows from a stream that has gone quiet still reach the database
+            while True:
+                await asyncio.sleep(STREAM_WINDOW_SECONDS)
+                if writer.due():
+                    try:
+                        writer.flush()
+                    except Exception as e:
+                        self._log_event('ERROR', 'requirement_write_failed', f"Saving requirements failed: {str(e)}")
+
+        # Map: chunks stream out of each document's pages and one extraction
+        # call starts per chunk; only a bounded number of chunks are in flight
+        # and the LLM scheduler keeps us inside the provider rate limits
+        in_flight = asyncio.Semaphore(Config.LLM_MAX_CONCURRENCY * 2)
+        calls = []
+        flusher = asyncio.create_task(flush_waiting_rows())
+
+        async def run_chunk(document: Document, chunk: Dict[str, Any]):
+            try:
+                await extract_chunk(document, chunk)
+            finally:
+                in_flight.release()
 
-            # Use Claude to extract requirements from document text
-            extraction_prompt = f"""
-            Analyze this RFP document and extract ALL requirements. Pay special attention to:
-
-            Document: {document.original_filename}
-            Content: {document.extracted_text}
-
-            Extract requirements in the following categories:
-            1. FUNCTIONAL REQUIREMENTS (what the system must do)
-            2. NON-FUNCTIONAL REQUIREMENTS (performance, security, usability)
-            3. TECHNICAL REQUIREMENTS (platforms, technologies, standards)
-            4. BUSINESS REQUIREMENTS (business rules, compliance, processes)
-            5. INTEGRATION REQUIREMENTS (APIs, data exchange, third-party systems)
-
-            For each requirement, provide:
-            - Unique ID (REQ-001, REQ-002, etc.)
-            - Title (brief summary)
-            - Description (detailed requirement)
-            - Category (functional/non_functional/technical/business/integration)
-            - Priority (must_have/should_have/could_have/wont_have)
-            - Complexity (low/medium/high)
-            - Source page/section
-            - Acceptance criteria (how to verify completion)
-
-            Return as JSON array with this structure:
-            [{{
-                "requirement_id": "REQ-001",
-                "title": "User Authentication",
-                "description": "The system must provide secure user authentication...",
-                "category": "functional",
-                "priority": "must_have",
-                "complexity": "medium",
-                "source_page": "Page 15",
-                "acceptance_criteria": ["Users can log in with username/password", "Failed login attempts are logged"]
-            }}]
-
-            IMPORTANT: Extract EVERY requirement mentioned in the document. Be comprehensive.
-            """
-
-            requirements_json = await self.call_claude(extraction_prompt, max_tokens=8000)
+        for document in documents:
+            tokens = {'document_id': document.id, 'document': 0, 'sent': 0}
+            for chunk in self._iter_document_chunks(document, tokens):
+                await in_flight.acquire()
+                chunks_seen += 1
+                calls.append(asyncio.create_task(run_chunk(document, chunk)))
+            prompt_tokens.append(tokens)
+            chunked_documents += 1
 
-            try:
-                document_requirements = json.loads(requirements_json)
-
-                # Save requirements to database
-                for req_data in document_requirements:
-                    requirement = Requirement(
-                        requirement_id=req_data['requirement_id'],
-                        title=req_data['title'],
-                        description=req_data['description'],
-                        requirement_type=req_data['category'],
-                        priority=req_data['priority'],
-                        complexity=req_data['complexity'],
-                        source_document_id=document.id,
-                        source_page=req_data.get('source_page', ''),
-                        acceptance_criteria=req_data.get('acceptance_criteria', []),
-                        project_id=project_id,
-                        status='identified'
-                    )
-                    db.session.add(requirement)
-                    extracted_requirements.append(req_data)
-
-                db.session.commit()
-
-            except json.JSONDecodeError as e:
-                self._log_event('ERROR', 'json_parse_failed', f"Failed to parse requirements JSON: {str(e)}")
+        try:
+            await asyncio.gather(*calls)
+        finally:
+            flusher.cancel()
+        writer.flush()
+        self.refresh_search_index(project_id)
 
         return {
             'project_id': project_id,
             'total_requirements': len(extracted_requirements),
+            'duplicates_linked': duplicates,
             'requirements': extracted_requirements,
             'categories': self._categorize_requirements(extracted_requirements),
+            'prompt_tokens': {
+                'document': sum(tokens['document'] for tokens in prompt_tokens),
+                'sent': sum(tokens['sent'] for tokens in prompt_tokens),
+                'by_document': prompt_tokens
+            },
             'status': 'completed'
         }
 
+    def _build_requirement(self, project_id: int, document: Document, req_data: Dict[str, Any],
+                           source_chunk: Optional[DocumentChunk] = None) -> Dict[str, Any]:
+        """Requirement row values for one extracted item"""
+
+        return {
+            'requirement_id': req_data['requirement_id'],
+            'title': req_data['title'][:500],
+            'description': req_data['description'],
+            'requirement_type': req_data.get('category', 'functional'),
+            'priority': req_data.get('priority', 'should_have'),
+            'complexity': req_data.get('complexity', 'medium'),
+            'source_document_id': document.id,
+            'source_page': str(req_data.get('source_page') or
+                               (f"Page {source_chunk.page_number}" if source_chunk else ''))[:20],
+            'source_chunk_id': source_chunk.id if source_chunk else None,
+            'acceptance_criteria': req_data.get('acceptance_criteria', []),
+            'project_id': project_id,
+            'status': 'identified'
+        }
+
+    def _project_duplicate_index(self, project_id: int, writer: RequirementWriter) -> NearDuplicateIndex:
+        """Near-duplicate index over the project's existing original requirements, keyed by requirement id"""
+
+        index = NearDuplicateIndex(Config.REQUIREMENT_DEDUP_THRESHOLD)
+        rows = db.session.query(Requirement.id, Requirement.requirement_id, Requirement.title,
+                                Requirement.description).filter(
+            Requirement.project_id == project_id, Requirement.duplicate_of_id.is_(None)
+        ).order_by(Requirement.id).yield_per(1000)
+        for row in rows:
+            writer.known(row.requirement_id, row.id)
+            index.add(row.requirement_id, minhash(requirement_text(row.title, row.description)))
+        return index
+
+    def _merge_duplicate(self, writer: RequirementWriter, original_id: str, req_data: Dict[str, Any]):
+        """Fold acceptance criteria only the duplicate states into the original"""
+
+        criteria = list(writer.get(original_id, 'acceptance_criteria') or [])
+        known = {str(item).strip().lower() for item in criteria}
+        added = [item for item in req_data.get('acceptance_criteria') or [] if str(item).strip().lower() not in known]
+        if added:
+            writer.update(original_id, acceptance_criteria=criteria + added)
+
+    def _last_requirement_number(self, project_id: int) -> int:
+        """Highest REQ-### number used in the project"""
+
+        numbers = [
+            int(match.group(1))
+            for (requirement_id,) in db.session.query(Requirement.requirement_id).filter_by(project_id=project_id)
+            for match in [re.match(r'^REQ-(\d+)$', requirement_id or '')]
+            if match
+        ]
+        return max(numbers, default=0)
+
+    def _iter_stored_pages(self, document: Document) -> Iterator[Dict[str, Any]]:
+        """Page chunks saved at extraction time, fetched a batch at a time"""
+
+        last_sequence = -1
+        while True:
+            rows = db.session.query(
+                DocumentChunk.sequence, DocumentChunk.page_number, DocumentChunk.text,
+                DocumentChunk.start_offset, DocumentChunk.end_offset
+            ).filter(
+                DocumentChunk.document_id == document.content_document_id,
+                DocumentChunk.chunk_type == 'page',
+                DocumentChunk.sequence > last_sequence
+            ).order_by(DocumentChunk.sequence).limit(PAGE_FETCH_BATCH).all()
+
+            for row in rows:
+                yield {'page': row.page_number, 'text': row.text or '', 'start': row.start_offset, 'end': row.end_offset}
+            if len(rows) < PAGE_FETCH_BATCH:
+                return
+            last_sequence = rows[-1].sequence
+
+    def _iter_document_pages(self, document: Document) -> Iterator[Dict[str, Any]]:
+        """A document's stored pages, or its whole text as one page for older rows"""
+
+        has_pages = db.session.query(DocumentChunk.id).filter_by(
+            document_id=document.content_document_id, chunk_type='page').first() is not None
+        if has_pages:
+            return self._iter_stored_pages(document)
+
+        text = document.extracted_text or ''
+        return iter([{'page': 1, 'text': text, 'start': 0, 'end': len(text)}])
+
+    def _iter_document_chunks(self, document: Document, tokens: Dict[str, int] = None) -> Iterator[Dict[str, Any]]:
+        """Token-budgeted chunks of a document, streamed from its stored pages when available
+
+        With ``REQUIREMENT_PREFILTER`` on, only passages the local rules pick
+        as likely requirements are sent, labelled with their page and
+        section. A document where nothing matches is sent whole rather than
+        skipped. ``tokens`` collects the document size and what was sent.
+        """
+
+        tokens = tokens if tokens is not None else {}
+        tokens.setdefault('document', 0)
+        tokens.setdefault('sent', 0)
+
+        def counted(pages: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+            for page in pages:
+                tokens['document'] += estimate_tokens(page['text'])
+                yield page
+
+        chunks = None
+        if Config.REQUIREMENT_PREFILTER:
+            chunks = pack_candidates(select_candidates(counted(self._iter_document_pages(document))),
+                                     Config.EXTRACTION_CHUNK_TOKENS)
+            first = next(chunks, None)
+            if first is None:
+                self._log_event('INFO', 'prefilter_empty',
+                                f"No requirement candidates found in {document.original_filename}; sending full text")
+                tokens['document'] = 0
+                chunks = None
+            else:
+                chunks = itertools.chain([first], chunks)
+
+        if chunks is None:
+            chunks = chunk_pages(counted(self._iter_document_pages(document)),
+                                 Config.EXTRACTION_CHUNK_TOKENS, Config.EXTRACTION_CHUNK_OVERLAP)
+
+        for chunk in chunks:
+            tokens['sent'] += chunk['tokens']
+            yield chunk
+
+    def _source_chunk(self, document: Document, chunk: Dict[str, Any], req_data: Dict[str, Any]) -> Optional[DocumentChunk]:
+        """Page chunk a requirement came from
+
+        The page Claude cites is used when it lies inside the chunk it was
+        shown; otherwise we fall back to the page the chunk starts on.
+        """
+
+        pages = DocumentChunk.query.filter_by(document_id=document.content_document_id, chunk_type='page')
+
+        match = re.search(r'\d+', str(req_data.get('source_page') or ''))
+        if match:
+            cited = pages.filter(DocumentChunk.page_number == int(match.group()),
+                                 DocumentChunk.start_offset < chunk['end'],
+                                 DocumentChunk.end_offset >= chunk['start']).first()
+            if cited:
+                return cited
+
+        return pages.filter(DocumentChunk.start_offset <= chunk['start']) \
+            .order_by(DocumentChunk.start_offset.desc()).first()
+
+    def _build_extraction_prompt(self, document: Document, chunk: Dict[str, Any]) -> str:
+        """Prompt asking Claude for every requirement in one document chunk"""
+
+        part = "" if chunk['index'] == 0 and chunk.get('last', True) else f" (part {chunk['index'] + 1})"
+        excerpts = """
+        The content below is a selection of passages likely to contain requirements,
+        each labelled [Page N | Section]. Use these labels for source_page.
+        """ if chunk.get('excerpts') else ""
+
+        return f"""
+        Analyze this RFP document and extract ALL requirements. Pay special attention to:
+
+        Document: {document.original_filename}{part}{excerpts}
+        Content: {chunk['text']}
+
+        Extract requirements in the following categories:
+        1. FUNCTIONAL REQUIREMENTS (what the system must do)
+        2. NON-FUNCTIONAL REQUIREMENTS (performance, security, usability)
+        3. TECHNICAL REQUIREMENTS (platforms, technologies, standards)
+        4. BUSINESS REQUIREMENTS (business rules, compliance, processes)
+        5. INTEGRATION REQUIREMENTS (APIs, data exchange, third-party systems)
+
+        For each requirement, provide:
+        - Unique ID (REQ-001, REQ-002, etc.)
+        - Title (brief summary)
+        - Description (detailed requirement)
+        - Category (functional/non_functional/technical/business/integration)
+        - Priority (must_have/should_have/could_have/wont_have)
+        - Complexity (low/medium/high)
+        - Source page/section
+        - Acceptance criteria (how to verify completion)
+
+        Return as JSON array with this structure:
+        [{{
+            "requirement_id": "REQ-001",
+            "title": "User Authentication",
+            "description": "The system must provide secure user authentication...",
+            "category": "functional",
+            "priority": "must_have",
+            "complexity": "medium",
+            "source_page": "Page 15",
+            "acceptance_criteria": ["Users can log in with username/password", "Failed login attempts are logged"]
+        }}]
+
+        IMPORTANT: Extract EVERY requirement mentioned in the document. Be comprehensive.
+        """
+
     async def _analyze_requirements(self, project_id: int) -> Dict[str, Any]:
         """Analyze extracted requirements for conflicts, gaps, and priorities"""
 
-        requirements = Requirement.query.filter_by(project_id=project_id).all()
+        # Linked duplicates are left out; their originals stand for them
+        requirements = db.session.query(
+            Requirement.id, Requirement.requirement_id, Requirement.title, Requirement.description,
+            Requirement.requirement_type, Requirement.priority, Requirement.complexity
+        ).filter_by(project_id=project_id, duplicate_of_id=None).all()
 
         if not requirements:
             return {'error': 'No requirements found for analysis'}
@@ -133,24 +372,23 @@ class RequirementsEngineeringAgent(BaseAgent):
                 'complexity': req.complexity
             })
 
+        # Conflicts are checked pairwise on locally blocked candidates, in
+        # parallel with the project-wide review below
+        conflict_call = asyncio.create_task(self._analyze_conflicts(req_data, project_id))
+
         analysis_prompt = f"""
         Analyze these requirements for a software project and identify:
 
-        Requirements: {json.dumps(req_data, indent=2)}
+        Requirements: {json.dumps(req_data)}
 
         Please provide:
 
-        1. CONFLICT ANALYSIS:
-           - Identify requirements that conflict with each other
-           - Explain the nature of each conflict
-           - Suggest resolution approaches
-
-        2. DEPENDENCY ANALYSIS:
+        1. DEPENDENCY ANALYSIS:
            - Identify requirements that depend on others
            - Create a dependency graph
            - Highlight critical path requirements
 
-        3. GAP ANALYSIS:
+        2. GAP ANALYSIS:
            - Identify missing requirements in common areas:
              * Security and authentication
              * Data backup and recovery
@@ -160,56 +398,247 @@ class RequirementsEngineeringAgent(BaseAgent):
              * Audit and logging
              * Error handling
 
-        4. PRIORITY VALIDATION:
+        3. PRIORITY VALIDATION:
            - Review MoSCoW prioritization
            - Suggest priority adjustments based on dependencies
            - Identify quick wins vs. complex requirements
 
-        5. EFFORT ESTIMATION:
+        4. EFFORT ESTIMATION:
            - Provide rough effort estimates (person-hours) for each requirement
            - Identify requirements that need further breakdown
 
-        Return as structured JSON with sections for conflicts, dependencies, gaps, priorities, and estimates.
+        Return as structured JSON with sections for dependencies, gaps, priorities, and estimates.
         """
 
-        analysis_result = await self.call_claude(analysis_prompt, max_tokens=8000)
+        try:
+            analysis_result = await self.call_claude(analysis_prompt, max_tokens=8000)
+        except BaseException:
+            conflict_call.cancel()
+            raise
+        conflicts = await conflict_call
+
+        # Conflicts replace earlier results only for requirements whose
+        # candidate groups were analysed successfully. Every change is
+        # collected per row and written with one batched UPDATE.
+        updates = {req.id: {'id': req.id} for req in requirements}
+        for req in requirements:
+            if req.requirement_id in conflicts['checked']:
+                updates[req.id]['conflicts_with'] = conflicts['by_requirement'].get(req.requirement_id, [])
 
         try:
             analysis_data = json.loads(analysis_result)
 
             # Update requirements with analysis results
             for req in requirements:
-                # Update conflicts
-                conflicts = analysis_data.get('conflicts', {}).get(req.requirement_id, [])
-                if conflicts:
-                    req.conflicts_with = conflicts
-
                 # Update dependencies
                 dependencies = analysis_data.get('dependencies', {}).get(req.requirement_id, [])
                 if dependencies:
-                    req.dependencies = dependencies
+                    updates[req.id]['dependencies'] = dependencies
 
                 # Update effort estimate
                 effort = analysis_data.get('estimates', {}).get(req.requirement_id, 0)
                 if effort:
-                    req.estimated_effort = effort
+                    updates[req.id]['estimated_effort'] = effort
 
-                req.status = 'analyzed'
+                updates[req.id]['status'] = 'analyzed'
 
+            update_requirements([update for update in updates.values() if len(update) > 1])
             db.session.commit()
 
+            analysis_data['conflicts'] = conflicts['conflicts']
             return {
                 'project_id': project_id,
                 'analysis': analysis_data,
-                'total_conflicts': len(analysis_data.get('conflicts', {})),
+                'total_conflicts': len(conflicts['conflicts']),
+                'conflict_screening': conflicts['stats'],
                 'total_dependencies': len(analysis_data.get('dependencies', {})),
                 'identified_gaps': len(analysis_data.get('gaps', [])),
                 'status': 'completed'
             }
 
         except json.JSONDecodeError as e:
+            update_requirements([update for update in updates.values() if len(update) > 1])
+            db.session.commit()
             self._log_event('ERROR', 'analysis_parse_failed', f"Failed to parse analysis JSON: {str(e)}")
-            return {'error': 'Failed to parse analysis results'}
+            return {'error': 'Failed to parse analysis results', 'total_conflicts': len(conflicts['conflicts'])}
+
+    async def _analyze_conflicts(self, req_data: List[Dict[str, Any]], project_id: int = None) -> Dict[str, Any]:
+        """Find conflicting requirements without sending every pair to Claude
+
+        Requirements are blocked locally by shared key terms, type and
+        lexical similarity; each bounded group of candidate pairs is checked
+        in its own call, all running concurrently. With a ``project_id`` each
+        call also gets the few tender passages closest to its requirements.
+        """
+
+        pairs = candidate_pairs(req_data, Config.CONFLICT_SIMILARITY)
+        groups = conflict_groups(pairs, Config.CONFLICT_GROUP_SIZE)
+        by_id = {req['id']: req for req in req_data}
+
+        conflicts = []
+        checked = set()
+        seen = set()
+
+        async def check_group(group: Dict[str, Any]):
+            requirements = [by_id[req_id] for req_id in group['requirements']]
+            passages = []
+            if project_id is not None and Config.CONFLICT_CONTEXT_PASSAGES > 0:
+                passages = self.relevant_passages(
+                    project_id, ' '.join(requirement_text(req['title'], req['description']) for req in requirements),
+                    Config.CONFLICT_CONTEXT_PASSAGES, Config.CONFLICT_CONTEXT_TOKENS)
+            prompt = self._build_conflict_prompt(requirements, group['pairs'], passages)
+            try:
+                found = json.loads(await self.call_claude(prompt, max_tokens=4000))
+            except Exception as e:
+                self._log_event('ERROR', 'conflict_analysis_failed',
+                                f"Conflict check failed for {len(group['pairs'])} candidate pairs: {str(e)}")
+                return
+
+            members = set(group['requirements'])
+            for conflict in found if isinstance(found, list) else []:
+                ids = conflict.get('requirements') if isinstance(conflict, dict) else None
+                if not isinstance(ids, list) or len(ids) != 2 or ids[0] == ids[1] or not set(ids) <= members:
+                    continue
+                key = tuple(sorted(ids))
+                if key not in seen:
+                    seen.add(key)
+                    conflicts.append({'requirements': list(key), 'nature': conflict.get('nature'),
+                                      'resolution': conflict.get('resolution')})
+            checked.update(members)
+
+        await asyncio.gather(*(check_group(group) for group in groups))
+
+        by_requirement: Dict[str, List[str]] = {}
+        for conflict in conflicts:
+            first, second = conflict['requirements']
+            by_requirement.setdefault(first, []).append(second)
+            by_requirement.setdefault(second, []).append(first)
+
+        # Requirements with no candidate pair were screened out locally
+        paired = {req_id for pair in pairs for req_id in pair[:2]}
+        checked.update(req['id'] for req in req_data if req['id'] not in paired)
+
+        total = len(req_data)
+        return {
+            'conflicts': conflicts,
+            'by_requirement': {req_id: sorted(ids) for req_id, ids in by_requirement.items()},
+            'checked': checked,
+            'stats': {
+                'requirements': total,
+                'all_pairs': total * (total - 1) // 2,
+                'candidate_pairs': len(pairs),
+                'groups': len(groups)
+            }
+        }
+
+    def _build_conflict_prompt(self, requirements: List[Dict[str, Any]], pairs: List[Tuple[str, str, float]],
+                               passages: List[Dict[str, Any]] = ()) -> str:
+        """Prompt checking one group of candidate pairs for conflicts"""
+
+        pair_lines = "\n".join(f"        - {first} vs {second}" for first, second, _ in pairs)
+        context = ''
+        if passages:
+            excerpts = "\n".join(f"        [document {passage['document_id']}, page {passage['page']}] {passage['text']}"
+                                 for passage in passages)
+            context = f"""
+        Related passages from the tender documents, for context on what was meant:
+{excerpts}
+"""
+
+        return f"""
+        Check these software project requirements for conflicts.
+
+        Requirements: {json.dumps(requirements)}
+
+        Candidate pairs to check:
+{pair_lines}
+{context}
+        Two requirements conflict when both cannot be satisfied as written:
+        contradictory values or limits, incompatible technologies or
+        standards, or mutually exclusive behaviour. Overlap or repetition
+        alone is not a conflict.
+
+        Return a JSON array with one entry per real conflict, or [] if none:
+        [{{
+            "requirements": ["REQ-003", "REQ-017"],
+            "nature": "REQ-003 requires on-premise hosting while REQ-017 mandates a public cloud service",
+            "resolution": "Confirm the hosting model with the client"
+        }}]
+        """
+
+    async def _map_dependencies(self, project_id: int) -> Dict[str, Any]:
+        """Identify which requirements depend on which, then analyse the resulting graph"""
+
+        requirements = db.session.query(
+            Requirement.id, Requirement.requirement_id, Requirement.title, Requirement.requirement_type,
+            Requirement.dependencies
+        ).filter_by(project_id=project_id, duplicate_of_id=None).all()
+
+        if not requirements:
+            return {'error': 'No requirements found for dependency mapping'}
+
+        # Titles are enough to spot prerequisites and keep the prompt small
+        catalogue = [{'id': req.requirement_id, 'title': req.title, 'type': req.requirement_type}
+                     for req in requirements]
+
+        mapping_prompt = f"""
+        Identify dependencies between these software project requirements.
+
+        Requirements: {json.dumps(catalogue)}
+
+        A requirement depends on another when it cannot be delivered or verified
+        until the other one is in place (e.g. reporting depends on data capture,
+        single sign-on depends on user management).
+
+        Only list real prerequisites and only use ids from the list above.
+
+        Return a JSON object mapping each requirement id to the ids it depends on:
+        {{"REQ-002": ["REQ-001"], "REQ-007": ["REQ-002", "REQ-005"]}}
+        """
+
+        mapping_result = await self.call_claude(mapping_prompt, max_tokens=8000)
+
+        try:
+            mapping = json.loads(mapping_result)
+        except json.JSONDecodeError as e:
+            self._log_event('ERROR', 'dependency_parse_failed', f"Failed to parse dependency JSON: {str(e)}")
+            return {'error': 'Failed to parse dependency results'}
+
+        if isinstance(mapping, dict) and isinstance(mapping.get('dependencies'), dict):
+            mapping = mapping['dependencies']
+        if not isinstance(mapping, dict):
+            return {'error': 'Failed to parse dependency results'}
+
+        known = {req.requirement_id for req in requirements}
+        updates = []
+        for req in requirements:
+            if req.requirement_id not in mapping:
+                continue
+            dependencies = sorted({dependency for dependency in dependency_ids(mapping[req.requirement_id])
+                                   if dependency in known and dependency != req.requirement_id})
+            if dependencies != sorted(dependency_ids(req.dependencies)):
+                updates.append({'id': req.id, 'dependencies': dependencies})
+
+        update_requirements(updates)
+        db.session.commit()
+
+        graph = project_graph(project_id)
+        summary = graph.summary()
+        if summary['cycles']:
+            self._log_event('WARNING', 'dependency_cycles',
+                            f"{len(summary['cycles'])} dependency cycles in project {project_id}",
+                            {'cycles': summary['cycles'][:20]})
+
+        return {
+            'project_id': project_id,
+            'updated_requirements': len(updates),
+            'total_dependencies': summary['edges'],
+            'cycles': summary['cycles'],
+            'missing': summary['missing'],
+            'critical_path': summary['critical_path'],
+            'build_order': graph.topological_order(),
+            'status': 'completed'
+        }
 
     def _categorize_requirements(self, requirements: List[Dict]) -> Dict[str, int]:
         """Categorize requirements by type and priority"""
@@ -0,0 +1,329 @@
+# agents/text_chunker.py
+import re
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from agents.llm_scheduler import estimate_tokens
+
+# Lines that start a new section: "3.2 Security", "SECTION 4", "Annex B", all caps titles
+HEADING_PATTERN = re.compile(
+    r'^\s*(?:(?:\d+(?:\.\d+)*\.?|[A-Z]\.|(?:section|chapter|annex|appendix|part)\s+[\w.]+)\s+\S.*'
+    r'|[A-Z][A-Z0-9 ,&/\-]{3,80})\s*$',
+    re.IGNORECASE
+)
+PAGE_BREAK = '\f'
+SENTENCE_END = re.compile(r'(?<=[.;:!?])\s+')
+
+
+def _segments(text: str) -> List[Dict[str, Any]]:
+    """Split text into paragraph/section segments with character offsets
+
+    A segment boundary is placed at page breaks, blank lines and lines that
+    look like headings; ``heading`` marks segments that open a section.
+    """
+
+    segments = []
+    start = 0
+    position = 0
+    heading = False
+
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        is_break = not stripped or PAGE_BREAK in line
+        is_heading = bool(stripped) and len(stripped) < 120 and bool(HEADING_PATTERN.match(stripped))
+
+        if (is_break or is_heading) and position > start:
+            segments.append({'start': start, 'end': position, 'heading': heading})
+            start = position
+            heading = False
+
+        if is_heading:
+            heading = True
+
+        position += len(line)
+
+        if is_break:
+            start = position
+
+    if position > start:
+        segments.append({'start': start, 'end': position, 'heading': heading})
+
+    return segments
+
+
+def _split_oversized(text: str, offset: int, max_tokens: int) -> List[Dict[str, Any]]:
+    """Break a single segment that exceeds the budget at sentence boundaries"""
+
+    pieces = []
+    start = 0
+    current_start = 0
+    for match in SENTENCE_END.finditer(text):
+        end = match.end()
+        if estimate_tokens(text[current_start:end]) > max_tokens and start > current_start:
+            pieces.append({'start': offset + current_start, 'end': offset + start, 'heading': False})
+            current_start = start
+        start = end
+    pieces.append({'start': offset + current_start, 'end': offset + len(text), 'heading': False})
+
+    # Fall back to hard character cuts for text with no sentence punctuation
+    result = []
+    max_chars = max(1, max_tokens * 4 - 1)  # estimate_tokens rounds up
+    for piece in pieces:
+        for cut in range(piece['start'], piece['end'], max_chars):
+            result.append({'start': cut, 'end': min(cut + max_chars, piece['end']), 'heading': False})
+    return result
+
+
+def chunk_text(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[Dict[str, Any]]:
+    """Pack section/page segments into chunks that fit a token budget
+
+    Each chunk repeats up to ``overlap_tokens`` of trailing segments from the
+    previous chunk so requirements spanning a seam are seen whole at least
+    once. Returns dicts with ``index``, ``text``, ``start``, ``end`` and
+    ``tokens``; offsets refer to the original text.
+    """
+
+    if not text:
+        return []
+
+    if estimate_tokens(text) <= max_tokens:
+        return [{'index': 0, 'text': text, 'start': 0, 'end': len(text), 'tokens': estimate_tokens(text)}]
+
+    segments = []
+    for segment in _segments(text):
+        if estimate_tokens(text[segment['start']:segment['end']]) > max_tokens:
+            segments.extend(_split_oversized(text[segment['start']:segment['end']], segment['start'], max_tokens))
+        else:
+            segments.append(segment)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    overlap_in_current = 0
+
+    def flush():
+        start, end = current[0]['start'], current[-1]['end']
+        chunks.append({
+            'index': len(chunks),
+            'text': text[start:end],
+            'start': start,
+            'end': end,
+            'tokens': estimate_tokens(text[start:end])
+        })
+
+    for segment in segments:
+        tokens = estimate_tokens(text[segment['start']:segment['end']])
+
+        # Prefer to cut just before a heading once the chunk is reasonably full
+        starts_section = segment['heading'] and current_tokens - overlap_in_current > max_tokens // 2
+        if current and (current_tokens + tokens > max_tokens or starts_section):
+            flush()
+
+            # Carry trailing segments forward as overlap
+            carried = []
+            carried_tokens = 0
+            for previous in reversed(current):
+                previous_tokens = estimate_tokens(text[previous['start']:previous['end']])
+                if carried_tokens + previous_tokens > overlap_tokens or carried_tokens + previous_tokens + tokens > max_tokens:
+                    break
+                carried.insert(0, previous)
+                carried_tokens += previous_tokens
+            current = carried
+            current_tokens = carried_tokens
+            overlap_in_current = carried_tokens
+
+        current.append(segment)
+        current_tokens += tokens
+
+    if current and (not chunks or current[-1]['end'] > chunks[-1]['end']):
+        flush()
+
+    return chunks
+
+
+def chunk_pages(pages: Iterable[Dict[str, Any]], max_tokens: int, overlap_tokens: int = 0,
+                window_chunks: int = 4) -> Iterator[Dict[str, Any]]:
+    """Streaming ``chunk_text`` over pages that carry ``start``/``end`` offsets
+
+    Pages are buffered until about ``window_chunks`` chunks' worth of text is
+    held, then every chunk but the last is emitted; the last one is carried
+    into the next window so seams still get their overlap. Offsets refer to
+    the joined document text and the final chunk is flagged ``last``.
+    """
+
+    window = ''
+    window_start = None
+    index = 0
+
+    for page in pages:
+        if window_start is None:
+            window_start = page['start']
+        else:
+            window += _text_gap(window_start + len(window), page['start'])
+        window += page['text']
+
+        if estimate_tokens(window) < max_tokens * window_chunks:
+            continue
+
+        chunks = chunk_text(window, max_tokens, overlap_tokens)
+        for chunk in chunks[:-1]:
+            yield _shift(chunk, index, window_start, last=False)
+            index += 1
+
+        carried = chunks[-1]['start'] if len(chunks) > 1 else 0
+        window = window[carried:]
+        window_start += carried
+
+    if window:
+        chunks = chunk_text(window, max_tokens, overlap_tokens)
+        for position, chunk in enumerate(chunks):
+            yield _shift(chunk, index, window_start, last=position == len(chunks) - 1)
+            index += 1
+
+
+def _text_gap(position: int, start: int) -> str:
+    # Pages are joined with newlines; keep offsets aligned with the joined text
+    return "\n" * max(0, start - position)
+
+
+def _shift(chunk: Dict[str, Any], index: int, offset: int, last: bool) -> Dict[str, Any]:
+    chunk['index'] = index
+    chunk['start'] += offset
+    chunk['end'] += offset
+    chunk['last'] = last
+    return chunk
+
+
+NUMBERED_HEADING = re.compile(r'^\s*(\d+(?:\.\d+)*)\.?\s')
+
+
+def page_headings(page: Dict[str, Any]) -> List[Tuple[int, int, str]]:
+    """(offset within the page text, level, heading) for each heading on a page
+
+    Structured extractors mark headings as blocks; plain text falls back to
+    ``HEADING_PATTERN``, with the level taken from clause numbering depth.
+    """
+
+    text = page['text']
+    headings = []
+
+    if page.get('blocks') is not None:
+        cursor = 0
+        for block in page['blocks']:
+            if block['type'] != 'heading':
+                continue
+            offset = text.find(block['text'], cursor)
+            if offset >= 0:
+                headings.append((offset, block.get('level') or 1, block['text'].strip()))
+                cursor = offset + len(block['text'])
+        return headings
+
+    position = 0
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped and len(stripped) < 120 and HEADING_PATTERN.match(stripped):
+            numbered = NUMBERED_HEADING.match(stripped)
+            level = numbered.group(1).count('.') + 1 if numbered else 1
+            headings.append((position + len(line) - len(line.lstrip()), level, stripped))
+        position += len(line)
+    return headings
+
+
+class SectionSplitter:
+    """Incrementally cut a stream of pages into sections at headings
+
+    Pages must carry ``start``/``end`` offsets. ``add`` returns the sections
+    completed by a page, ``finish`` the last one. Text before the first
+    heading becomes an untitled section; a new spreadsheet sheet always
+    opens a section named after it.
+    """
+
+    def __init__(self):
+        self.current: Optional[Dict[str, Any]] = None
+        self._sheet = None
+
+    def _open(self, heading: Optional[str], level: Optional[int], start: int, page: int):
+        self.current = {'heading': heading, 'level': level, 'start': start, 'end': start,
+                        'page': page, 'end_page': page, 'parts': []}
+
+    def _append(self, text: str, start: int, page: int):
+        if self.current is None:
+            if not text.strip():
+                return
+            self._open(None, None, start, page)
+        if start > self.current['end'] and self.current['parts']:
+            self.current['parts'].append("\n" * (start - self.current['end']))
+        self.current['parts'].append(text)
+        self.current['end'] = start + len(text)
+        self.current['end_page'] = page
+
+    def _close(self) -> List[Dict[str, Any]]:
+        section, self.current = self.current, None
+        if section is None:
+            return []
+        section['text'] = ''.join(section.pop('parts'))
+        if not section['text'].strip():
+            return []
+        section['tokens'] = estimate_tokens(section['text'])
+        return [section]
+
+    def add(self, page: Dict[str, Any]) -> List[Dict[str, Any]]:
+        text = page['text']
+        headings = page_headings(page)
+        if page.get('sheet') and page['sheet'] != self._sheet:
+            self._sheet = page['sheet']
+            headings.insert(0, (0, 1, f"Sheet: {page['sheet']}"))
+
+        finished = []
+        cursor = 0
+        for offset, level, heading in headings:
+            if offset > cursor:
+                self._append(text[cursor:offset], page['start'] + cursor, page['page'])
+            finished.extend(self._close())
+            self._open(heading, level, page['start'] + offset, page['page'])
+            cursor = offset
+
+        if cursor < len(text) or self.current is not None:
+            self._append(text[cursor:], page['start'] + cursor, page['page'])
+        return finished
+
+    def finish(self) -> List[Dict[str, Any]]:
+        return self._close()
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', (text or '').lower()).split())
+
+
+class RequirementMerger:
+    """Incrementally merge requirements arriving from several chunks
+
+    Requirements seen twice because of chunk overlap are collapsed, keeping
+    the richer copy, and ids are reassigned from a shared counter since every
+    chunk numbers its own results from REQ-001.
+    """
+
+    def __init__(self, counter: Iterator[int], prefix: str = 'REQ'):
+        self.counter = counter
+        self.prefix = prefix
+        self.requirements: List[Dict[str, Any]] = []
+        self._seen: Dict[str, int] = {}
+
+    def add(self, requirement: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Returns ('new', req), ('replaced', req) or ('duplicate', None)"""
+
+        key = _normalize(requirement.get('description')) or _normalize(requirement.get('title'))
+        if not key:
+            return 'duplicate', None
+
+        if key in self._seen:
+            existing = self.requirements[self._seen[key]]
+            if len(requirement.get('acceptance_criteria') or []) > len(existing.get('acceptance_criteria') or []):
+                requirement['requirement_id'] = existing['requirement_id']
+                self.requirements[self._seen[key]] = requirement
+                return 'replaced', requirement
+            return 'duplicate', None
+
+        requirement['requirement_id'] = f"{self.prefix}-{next(self.counter):03d}"
+        self._seen[key] = len(self.requirements)
+        self.requirements.append(requirement)
+        return 'new', requirement
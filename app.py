@@ -1,8 +1,7 @@
 # app.py - Enhanced with file processing and API endpoints
 import os
+import time
 import uuid
-import hashlib
-import mimetypes
 from datetime import datetime
 from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
@@ -10,14 +9,28 @@ from werkzeug.utils import secure_filename
 from werkzeug.security import check_password_hash
 
 # Import enhanced models and agents
+from config import Config
 from models import *
 from agents.document_intelligence import DocumentIntelligenceAgent
 from agents.requirements_engineering import RequirementsEngineeringAgent
+from uploads import save_upload_stream, ChunkedUploadStore, UploadError
+from blob_store import BlobStore
+from task_queue import enqueue_task, agent_class_for
+from pipeline import start_pipeline, pipeline_status
+from agents.llm_cache import get_llm_cache
+from agents.requirement_dedup import find_duplicates, requirement_text
+from dependency_graph import dependency_ids, project_graph
+from requirement_store import upsert_requirements
+import vector_index
 
 # Configure file uploads
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
-ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'txt'}
+app.config['UPLOAD_CHUNK_SIZE'] = 5 * 1024 * 1024  # 5MB per resumable chunk
+app.config['MAX_UPLOAD_SIZE'] = 500 * 1024 * 1024  # 500MB max resumable upload
+ALLOWED_EXTENSIONS = {'pdf', 'docx', 'xlsx', 'pptx', 'txt'}
+# Binary Office formats we have no reader for, with the format to save them as
+LEGACY_OFFICE_EXTENSIONS = {'doc': 'docx', 'xls': 'xlsx', 'ppt': 'pptx'}
 
 # Initialize Flask-Login
 login_manager = LoginManager()
@@ -31,13 +44,64 @@ def load_user(user_id):
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def calculate_file_hash(file_path):
-    """Calculate SHA-256 hash of file"""
-    hash_sha256 = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_sha256.update(chunk)
-    return hash_sha256.hexdigest()
+def upload_rejection(filename):
+    """Why a file cannot be uploaded, or None if it can"""
+    extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+    if extension in LEGACY_OFFICE_EXTENSIONS:
+        return f"{filename}: .{extension} files are not supported, save it as .{LEGACY_OFFICE_EXTENSIONS[extension]}"
+    if not allowed_file(filename):
+        return f"{filename}: unsupported file type"
+    return None
+
+def upload_store():
+    return ChunkedUploadStore(app.config['UPLOAD_FOLDER'], max_size=app.config['MAX_UPLOAD_SIZE'])
+
+def blob_store():
+    return BlobStore(app.config['UPLOAD_FOLDER'])
+
+def register_document(project_id, original_filename, filename, file_info):
+    """Create the Document row for a stored file
+
+    The file is moved into the content-addressed blob store. If a completed
+    document with the same hash exists, its extraction results are reused so
+    the pipeline can skip document analysis for it.
+    """
+
+    file_path = blob_store().ingest(file_info['file_path'], file_info['file_hash'])
+
+    document = Document(
+        filename=filename,
+        original_filename=original_filename,
+        file_path=file_path,
+        file_size=file_info['file_size'],
+        mime_type=file_info['mime_type'],
+        file_hash=file_info['file_hash'],
+        project_id=project_id,
+        uploaded_by=current_user.id,
+        processing_status='uploaded'
+    )
+
+    twin = Document.find_analyzed_twin(file_info['file_hash'])
+    if twin:
+        document.reuse_analysis_from(twin)
+
+    db.session.add(document)
+    db.session.commit()
+
+    return document
+
+def start_document_pipeline(project_id, documents):
+    """Start the analysis pipeline for uploaded documents and queue its entry tasks"""
+
+    if not documents:
+        return None, {}
+
+    pipeline = start_pipeline(int(project_id), [d.id for d in documents])
+    for task in pipeline['tasks']:
+        enqueue_task(task, app)
+
+    entry_tasks = {task.input_data['document_id']: task.task_id for task in pipeline['tasks']}
+    return pipeline['pipeline_id'], entry_tasks
 
 # Authentication routes
 @app.route('/login', methods=['GET', 'POST'])
@@ -83,69 +147,130 @@ def upload_files():
     if not project:
         return jsonify({'error': 'Project not found or access denied'}), 404
 
-    uploaded_files = []
+    rejected = [reason for reason in (upload_rejection(file.filename) for file in files if file and file.filename)
+                if reason]
+    if rejected:
+        return jsonify({'error': 'Unsupported files', 'files': rejected}), 400
+
+    documents = []
 
     for file in files:
-        if file and file.filename and allowed_file(file.filename):
+        if file and file.filename:
             # Generate unique filename
             filename = str(uuid.uuid4()) + '_' + secure_filename(file.filename)
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-
-            # Ensure upload directory exists
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
-            # Save file
-            file.save(file_path)
-
-            # Calculate file hash and get metadata
-            file_hash = calculate_file_hash(file_path)
-            file_size = os.path.getsize(file_path)
-            mime_type = mimetypes.guess_type(file_path)[0]
-
-            # Save to database
-            document = Document(
-                filename=filename,
-                original_filename=file.filename,
-                file_path=file_path,
-                file_size=file_size,
-                mime_type=mime_type,
-                file_hash=file_hash,
-                project_id=project_id,
-                uploaded_by=current_user.id,
-                processing_status='uploaded'
-            )
-
-            db.session.add(document)
-            db.session.commit()
 
-            # Create document analysis task
-            doc_agent = Agent.query.filter_by(name='Document Intelligence').first()
-            if doc_agent:
-                analysis_task = AgentTask(
-                    task_type='document_analysis',
-                    title=f'Analyze {file.filename}',
-                    description=f'Extract and analyze content from {file.filename}',
-                    agent_id=doc_agent.id,
-                    project_id=project_id,
-                    input_data={'document_id': document.id},
-                    status='pending'
-                )
-                db.session.add(analysis_task)
-                db.session.commit()
-
-            uploaded_files.append({
-                'id': document.id,
-                'filename': file.filename,
-                'size': file_size,
-                'status': 'uploaded',
-                'task_id': analysis_task.task_id if doc_agent else None
-            })
+            # Stream to disk, hashing and sniffing the content as it is written
+            file_info = save_upload_stream(file.stream, blob_store().incoming_path(), file.filename)
+
+            documents.append(register_document(project_id, file.filename, filename, file_info))
+
+    # Analysis, extraction and requirement analysis then chain automatically
+    pipeline_id, entry_tasks = start_document_pipeline(project_id, documents)
+
+    uploaded_files = [{
+        'id': document.id,
+        'filename': document.original_filename,
+        'size': document.file_size,
+        'status': document.processing_status,
+        'duplicate_of': document.duplicate_of_id,
+        'task_id': entry_tasks.get(document.id)
+    } for document in documents]
 
     return jsonify({
         'message': f'Successfully uploaded {len(uploaded_files)} files',
+        'pipeline_id': pipeline_id,
         'files': uploaded_files
     })
 
+# Resumable chunked uploads
+@app.route('/api/uploads', methods=['POST'])
+@login_required
+def init_upload():
+    """Start a resumable upload session"""
+
+    data = request.get_json() or {}
+    filename = data.get('filename')
+    project_id = data.get('project_id')
+
+    if not filename:
+        return jsonify({'error': 'filename is required'}), 400
+    rejection = upload_rejection(filename)
+    if rejection:
+        return jsonify({'error': rejection}), 400
+
+    project = Project.query.filter_by(id=project_id, user_id=current_user.id).first()
+    if not project:
+        return jsonify({'error': 'Project not found or access denied'}), 404
+
+    try:
+        meta = upload_store().init(filename, data.get('total_size'), project.id, current_user.id)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'upload_id': meta['upload_id'],
+        'offset': meta['offset'],
+        'chunk_size': app.config['UPLOAD_CHUNK_SIZE']
+    }), 201
+
+@app.route('/api/uploads/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+@login_required
+def upload_chunk(upload_id):
+    """Query, append to or abort a resumable upload session"""
+
+    store = upload_store()
+    try:
+        meta = store.status(upload_id)
+        if meta['user_id'] != current_user.id:
+            return jsonify({'error': 'Access denied'}), 403
+
+        if request.method == 'PUT':
+            offset = request.args.get('offset', type=int)
+            if offset is None or offset < 0:
+                return jsonify({'error': 'offset query parameter must be a non-negative integer'}), 400
+            meta = store.put_chunk(upload_id, offset, request.get_data(cache=False))
+        elif request.method == 'DELETE':
+            store.abort(upload_id)
+            return jsonify({'upload_id': upload_id, 'status': 'aborted'})
+
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 409
+
+    return jsonify({
+        'upload_id': upload_id,
+        'offset': meta['offset'],
+        'total_size': meta['total_size']
+    })
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+@login_required
+def finalize_upload(upload_id):
+    """Complete a resumable upload and register the document"""
+
+    store = upload_store()
+    try:
+        meta = store.status(upload_id)
+        if meta['user_id'] != current_user.id:
+            return jsonify({'error': 'Access denied'}), 403
+
+        filename = str(uuid.uuid4()) + '_' + secure_filename(meta['filename'])
+        file_info = store.finalize(upload_id, blob_store().incoming_path())
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 409
+
+    document = register_document(file_info['project_id'], file_info['filename'], filename, file_info)
+    pipeline_id, entry_tasks = start_document_pipeline(file_info['project_id'], [document])
+
+    return jsonify({
+        'id': document.id,
+        'filename': document.original_filename,
+        'size': document.file_size,
+        'status': document.processing_status,
+        'duplicate_of': document.duplicate_of_id,
+        'pipeline_id': pipeline_id,
+        'task_id': entry_tasks.get(document.id)
+    })
+
 # Enhanced project management
 @app.route('/api/projects', methods=['GET', 'POST'])
 @login_required
@@ -226,10 +351,35 @@ def create_task():
         'created_at': task.created_at.isoformat()
     })
 
+@app.route('/api/tasks/<task_id>', methods=['GET'])
+@login_required
+def get_task(task_id):
+    """Get task status and progress"""
+
+    task = AgentTask.query.filter_by(task_id=task_id).first()
+    if not task:
+        return jsonify({'error': 'Task not found'}), 404
+
+    # Verify user has access to the project
+    if task.project.user_id != current_user.id:
+        return jsonify({'error': 'Access denied'}), 403
+
+    return jsonify({
+        'task_id': task.task_id,
+        'task_type': task.task_type,
+        'status': task.status,
+        'progress_percentage': task.progress_percentage,
+        'error_message': task.error_message,
+        'output_data': task.output_data if task.status == 'completed' else None,
+        'created_at': task.created_at.isoformat(),
+        'started_at': task.started_at.isoformat() if task.started_at else None,
+        'completed_at': task.completed_at.isoformat() if task.completed_at else None
+    })
+
 @app.route('/api/tasks/<task_id>/process', methods=['POST'])
 @login_required
 def process_task(task_id):
-    """Process a specific task"""
+    """Queue a specific task for background processing"""
 
     task = AgentTask.query.filter_by(task_id=task_id).first()
     if not task:
@@ -239,28 +389,39 @@ def process_task(task_id):
     if task.project.user_id != current_user.id:
         return jsonify({'error': 'Access denied'}), 403
 
-    try:
-        # Initialize appropriate agent based on task type
-        if task.agent.name == 'Document Intelligence':
-            agent = DocumentIntelligenceAgent(task.agent_id)
-        elif task.agent.name == 'Requirements Engineering':
-            agent = RequirementsEngineeringAgent(task.agent_id)
-        else:
-            return jsonify({'error': f'Agent {task.agent.name} not implemented yet'}), 501
-
-        # Process task asynchronously (in a real app, use Celery or similar)
-        import asyncio
-        result = asyncio.run(agent.process_task(task_id))
+    if not agent_class_for(task.agent):
+        return jsonify({'error': f'Agent {task.agent.name} not implemented yet'}), 501
 
-        return jsonify({
-            'task_id': task_id,
-            'status': 'completed',
-            'result': result
-        })
+    if task.status not in ('pending', 'failed'):
+        return jsonify({'task_id': task_id, 'status': task.status}), 409
 
+    try:
+        enqueue_task(task, app)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+    return jsonify({
+        'task_id': task_id,
+        'status': task.status,
+        'status_url': url_for('get_task', task_id=task_id)
+    }), 202
+
+@app.route('/api/pipelines/<pipeline_id>', methods=['GET'])
+@login_required
+def get_pipeline(pipeline_id):
+    """Get stage-by-stage status of a pipeline run"""
+
+    status = pipeline_status(pipeline_id)
+    task_ids = [t['task_id'] for stage in status['stages'].values() for t in stage]
+    if not task_ids:
+        return jsonify({'error': 'Pipeline not found'}), 404
+
+    task = AgentTask.query.filter_by(task_id=task_ids[0]).first()
+    if task.project.user_id != current_user.id:
+        return jsonify({'error': 'Access denied'}), 403
+
+    return jsonify(status)
+
 # Requirements management
 @app.route('/api/projects/<int:project_id>/requirements', methods=['GET'])
 @login_required
@@ -285,9 +446,267 @@ def get_requirements(project_id):
         'estimated_effort': req.estimated_effort,
         'dependencies': req.dependencies,
         'conflicts_with': req.conflicts_with,
-        'acceptance_criteria': req.acceptance_criteria
+        'acceptance_criteria': req.acceptance_criteria,
+        'source_document_id': req.source_document_id,
+        'source_page': req.source_page,
+        'source_chunk_id': req.source_chunk_id,
+        'duplicate_of_id': req.duplicate_of_id,
+        'duplicate_score': req.duplicate_score
     } for req in requirements])
 
+@app.route('/api/projects/<int:project_id>/requirements/bulk', methods=['POST'])
+@login_required
+def upsert_project_requirements(project_id):
+    """Create or update many requirements at once, matched on ``requirement_id``
+
+    Accepts a JSON list using the field names of the requirements listing;
+    fields left out keep their stored values.
+    """
+
+    project = Project.query.filter_by(id=project_id, user_id=current_user.id).first()
+    if not project:
+        return jsonify({'error': 'Project not found or access denied'}), 404
+
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        return jsonify({'error': 'Expected a JSON list of requirements'}), 400
+
+    fields = {
+        'title': 'title', 'description': 'description', 'type': 'requirement_type', 'priority': 'priority',
+        'complexity': 'complexity', 'status': 'status', 'estimated_effort': 'estimated_effort',
+        'dependencies': 'dependencies', 'conflicts_with': 'conflicts_with',
+        'acceptance_criteria': 'acceptance_criteria', 'source_page': 'source_page'
+    }
+    rows = {}
+    for item in items:
+        if not isinstance(item, dict) or not item.get('requirement_id'):
+            return jsonify({'error': 'Every requirement needs a requirement_id'}), 400
+        row = {column: item[field] for field, column in fields.items() if field in item}
+        row.update(project_id=project_id, requirement_id=str(item['requirement_id'])[:50])
+        # The last copy of a repeated id wins
+        rows[row['requirement_id']] = row
+
+    existing = {requirement_id for (requirement_id,) in db.session.query(Requirement.requirement_id)
+                .filter(Requirement.project_id == project_id, Requirement.requirement_id.in_(list(rows)))}
+    missing = [requirement_id for requirement_id, row in rows.items()
+               if requirement_id not in existing and not (row.get('title') and row.get('description'))]
+    if missing:
+        return jsonify({'error': 'New requirements need a title and description', 'requirement_ids': missing[:20]}), 400
+
+    upsert_requirements(list(rows.values()))
+    db.session.commit()
+
+    return jsonify({
+        'created': len(rows) - len(existing),
+        'updated': len(existing),
+        'status': 'completed'
+    })
+
+@app.route('/api/projects/<int:project_id>/requirements/duplicates', methods=['GET'])
+@login_required
+def get_requirement_duplicates(project_id):
+    """Near-duplicate requirements in a project, grouped under the first copy
+
+    Groups come from a fresh MinHash/LSH pass over the project, so rows
+    extracted before duplicates were linked are covered too; ``linked``
+    tells whether a copy is already marked as a duplicate. ``threshold``
+    overrides the configured similarity cut-off.
+    """
+
+    project = Project.query.filter_by(id=project_id, user_id=current_user.id).first()
+    if not project:
+        return jsonify({'error': 'Project not found or access denied'}), 404
+
+    try:
+        threshold = float(request.args.get('threshold', Config.REQUIREMENT_DEDUP_THRESHOLD))
+    except ValueError:
+        return jsonify({'error': 'threshold must be a number'}), 400
+
+    rows = db.session.query(
+        Requirement.id, Requirement.requirement_id, Requirement.title, Requirement.description,
+        Requirement.source_document_id, Requirement.source_page, Requirement.duplicate_of_id
+    ).filter_by(project_id=project_id).order_by(Requirement.id).all()
+    by_id = {row.id: row for row in rows}
+
+    def summary(row):
+        return {
+            'id': row.id,
+            'requirement_id': row.requirement_id,
+            'title': row.title,
+            'source_document_id': row.source_document_id,
+            'source_page': row.source_page
+        }
+
+    groups = {}
+    for key, original_id, score in find_duplicates(
+            ((row.id, requirement_text(row.title, row.description)) for row in rows), threshold):
+        group = groups.setdefault(original_id, dict(summary(by_id[original_id]), duplicates=[]))
+        group['duplicates'].append(dict(summary(by_id[key]), similarity=round(score, 3),
+                                        linked=by_id[key].duplicate_of_id is not None))
+
+    duplicate_count = sum(len(group['duplicates']) for group in groups.values())
+    return jsonify({
+        'project_id': project_id,
+        'threshold': threshold,
+        'total_requirements': len(rows),
+        'unique_requirements': len(rows) - duplicate_count,
+        'duplicate_requirements': duplicate_count,
+        'linked_duplicates': sum(1 for row in rows if row.duplicate_of_id is not None),
+        'groups': sorted(groups.values(), key=lambda group: -len(group['duplicates']))
+    })
+
+@app.route('/api/projects/<int:project_id>/search', methods=['GET'])
+@login_required
+def search_project(project_id):
+    """Document pages and requirements most similar to a free-text query
+
+    Query parameters: ``q`` (the query), ``k`` (number of results) and
+    ``kind`` (page or requirement, both by default). Served from the
+    project's local TF-IDF index, which picks up new pages and edited
+    requirements before answering.
+    """
+
+    project = Project.query.filter_by(id=project_id, user_id=current_user.id).first()
+    if not project:
+        return jsonify({'error': 'Project not found or access denied'}), 404
+
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    kind = request.args.get('kind')
+    if kind and kind not in vector_index.KINDS:
+        return jsonify({'error': f"kind must be one of {', '.join(vector_index.KINDS)}"}), 400
+    k = max(1, min(request.args.get('k', Config.VECTOR_SEARCH_K, type=int), 50))
+
+    if not vector_index.available():
+        return jsonify({'error': 'Vector search is not available on this server'}), 503
+
+    started = time.perf_counter()
+    index = vector_index.project_index(project_id)
+    indexed = time.perf_counter()
+    hits = index.search(query, k, [kind] if kind else None)
+
+    texts = dict(db.session.query(DocumentChunk.id, DocumentChunk.text).filter(
+        DocumentChunk.id.in_([hit['chunk_id'] for hit in hits if hit['kind'] == 'page'])))
+    for hit in hits:
+        if hit['kind'] == 'page':
+            hit['snippet'] = vector_index.snippet(texts.get(hit['chunk_id']), query)
+
+    return jsonify({
+        'project_id': project_id,
+        'query': query,
+        'indexed_items': len(index),
+        'results': hits,
+        'timing_ms': {
+            'sync': round((indexed - started) * 1000, 2),
+            'search': round((time.perf_counter() - indexed) * 1000, 2)
+        }
+    })
+
+@app.route('/api/projects/<int:project_id>/dependencies', methods=['GET'])
+@login_required
+def get_dependency_graph(project_id):
+    """Dependency graph summary: cycles, missing references and the critical path
+
+    ``include=order`` adds the build order (dependencies first).
+    """
+
+    project = Project.query.filter_by(id=project_id, user_id=current_user.id).first()
+    if not project:
+        return jsonify({'error': 'Project not found or access denied'}), 404
+
+    graph = project_graph(project_id)
+    result = dict(graph.summary(), project_id=project_id)
+    if request.args.get('include') == 'order':
+        result['order'] = graph.topological_order()
+
+    return jsonify(result)
+
+@app.route('/api/projects/<int:project_id>/dependencies/<requirement_id>', methods=['GET'])
+@login_required
+def get_requirement_dependencies(project_id, requirement_id):
+    """What a requirement needs and what is affected if it changes"""
+
+    project = Project.query.filter_by(id=project_id, user_id=current_user.id).first()
+    if not project:
+        return jsonify({'error': 'Project not found or access denied'}), 404
+
+    graph = project_graph(project_id)
+    if requirement_id not in graph:
+        return jsonify({'error': 'Requirement not found'}), 404
+
+    impact = graph.impact(requirement_id)
+    return jsonify({
+        'requirement_id': requirement_id,
+        'depends_on': sorted(graph.depends_on[requirement_id]),
+        'all_dependencies': graph.dependencies_of(requirement_id),
+        'dependents': sorted(graph.dependents.get(requirement_id, ())),
+        'impact': [{'requirement_id': node, 'distance': distance}
+                   for node, distance in sorted(impact.items(), key=lambda item: (item[1], item[0]))],
+        'in_cycle': any(requirement_id in cycle for cycle in graph.cycles())
+    })
+
+@app.route('/api/projects/<int:project_id>/requirements/<requirement_id>/dependencies', methods=['PUT'])
+@login_required
+def update_requirement_dependencies(project_id, requirement_id):
+    """Replace a requirement's dependency list"""
+
+    project = Project.query.filter_by(id=project_id, user_id=current_user.id).first()
+    if not project:
+        return jsonify({'error': 'Project not found or access denied'}), 404
+
+    requirement = Requirement.query.filter_by(project_id=project_id, requirement_id=requirement_id).first()
+    if not requirement:
+        return jsonify({'error': 'Requirement not found'}), 404
+
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload.get('dependencies'), list):
+        return jsonify({'error': 'dependencies must be a list of requirement ids'}), 400
+
+    requirement.dependencies = sorted(set(dependency_ids(payload['dependencies'])) - {requirement_id})
+    db.session.commit()
+
+    # The cached graph picks the edited row up incrementally
+    graph = project_graph(project_id)
+    return jsonify({
+        'requirement_id': requirement_id,
+        'dependencies': requirement.dependencies,
+        'missing': [dependency for dependency in requirement.dependencies if dependency not in graph],
+        'cycles': [cycle for cycle in graph.cycles() if requirement_id in cycle]
+    })
+
+@app.route('/api/projects/<int:project_id>/map-dependencies', methods=['POST'])
+@login_required
+def map_dependencies(project_id):
+    """Queue dependency mapping for a project's requirements"""
+
+    project = Project.query.filter_by(id=project_id, user_id=current_user.id).first()
+    if not project:
+        return jsonify({'error': 'Project not found or access denied'}), 404
+
+    req_agent = Agent.query.filter_by(name='Requirements Engineering').first()
+    if not req_agent:
+        return jsonify({'error': 'Requirements Engineering agent not found'}), 500
+
+    task = AgentTask(
+        task_type='dependency_mapping',
+        title=f'Map requirement dependencies for {project.name}',
+        description='Identify dependencies between project requirements',
+        agent_id=req_agent.id,
+        project_id=project_id,
+        input_data={'project_id': project_id},
+        status='pending'
+    )
+
+    db.session.add(task)
+    db.session.commit()
+
+    return jsonify({
+        'task_id': task.task_id,
+        'message': 'Dependency mapping task created',
+        'status': 'pending'
+    })
+
 @app.route('/api/projects/<int:project_id>/extract-requirements', methods=['POST'])
 @login_required
 def extract_requirements(project_id):
@@ -339,6 +758,62 @@ def download_document(document_id):
     return send_file(document.file_path, as_attachment=True,
                      download_name=document.original_filename)
 
+@app.route('/api/documents/<int:document_id>/chunks')
+@login_required
+def get_document_chunks(document_id):
+    """Page or section slices of a document's text
+
+    Query parameters: ``type`` (page or section), ``page`` (chunks covering
+    that page), ``offset`` (the chunk containing that character offset),
+    ``after`` (sequence cursor for paging) and ``limit``.
+    """
+
+    document = Document.query.get(document_id)
+    if not document:
+        return jsonify({'error': 'Document not found'}), 404
+
+    if document.project.user_id != current_user.id:
+        return jsonify({'error': 'Access denied'}), 403
+
+    chunk_type = request.args.get('type', 'page')
+    if chunk_type not in ('page', 'section'):
+        return jsonify({'error': 'type must be page or section'}), 400
+
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    query = DocumentChunk.query.options(db.undefer(DocumentChunk.text)) \
+        .filter_by(document_id=document.content_document_id, chunk_type=chunk_type)
+
+    page = request.args.get('page', type=int)
+    offset = request.args.get('offset', type=int)
+    if page is not None:
+        query = query.filter(DocumentChunk.page_number <= page, DocumentChunk.end_page_number >= page)
+    if offset is not None:
+        query = query.filter(DocumentChunk.start_offset <= offset, DocumentChunk.end_offset >= offset)
+
+    after = request.args.get('after', type=int)
+    if after is not None:
+        query = query.filter(DocumentChunk.sequence > after)
+
+    chunks = query.order_by(DocumentChunk.sequence).limit(limit).all()
+
+    return jsonify({
+        'document_id': document_id,
+        'type': chunk_type,
+        'chunks': [{
+            'id': chunk.id,
+            'sequence': chunk.sequence,
+            'page_number': chunk.page_number,
+            'end_page_number': chunk.end_page_number,
+            'start_offset': chunk.start_offset,
+            'end_offset': chunk.end_offset,
+            'heading': chunk.heading,
+            'heading_level': chunk.heading_level,
+            'token_count': chunk.token_count,
+            'text': chunk.text
+        } for chunk in chunks],
+        'next_after': chunks[-1].sequence if len(chunks) == limit else None
+    })
+
 # System monitoring endpoints
 @app.route('/api/system/status')
 @login_required
@@ -349,6 +824,7 @@ def system_status():
     active_tasks = AgentTask.query.filter_by(status='in_progress').count()
     pending_tasks = AgentTask.query.filter_by(status='pending').count()
     total_projects = Project.query.filter_by(user_id=current_user.id).count()
+    llm_cache = get_llm_cache()
 
     return jsonify({
         'agents': {
@@ -363,5 +839,6 @@ def system_status():
         'projects': {
             'total': total_projects
         },
+        'llm_cache': llm_cache.stats() if llm_cache else None,
         'system_health': 'healthy'
     })
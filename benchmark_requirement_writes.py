@@ -0,0 +1,135 @@
+# benchmark_requirement_writes.py - rows/sec of requirement writes, ORM vs bulk paths
+"""Compare the per-row ORM writes requirements used to go through with the bulk paths
+
+    python benchmark_requirement_writes.py --rows 5000
+    python benchmark_requirement_writes.py --database-url postgresql://... --project-id 1
+
+Defaults to a throwaway SQLite file. Against PostgreSQL use a scratch
+database that already has the schema and a project; the rows written here
+are deleted after each step.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from flask import Flask
+
+from models import db, Requirement
+from requirement_store import COPY_MIN_ROWS, insert_requirements, update_requirements, upsert_requirements
+
+
+def make_rows(count, project_id):
+    return [{
+        'requirement_id': f"BENCH-{number:06d}",
+        'title': f"Benchmark requirement {number}",
+        'description': f"The system shall handle benchmark case {number} within 2 seconds. " * 4,
+        'requirement_type': 'functional',
+        'priority': 'should_have',
+        'complexity': 'medium',
+        'source_page': f"Page {number % 300 + 1}",
+        'acceptance_criteria': [f"Case {number} passes", "Response logged"],
+        'project_id': project_id,
+        'status': 'identified'
+    } for number in range(count)]
+
+
+def clear(project_id):
+    Requirement.query.filter(Requirement.project_id == project_id,
+                             Requirement.requirement_id.like('BENCH-%')).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def timed(label, count, action):
+    db.session.expunge_all()
+    began = time.perf_counter()
+    action()
+    seconds = time.perf_counter() - began
+    print(f"{label:<38} {count:>7} rows {seconds:>8.3f} s {count / seconds:>10.0f} rows/s")
+
+
+def run(rows, project_id):
+    def orm_add_each():
+        # Extraction before: one add and commit per requirement
+        for row in rows:
+            db.session.add(Requirement(**row))
+            db.session.commit()
+
+    def orm_add_all():
+        db.session.add_all(Requirement(**row) for row in rows)
+        db.session.commit()
+
+    def bulk_insert():
+        insert_requirements(rows)
+        db.session.commit()
+
+    def upsert_new():
+        upsert_requirements(rows)
+        db.session.commit()
+
+    def upsert_existing():
+        upsert_requirements([dict(row, priority='must_have') for row in rows])
+        db.session.commit()
+
+    def orm_update_each():
+        # Analysis before: mutate every loaded row, one flush at commit
+        for requirement in Requirement.query.filter(Requirement.project_id == project_id,
+                                                    Requirement.requirement_id.like('BENCH-%')):
+            requirement.status = 'analyzed'
+            requirement.conflicts_with = []
+            requirement.estimated_effort = 8
+        db.session.commit()
+
+    def bulk_update():
+        ids = [row_id for (row_id,) in db.session.query(Requirement.id).filter(
+            Requirement.project_id == project_id, Requirement.requirement_id.like('BENCH-%'))]
+        update_requirements([{'id': row_id, 'status': 'analyzed', 'conflicts_with': [], 'estimated_effort': 8}
+                             for row_id in ids])
+        db.session.commit()
+
+    count = len(rows)
+    clear(project_id)
+    timed('ORM add + commit per row (before)', count, orm_add_each)
+    timed('ORM update per row (before)', count, orm_update_each)
+    clear(project_id)
+    timed('ORM add_all, one commit', count, orm_add_all)
+    clear(project_id)
+    timed('bulk insert (executemany)', count, bulk_insert)
+    timed('bulk update (executemany)', count, bulk_update)
+    clear(project_id)
+    copy = ' (COPY)' if db.engine.dialect.name == 'postgresql' and count >= COPY_MIN_ROWS else ''
+    timed(f'bulk upsert, new rows{copy}', count, upsert_new)
+    timed(f'bulk upsert, existing rows{copy}', count, upsert_existing)
+    clear(project_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--database-url')
+    parser.add_argument('--project-id', type=int, default=1)
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    scratch = None
+    if not database_url:
+        scratch = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False).name
+        database_url = f"sqlite:///{scratch}"
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    db.init_app(app)
+
+    with app.app_context():
+        if scratch:
+            # Only the requirement table is needed; SQLite does not enforce its foreign keys
+            Requirement.__table__.create(db.engine, checkfirst=True)
+        print(f"{db.engine.dialect.name}, {args.rows} requirements")
+        run(make_rows(args.rows, args.project_id), args.project_id)
+
+    if scratch:
+        os.remove(scratch)
+
+
+if __name__ == '__main__':
+    main()
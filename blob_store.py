@@ -0,0 +1,48 @@
+# blob_store.py - Content-addressed storage for uploaded documents
+import os
+import uuid
+
+BLOB_DIR = 'blobs'
+INCOMING_DIR = '.incoming'
+
+
+class BlobStore:
+    """Stores one copy of each file, addressed by its SHA-256 hash
+
+    Blobs are laid out as ``blobs/ab/cd/abcd...`` under the upload folder.
+    Several Document rows may point at the same blob, so blobs are never
+    removed when a single document goes away.
+    """
+
+    def __init__(self, upload_folder: str):
+        self.upload_folder = upload_folder
+        self.root = os.path.join(upload_folder, BLOB_DIR)
+
+    def path_for(self, file_hash: str) -> str:
+        """Return the on-disk path for a blob hash"""
+
+        if len(file_hash) != 64 or any(c not in '0123456789abcdef' for c in file_hash):
+            raise ValueError(f"Invalid SHA-256 hash: {file_hash}")
+        return os.path.join(self.root, file_hash[:2], file_hash[2:4], file_hash)
+
+    def incoming_path(self) -> str:
+        """Return a scratch path for a file whose hash is not yet known"""
+
+        incoming = os.path.join(self.upload_folder, INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        return os.path.join(incoming, str(uuid.uuid4()))
+
+    def ingest(self, temp_path: str, file_hash: str) -> str:
+        """Move a freshly written file into the store, dropping it if the blob exists"""
+
+        blob_path = self.path_for(file_hash)
+
+        if os.path.exists(blob_path):
+            os.remove(temp_path)
+            return blob_path
+
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        # os.replace is atomic, so a concurrent ingest of the same content
+        # simply overwrites an identical file
+        os.replace(temp_path, blob_path)
+        return blob_path
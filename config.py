@@ -14,11 +14,73 @@ class Config:
     # File upload settings
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB
+    UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024  # 5MB per resumable chunk
+    MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE') or 500 * 1024 * 1024)
+
+    # Document text extraction
+    PDF_EXTRACTION_WORKERS = int(os.environ.get('PDF_EXTRACTION_WORKERS') or os.cpu_count() or 2)
+    PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES') or 20)
+    PDF_PAGES_PER_TASK = int(os.environ.get('PDF_PAGES_PER_TASK') or 25)
+    OCR_MIN_PAGE_CHARS = int(os.environ.get('OCR_MIN_PAGE_CHARS') or 20)
+    OCR_DPI = int(os.environ.get('OCR_DPI') or 300)
+    OCR_LANGUAGES = os.environ.get('OCR_LANGUAGES') or 'eng+ara'
+    OCR_CACHE_DIR = os.environ.get('OCR_CACHE_DIR') or 'cache/ocr'
+    EXTRACTION_CACHE_DIR = os.environ.get('EXTRACTION_CACHE_DIR') or 'cache/extraction'
+    # Strip running headers/footers and normalize whitespace in PDF and OCR text
+    EXTRACTION_NORMALIZE = os.environ.get('EXTRACTION_NORMALIZE', 'true').lower() == 'true'
+    SPREADSHEET_ROWS_PER_PAGE = int(os.environ.get('SPREADSHEET_ROWS_PER_PAGE') or 200)
 
     # AI API keys
     ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY')
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
 
+    # Shared LLM HTTP connection pool
+    LLM_MAX_CONNECTIONS = int(os.environ.get('LLM_MAX_CONNECTIONS') or 20)
+    LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('LLM_MAX_KEEPALIVE_CONNECTIONS') or 10)
+    LLM_KEEPALIVE_EXPIRY = float(os.environ.get('LLM_KEEPALIVE_EXPIRY') or 60.0)
+    LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT') or 600.0)
+    LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES') or 2)
+
+    # LLM call scheduling and provider rate limits
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY') or 8)
+    ANTHROPIC_REQUESTS_PER_MINUTE = int(os.environ.get('ANTHROPIC_REQUESTS_PER_MINUTE') or 50)
+    ANTHROPIC_TOKENS_PER_MINUTE = int(os.environ.get('ANTHROPIC_TOKENS_PER_MINUTE') or 80000)
+    OPENAI_REQUESTS_PER_MINUTE = int(os.environ.get('OPENAI_REQUESTS_PER_MINUTE') or 500)
+    OPENAI_TOKENS_PER_MINUTE = int(os.environ.get('OPENAI_TOKENS_PER_MINUTE') or 150000)
+
+    # Requirement extraction chunking (estimated tokens)
+    EXTRACTION_CHUNK_TOKENS = int(os.environ.get('EXTRACTION_CHUNK_TOKENS') or 12000)
+    EXTRACTION_CHUNK_OVERLAP = int(os.environ.get('EXTRACTION_CHUNK_OVERLAP') or 300)
+    REQUIREMENT_PREFILTER = os.environ.get('REQUIREMENT_PREFILTER', 'true').lower() == 'true'
+    # Estimated Jaccard similarity above which a requirement is linked to an earlier copy
+    REQUIREMENT_DEDUP_THRESHOLD = float(os.environ.get('REQUIREMENT_DEDUP_THRESHOLD') or 0.7)
+    # Conflict analysis: lexical similarity a requirement pair needs to be checked, and requirements per prompt
+    CONFLICT_SIMILARITY = float(os.environ.get('CONFLICT_SIMILARITY') or 0.2)
+    CONFLICT_GROUP_SIZE = int(os.environ.get('CONFLICT_GROUP_SIZE') or 30)
+    # Source passages retrieved into each conflict check, and their token budget (0 passages disables)
+    CONFLICT_CONTEXT_PASSAGES = int(os.environ.get('CONFLICT_CONTEXT_PASSAGES') or 3)
+    CONFLICT_CONTEXT_TOKENS = int(os.environ.get('CONFLICT_CONTEXT_TOKENS') or 1200)
+
+    # Local vector search over document pages and requirements, saved per project
+    VECTOR_INDEX_DIR = os.environ.get('VECTOR_INDEX_DIR') or 'cache/vectors'
+    VECTOR_SEARCH_K = int(os.environ.get('VECTOR_SEARCH_K') or 10)
+
+    # LLM response cache
+    LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+    LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH') or 'cache/llm_cache.sqlite3'
+    LLM_CACHE_MEMORY_ENTRIES = int(os.environ.get('LLM_CACHE_MEMORY_ENTRIES') or 256)
+    LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL') or 7 * 24 * 3600)
+    LLM_CACHE_MAX_BYTES = int(os.environ.get('LLM_CACHE_MAX_BYTES') or 512 * 1024 * 1024)
+
+    # Background task queue
+    REDIS_URL = os.environ.get('REDIS_URL')
+    TASK_QUEUE_BACKEND = os.environ.get('TASK_QUEUE_BACKEND') or ('celery' if REDIS_URL else 'thread')
+    TASK_WORKER_CONCURRENCY = int(os.environ.get('TASK_WORKER_CONCURRENCY') or 4)
+    TASK_POLL_INTERVAL = float(os.environ.get('TASK_POLL_INTERVAL') or 2.0)
+    TASK_LEASE_SECONDS = int(os.environ.get('TASK_LEASE_SECONDS') or 300)
+    TASK_MAX_ATTEMPTS = int(os.environ.get('TASK_MAX_ATTEMPTS') or 3)
+    TASK_RECLAIM_INTERVAL = float(os.environ.get('TASK_RECLAIM_INTERVAL') or 30.0)
+
     # Session settings
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
 
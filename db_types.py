@@ -0,0 +1,86 @@
+# db_types.py - Compressed column types for large text and JSON payloads
+import gzip
+import json
+from typing import Any, Optional
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+try:
+    import zstandard
+except ImportError:  # gzip is always available
+    zstandard = None
+
+# First byte of every stored value names its encoding. Plain UTF-8 text
+# never starts with these, so a value without one is read back as is;
+# migrations/compress_payloads.py re-encodes rows from the old columns.
+RAW = b'\x00'
+GZIP = b'\x01'
+ZSTD = b'\x02'
+
+# Below this size compression does not pay for its CPU
+COMPRESS_MIN_BYTES = 512
+
+
+def compress_bytes(data: bytes) -> bytes:
+    if len(data) < COMPRESS_MIN_BYTES:
+        return RAW + data
+    if zstandard is not None:
+        return ZSTD + zstandard.ZstdCompressor(level=3).compress(data)
+    return GZIP + gzip.compress(data, compresslevel=6)
+
+
+def decompress_bytes(blob: bytes) -> bytes:
+    header, body = blob[:1], blob[1:]
+    if header == RAW:
+        return body
+    if header == GZIP:
+        return gzip.decompress(body)
+    if header == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Value was compressed with zstd but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(body)
+    return blob
+
+
+class CompressedText(TypeDecorator):
+    """Text stored compressed in a binary column, transparently to the ORM"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        return compress_bytes(value.encode('utf-8'))
+
+    def process_result_value(self, value, dialect) -> Optional[str]:
+        if value is None:
+            return None
+        if isinstance(value, str):
+            return value
+        return decompress_bytes(bytes(value)).decode('utf-8')
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON document stored compressed in a binary column
+
+    Like the plain JSON type, in-place mutation is not tracked; assign a new
+    value to persist changes.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        return compress_bytes(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+    def process_result_value(self, value, dialect) -> Any:
+        if value is None:
+            return None
+        if isinstance(value, (dict, list)):
+            return value
+        if isinstance(value, str):
+            return json.loads(value)
+        return json.loads(decompress_bytes(bytes(value)))
@@ -0,0 +1,330 @@
+# dependency_graph.py - requirement dependency graphs, cached per project
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+
+from models import db, Requirement
+
+
+def dependency_ids(value: Any) -> List[str]:
+    """Requirement ids named in a ``Requirement.dependencies`` JSON value
+
+    Analysis output is not always consistent, so plain ids and objects with
+    a ``requirement_id`` or ``id`` key are both accepted.
+    """
+
+    items = value if isinstance(value, list) else [value] if value else []
+    ids = []
+    for item in items:
+        if isinstance(item, dict):
+            item = item.get('requirement_id') or item.get('id')
+        if item is not None and str(item).strip():
+            ids.append(str(item).strip())
+    return ids
+
+
+def _bits(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class DependencyGraph:
+    """Adjacency sets of a project's requirement dependencies
+
+    An edge A -> B means A depends on B, so B has to be delivered first.
+    Nodes are requirement ids. References to ids that are not in the graph
+    are kept (and reported as missing) but ignored by the graph algorithms.
+    Strongly connected components, build order and transitive closure are
+    computed together in one pass and reused until the graph changes.
+    """
+
+    def __init__(self):
+        self.depends_on: Dict[str, Set[str]] = {}
+        self.dependents: Dict[str, Set[str]] = {}
+        self.weights: Dict[str, float] = {}
+        self._derived: Optional[Dict[str, Any]] = None
+
+    def __len__(self) -> int:
+        return len(self.depends_on)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self.depends_on
+
+    @property
+    def edge_count(self) -> int:
+        return sum(len(targets) for targets in self.depends_on.values())
+
+    def copy(self) -> 'DependencyGraph':
+        graph = DependencyGraph()
+        graph.depends_on = {node: set(targets) for node, targets in self.depends_on.items()}
+        graph.dependents = {node: set(sources) for node, sources in self.dependents.items()}
+        graph.weights = dict(self.weights)
+        graph._derived = self._derived
+        return graph
+
+    def set_node(self, node: str, depends_on: Iterable[str] = (), weight: float = 1.0) -> bool:
+        """Add or update one requirement, touching only the edges that changed"""
+
+        new = set(depends_on) - {node}
+        old = self.depends_on.get(node)
+        if old == new and self.weights.get(node) == weight:
+            return False
+
+        old = old or set()
+        for target in old - new:
+            self.dependents[target].discard(node)
+        for target in new - old:
+            self.dependents.setdefault(target, set()).add(node)
+        self.depends_on[node] = new
+        self.dependents.setdefault(node, set())
+        self.weights[node] = weight
+        self._derived = None
+        return True
+
+    def remove_node(self, node: str) -> bool:
+        if node not in self.depends_on:
+            return False
+
+        for target in self.depends_on.pop(node):
+            self.dependents[target].discard(node)
+        self.weights.pop(node, None)
+        # Requirements still pointing here now hold a missing reference
+        if not self.dependents.get(node):
+            self.dependents.pop(node, None)
+        self._derived = None
+        return True
+
+    def _targets(self, node: str) -> List[str]:
+        return [target for target in self.depends_on[node] if target in self.depends_on]
+
+    def _derive(self) -> Dict[str, Any]:
+        """Components in dependency-first order, with reachability bitsets
+
+        Tarjan's algorithm (iterative, so deep chains do not hit the
+        recursion limit) emits a component only after everything it depends
+        on, which is exactly build order.
+        """
+
+        if self._derived is not None:
+            return self._derived
+
+        index: Dict[str, int] = {}
+        low: Dict[str, int] = {}
+        stack: List[str] = []
+        on_stack: Set[str] = set()
+        components: List[List[str]] = []
+
+        for root in sorted(self.depends_on):
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self._targets(root)))]
+
+            while work:
+                node, targets = work[-1]
+                for target in targets:
+                    if target not in index:
+                        index[target] = low[target] = len(index)
+                        stack.append(target)
+                        on_stack.add(target)
+                        work.append((target, iter(self._targets(target))))
+                        break
+                    if target in on_stack:
+                        low[node] = min(low[node], index[target])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(sorted(component))
+
+        order = [node for component in components for node in component]
+        position = {node: number for number, node in enumerate(order)}
+        component_of = {node: number for number, component in enumerate(components) for node in component}
+
+        # Reachable nodes per component as int bitsets over ``order``
+        reach: List[int] = []
+        for number, component in enumerate(components):
+            mask = 0
+            if len(component) > 1:
+                for member in component:
+                    mask |= 1 << position[member]
+            for member in component:
+                for target in self._targets(member):
+                    other = component_of[target]
+                    if other != number:
+                        mask |= reach[other] | (1 << position[target])
+            reach.append(mask)
+
+        self._derived = {
+            'components': components,
+            'order': order,
+            'component_of': component_of,
+            'reach': reach,
+        }
+        return self._derived
+
+    def topological_order(self) -> List[str]:
+        """Requirements with dependencies first; members of a cycle are kept together"""
+        return list(self._derive()['order'])
+
+    def cycles(self) -> List[List[str]]:
+        """Groups of requirements that depend on each other"""
+        return [component for component in self._derive()['components'] if len(component) > 1]
+
+    def missing(self) -> Dict[str, List[str]]:
+        """Referenced ids that are not requirements, with the requirements naming them"""
+
+        return {target: sorted(sources) for target, sources in self.dependents.items()
+                if target not in self.depends_on and sources}
+
+    def dependencies_of(self, node: str) -> List[str]:
+        """Everything ``node`` needs, directly or transitively, in build order"""
+
+        if node not in self.depends_on:
+            return []
+        derived = self._derive()
+        order = derived['order']
+        return [order[bit] for bit in sorted(_bits(derived['reach'][derived['component_of'][node]]))
+                if order[bit] != node]
+
+    def closure_sizes(self) -> Dict[str, int]:
+        """Number of transitive dependencies per requirement"""
+
+        derived = self._derive()
+        sizes = {}
+        for node, number in derived['component_of'].items():
+            size = bin(derived['reach'][number]).count('1')
+            sizes[node] = size - 1 if len(derived['components'][number]) > 1 else size
+        return sizes
+
+    def impact(self, node: str) -> Dict[str, int]:
+        """Requirements affected if ``node`` changes, with their distance from it"""
+
+        distances: Dict[str, int] = {}
+        queue = deque([(node, 0)])
+        while queue:
+            current, distance = queue.popleft()
+            for source in self.dependents.get(current, ()):
+                if source != node and source not in distances:
+                    distances[source] = distance + 1
+                    queue.append((source, distance + 1))
+        return distances
+
+    def critical_path(self) -> Dict[str, Any]:
+        """Longest chain of dependent requirements, weighted by estimated effort
+
+        A cycle counts as one step carrying the effort of all its members.
+        """
+
+        derived = self._derive()
+        components = derived['components']
+        component_of = derived['component_of']
+        finish: List[float] = []
+        previous: List[Optional[int]] = []
+
+        for number, component in enumerate(components):
+            best, best_from = 0.0, None
+            for member in component:
+                for target in self._targets(member):
+                    other = component_of[target]
+                    if other != number and finish[other] > best:
+                        best, best_from = finish[other], other
+            finish.append(best + sum(self.weights.get(member, 1.0) for member in component))
+            previous.append(best_from)
+
+        if not components:
+            return {'path': [], 'effort': 0, 'length': 0}
+
+        end = max(range(len(components)), key=finish.__getitem__)
+        chain = []
+        current = end
+        while current is not None:
+            chain.append(current)
+            current = previous[current]
+
+        path = [node for number in reversed(chain) for node in components[number]]
+        return {'path': path, 'effort': finish[end], 'length': len(path)}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'nodes': len(self),
+            'edges': self.edge_count,
+            'cycles': self.cycles(),
+            'missing': self.missing(),
+            'critical_path': self.critical_path(),
+        }
+
+
+class _CachedGraph:
+    def __init__(self, graph: DependencyGraph, count: int, updated_at):
+        self.graph = graph
+        self.count = count
+        self.updated_at = updated_at
+
+
+_graphs: Dict[int, _CachedGraph] = {}
+_graphs_lock = threading.Lock()
+
+
+def _weight(effort: Optional[int]) -> float:
+    return float(effort) if effort and effort > 0 else 1.0
+
+
+def _project_rows(project_id: int, since=None):
+    query = db.session.query(Requirement.requirement_id, Requirement.dependencies, Requirement.estimated_effort) \
+        .filter(Requirement.project_id == project_id)
+    if since is not None:
+        query = query.filter(Requirement.updated_at >= since)
+    return query.yield_per(1000)
+
+
+def project_graph(project_id: int) -> DependencyGraph:
+    """Dependency graph of a project, kept in memory between calls
+
+    A cheap count/latest-update query tells whether requirements changed
+    since the cached graph was built. Edited rows are applied one by one to
+    a copy of the cached graph; if the node count then disagrees with the
+    number of distinct ids (deletes, renamed ids) it is rebuilt instead.
+    Treat the returned graph as read-only.
+    """
+
+    count, updated_at = db.session.query(func.count(func.distinct(Requirement.requirement_id)),
+                                         func.max(Requirement.updated_at)) \
+        .filter(Requirement.project_id == project_id).one()
+
+    with _graphs_lock:
+        cached = _graphs.get(project_id)
+    if cached and cached.count == count and cached.updated_at == updated_at:
+        return cached.graph
+
+    graph = None
+    if cached and cached.updated_at is not None:
+        graph = cached.graph.copy()
+        for row in _project_rows(project_id, since=cached.updated_at):
+            graph.set_node(row.requirement_id, dependency_ids(row.dependencies), _weight(row.estimated_effort))
+        if len(graph) != count:
+            graph = None
+
+    if graph is None:
+        graph = DependencyGraph()
+        for row in _project_rows(project_id):
+            graph.set_node(row.requirement_id, dependency_ids(row.dependencies), _weight(row.estimated_effort))
+
+    with _graphs_lock:
+        _graphs[project_id] = _CachedGraph(graph, count, updated_at)
+    return graph
@@ -0,0 +1,90 @@
+# extraction/cache.py
+import os
+import json
+import time
+import uuid
+import shutil
+from typing import Dict, Any, Iterable, Iterator, Optional
+
+from config import Config
+
+
+def cache_path(file_hash: str, extractor: str, version: str) -> str:
+    """Entries live under one directory per extractor version"""
+    return os.path.join(Config.EXTRACTION_CACHE_DIR, extractor, version, file_hash[:2], f"{file_hash}.jsonl")
+
+
+def iter_cached_pages(file_hash: str, extractor: str, version: str) -> Optional[Iterator[Dict[str, Any]]]:
+    """Iterator over the cached pages for this file and extractor version, or None
+
+    Entries are JSON lines (a header, then one page per line) so they can be
+    read back without loading the whole document.
+    """
+
+    if not file_hash:
+        return None
+
+    try:
+        f = open(cache_path(file_hash, extractor, version), encoding='utf-8')
+    except OSError:
+        return None
+
+    def pages():
+        with f:
+            f.readline()
+            for line in f:
+                yield json.loads(line)
+
+    return pages()
+
+
+def cache_pages(pages: Iterable[Dict[str, Any]], file_hash: str, extractor: str,
+                version: str) -> Iterator[Dict[str, Any]]:
+    """Pass pages through while writing them to the cache
+
+    The entry only becomes visible once every page has been seen, so an
+    interrupted extraction or one with failed OCR pages leaves nothing behind.
+    """
+
+    if not file_hash:
+        yield from pages
+        return
+
+    path = cache_path(file_hash, extractor, version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    complete = False
+    cacheable = True
+
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'file_hash': file_hash, 'extractor': extractor,
+                                'version': version, 'created_at': time.time()}) + "\n")
+            for page in pages:
+                cacheable = cacheable and not page.get('ocr_failed')
+                f.write(json.dumps(page) + "\n")
+                yield page
+        complete = True
+    finally:
+        if complete and cacheable:
+            os.replace(tmp_path, path)
+        else:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def purge_stale_versions(extractor: str, current_version: str) -> int:
+    """Delete entries written by older versions of one extractor"""
+
+    root = os.path.join(Config.EXTRACTION_CACHE_DIR, extractor)
+    if not os.path.isdir(root):
+        return 0
+
+    removed = 0
+    for version in os.listdir(root):
+        if version != current_version:
+            shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+            removed += 1
+    return removed
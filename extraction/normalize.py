@@ -0,0 +1,96 @@
+# extraction/normalize.py
+import re
+from collections import Counter, deque
+from typing import Dict, Any, Iterable, Iterator, List, Set
+
+# Non-blank lines at the top and bottom of a page checked for running headers and footers
+EDGE_LINES = 3
+# Pages read ahead before the first is released, so repeats are known from the start
+LOOKAHEAD_PAGES = 8
+# An edge line is boilerplate once it repeats on half the pages seen so far
+# (16 at most, so chapter headers in long documents count) and on at least three
+MIN_REPEATS = 3
+REPEAT_SHARE = 0.5
+
+DIGITS = re.compile(r'\d+')
+SPACES = re.compile(r'[ \t\u00a0]+')
+# Lines that change from page to page only by their page number: "Page 3 of 40", "RFP-17 | 3/40"
+PAGE_REFERENCE = re.compile(r'\bpage\s*\d+|\b\d+\s*(?:of|/)\s*\d+\b', re.IGNORECASE)
+# "12", "- 12 -", "Page 12", "Page 12 of 40", "12/40"
+PAGE_NUMBER_LINE = re.compile(r'^(?:page\s*)?[-–—(\[]?\s*\d{1,4}\s*[-–—)\]]?(?:\s*(?:of|/)\s*\d{1,4})?$', re.IGNORECASE)
+# A word split across a line break: "require-\nments"
+HYPHENATED_BREAK = re.compile(r'(\w)-[ \t]*\n[ \t]*([a-z])')
+BLANK_RUNS = re.compile(r'\n{3,}')
+
+
+def _line_keys(line: str) -> List[str]:
+    key = SPACES.sub(' ', line.strip().lower())
+    if not key:
+        return []
+    # Page numbers vary from page to page; compare the rest
+    return [key, DIGITS.sub('#', key)] if PAGE_REFERENCE.search(key) else [key]
+
+
+def _edge_indices(lines: List[str]) -> List[int]:
+    filled = [index for index, line in enumerate(lines) if line.strip()]
+    return sorted(set(filled[:EDGE_LINES] + filled[-EDGE_LINES:]))
+
+
+def normalize_text(text: str) -> str:
+    """Join hyphenated line breaks, collapse runs of spaces and blank lines"""
+
+    text = HYPHENATED_BREAK.sub(r'\1\2', text)
+    lines = [SPACES.sub(' ', line).strip() for line in text.split("\n")]
+    return BLANK_RUNS.sub("\n\n", "\n".join(lines)).strip()
+
+
+def strip_boilerplate(pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Remove running headers, footers and page numbers, then normalize whitespace
+
+    A line near the top or bottom of a page is dropped when the same line
+    sits at a page edge on several pages, or when it is just a page number.
+    Lines with a page reference ("Page 3 of 40") are compared with their
+    digits masked; other numbered lines such as "Section 3" must repeat
+    verbatim. Pages are held a few at a time so the first pages
+    already know what repeats later. Cleaned pages carry ``raw_chars`` and
+    ``boilerplate_lines`` for reporting. Pages from structured extractors
+    (those with ``blocks``) have no running headers and pass through as-is.
+    """
+
+    counts: Counter = Counter()
+    seen = 0
+    held = deque()
+
+    def threshold() -> float:
+        return max(MIN_REPEATS, REPEAT_SHARE * min(seen, LOOKAHEAD_PAGES * 2))
+
+    def clean(page: Dict[str, Any], lines: List[str], edges: List[int]) -> Dict[str, Any]:
+        limit = threshold()
+        dropped: Set[int] = {
+            index for index in edges
+            if PAGE_NUMBER_LINE.match(lines[index].strip())
+            or any(counts[key] >= limit for key in _line_keys(lines[index]))
+        }
+        raw_chars = len(page['text'])
+        page['text'] = normalize_text("\n".join(line for index, line in enumerate(lines) if index not in dropped))
+        page['raw_chars'] = raw_chars
+        page['boilerplate_lines'] = len(dropped)
+        return page
+
+    for page in pages:
+        if page.get('blocks') is not None:
+            while held:
+                yield clean(*held.popleft())
+            yield page
+            continue
+
+        lines = page['text'].split("\n")
+        edges = _edge_indices(lines)
+        counts.update({key for index in edges for key in _line_keys(lines[index])})
+        seen += 1
+        held.append((page, lines, edges))
+        if len(held) > LOOKAHEAD_PAGES:
+            yield clean(*held.popleft())
+
+    while held:
+        yield clean(*held.popleft())
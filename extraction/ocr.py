@@ -0,0 +1,147 @@
+# extraction/ocr.py
+import os
+import re
+import time
+import hashlib
+import tempfile
+import subprocess
+from collections import deque
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+import pytesseract
+from PIL import Image
+
+from config import Config
+from extraction.pool import get_process_pool
+
+# Bump when a change alters OCR output, to invalidate cached pages
+EXTRACTOR_VERSION = '1'
+
+
+def needs_ocr(page: Dict[str, Any]) -> bool:
+    """A page with (almost) no text layer is most likely a scan"""
+    return len((page.get('text') or '').strip()) < Config.OCR_MIN_PAGE_CHARS
+
+
+def pdf_page_count(file_path: str) -> int:
+    """Page count via poppler, for PDFs PyPDF2 cannot open"""
+
+    output = subprocess.run(['pdfinfo', file_path], capture_output=True, text=True, check=True).stdout
+    match = re.search(r'^Pages:\s+(\d+)', output, re.MULTILINE)
+    if not match:
+        raise ValueError(f"Could not read page count of {file_path}")
+    return int(match.group(1))
+
+
+def rasterize_page(file_path: str, page_number: int, dpi: int) -> bytes:
+    """Render a single PDF page to PNG bytes with pdftoppm"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prefix = os.path.join(tmp_dir, 'page')
+        subprocess.run(
+            ['pdftoppm', '-f', str(page_number), '-l', str(page_number), '-r', str(dpi),
+             '-png', '-singlefile', file_path, prefix],
+            check=True, capture_output=True
+        )
+        with open(prefix + '.png', 'rb') as f:
+            return f.read()
+
+
+def _cache_path(image_hash: str) -> str:
+    return os.path.join(Config.OCR_CACHE_DIR, image_hash[:2], f"{image_hash}.txt")
+
+
+def ocr_pdf_page(file_path: str, page_number: int) -> Dict[str, Any]:
+    """Rasterize and OCR one page; runs inside a pool worker
+
+    OCR output is cached by the hash of the rendered page image, so
+    re-processing the same scan is free even across different files.
+    """
+
+    began = time.perf_counter()
+    image_bytes = rasterize_page(file_path, page_number, Config.OCR_DPI)
+    image_hash = hashlib.sha256(image_bytes).hexdigest()
+    cache_path = _cache_path(image_hash)
+
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding='utf-8') as f:
+            text = f.read()
+        cached = True
+    else:
+        with tempfile.NamedTemporaryFile(suffix='.png') as tmp:
+            tmp.write(image_bytes)
+            tmp.flush()
+            text = pytesseract.image_to_string(Image.open(tmp.name), lang=Config.OCR_LANGUAGES)
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, cache_path)
+        cached = False
+
+    return {
+        'page': page_number,
+        'text': text,
+        'seconds': round(time.perf_counter() - began, 4),
+        'source': 'ocr',
+        'ocr_cached': cached
+    }
+
+
+def _resolve(file_path: str, page: Dict[str, Any], future) -> Dict[str, Any]:
+    if not needs_ocr(page):
+        return page
+    try:
+        return future.result() if future is not None else ocr_pdf_page(file_path, page['page'])
+    except Exception as e:
+        # Keep the (empty) text layer and flag the page rather than lose the document
+        page['ocr_failed'] = True
+        page['ocr_error'] = str(e)
+        return page
+
+
+def iter_ocr_missing_pages(file_path: str, pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """OCR only the pages without a usable text layer, yielding pages in order
+
+    Text-less pages are sent to the process pool as they arrive and pages
+    are released as soon as everything before them is done, with at most a
+    bounded window of pages held back. Pages whose OCR failed are yielded
+    with ``ocr_failed`` set.
+    """
+
+    pool = get_process_pool()
+    window = Config.PDF_EXTRACTION_WORKERS * 2
+    pending = deque()
+
+    try:
+        for page in pages:
+            page.setdefault('source', 'text')
+            future = pool.submit(ocr_pdf_page, file_path, page['page']) if pool and needs_ocr(page) else None
+            pending.append((page, future))
+
+            while pending and (len(pending) > window or pending[0][1] is None or pending[0][1].done()):
+                yield _resolve(file_path, *pending.popleft())
+
+        while pending:
+            yield _resolve(file_path, *pending.popleft())
+    finally:
+        for _, future in pending:
+            if future is not None:
+                future.cancel()
+
+
+def iter_ocr_pdf(file_path: str, page_count: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """OCR every page of a PDF whose text layer could not be read at all"""
+
+    page_count = page_count or pdf_page_count(file_path)
+    blank_pages = ({'page': number, 'text': ''} for number in range(1, page_count + 1))
+    yield from iter_ocr_missing_pages(file_path, blank_pages)
+
+
+def ocr_image(file_path: str) -> List[Dict[str, Any]]:
+    """OCR a standalone image file as a single page"""
+
+    began = time.perf_counter()
+    text = pytesseract.image_to_string(Image.open(file_path), lang=Config.OCR_LANGUAGES)
+    return [{'page': 1, 'text': text, 'seconds': round(time.perf_counter() - began, 4), 'source': 'ocr'}]
@@ -0,0 +1,184 @@
+# extraction/pages.py
+import asyncio
+import logging
+import threading
+import itertools
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from config import Config
+from extraction import ocr as ocr_extractor, pdf as pdf_extractor, word as word_extractor
+from extraction import slides as slides_extractor, spreadsheet as spreadsheet_extractor
+from extraction.cache import cache_pages, iter_cached_pages, purge_stale_versions
+from extraction.normalize import strip_boilerplate
+from extraction.ocr import iter_ocr_missing_pages, iter_ocr_pdf, ocr_image
+from extraction.pdf import iter_pdf_pages
+from extraction.slides import iter_slide_pages
+from extraction.spreadsheet import iter_spreadsheet_pages
+from extraction.word import iter_word_pages
+
+logger = logging.getLogger(__name__)
+
+WORD_MIME_TYPES = ['application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document']
+SPREADSHEET_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+SLIDES_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+# Binary Office formats we accept on upload but have no reader for
+LEGACY_OFFICE_TYPES = {
+    'application/msword': 'docx',
+    'application/vnd.ms-excel': 'xlsx',
+    'application/vnd.ms-powerpoint': 'pptx',
+}
+PAGE_SEPARATOR = "\n"
+
+
+class UnsupportedDocumentError(ValueError):
+    """Raised for file formats no extractor can read"""
+    pass
+
+
+def extractor_for(mime_type: str) -> Tuple[str, str]:
+    """Name and version of the extractor used for a MIME type"""
+
+    if mime_type == 'application/pdf':
+        # Scanned pages go through OCR, so both versions shape the output
+        return 'pdf', f"{pdf_extractor.EXTRACTOR_VERSION}+ocr{ocr_extractor.EXTRACTOR_VERSION}"
+    elif mime_type in WORD_MIME_TYPES:
+        return 'word', word_extractor.EXTRACTOR_VERSION
+    elif mime_type == SPREADSHEET_MIME_TYPE:
+        return 'spreadsheet', spreadsheet_extractor.EXTRACTOR_VERSION
+    elif mime_type == SLIDES_MIME_TYPE:
+        return 'slides', slides_extractor.EXTRACTOR_VERSION
+    else:
+        return 'image_ocr', ocr_extractor.EXTRACTOR_VERSION
+
+
+def current_extractors() -> Dict[str, str]:
+    """Version of every extractor, keyed by name"""
+    return dict(extractor_for(mime_type) for mime_type in
+                ('application/pdf', WORD_MIME_TYPES[-1], SPREADSHEET_MIME_TYPE, SLIDES_MIME_TYPE, 'image/png'))
+
+
+def purge_stale_cache() -> int:
+    """Delete cached pages written by extractor versions no longer in use"""
+    return sum(purge_stale_versions(extractor, version) for extractor, version in current_extractors().items())
+
+
+def _iter_pdf(file_path: str) -> Iterator[Dict[str, Any]]:
+    pages = iter_pdf_pages(file_path)
+    try:
+        first = next(pages, None)
+    except Exception as e:
+        # Fallback to OCR of every page; the error travels with the pages
+        logger.warning("Failed to read PDF text layer of %s: %s", file_path, e)
+        for page in iter_ocr_pdf(file_path):
+            page['text_layer_error'] = str(e)
+            yield page
+        return
+
+    if first is not None:
+        # Scanned pages have no text layer; OCR just those
+        yield from iter_ocr_missing_pages(file_path, itertools.chain([first], pages))
+
+
+def iter_raw_pages(file_path: str, mime_type: str) -> Iterator[Dict[str, Any]]:
+    """Run the extractor for ``mime_type``, yielding pages as they are produced"""
+
+    if mime_type in LEGACY_OFFICE_TYPES:
+        raise UnsupportedDocumentError(
+            f"{mime_type} files cannot be read; save the file as .{LEGACY_OFFICE_TYPES[mime_type]}")
+
+    extractor, _ = extractor_for(mime_type)
+    if extractor == 'pdf':
+        yield from _iter_pdf(file_path)
+    elif extractor == 'word':
+        yield from iter_word_pages(file_path)
+    elif extractor == 'spreadsheet':
+        yield from iter_spreadsheet_pages(file_path)
+    elif extractor == 'slides':
+        yield from iter_slide_pages(file_path)
+    else:
+        # Try OCR for image files
+        yield from ocr_image(file_path)
+
+
+def with_offsets(pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Annotate pages with ``start``/``end`` offsets into the joined document text"""
+
+    position = 0
+    for page in pages:
+        page['start'] = position
+        page['end'] = position + len(page['text'])
+        position = page['end'] + len(PAGE_SEPARATOR)
+        yield page
+
+
+def normalized(pages: Iterable[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+    """Pages with boilerplate stripped, unless ``EXTRACTION_NORMALIZE`` is off
+
+    The extraction cache keeps raw pages, so changing the rules never needs
+    a re-extraction.
+    """
+    return strip_boilerplate(pages) if Config.EXTRACTION_NORMALIZE else pages
+
+
+def iter_cached_document_pages(mime_type: str, file_hash: Optional[str]) -> Optional[Iterator[Dict[str, Any]]]:
+    """Previously extracted pages of a file, with offsets, or None if not cached"""
+
+    extractor, version = extractor_for(mime_type)
+    pages = iter_cached_pages(file_hash, extractor, version)
+    if pages is None:
+        return None
+    return with_offsets(normalized(dict(page, cached=True) for page in pages))
+
+
+def iter_document_pages(file_path: str, mime_type: str, file_hash: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Pages of a document with offsets, from the extraction cache when possible
+
+    Freshly extracted pages are written to the cache as they stream past.
+    This blocks, so async callers should use ``aiter_in_thread``.
+    """
+
+    cached = iter_cached_document_pages(mime_type, file_hash)
+    if cached is not None:
+        yield from cached
+        return
+
+    extractor, version = extractor_for(mime_type)
+    yield from with_offsets(normalized(cache_pages(iter_raw_pages(file_path, mime_type), file_hash, extractor, version)))
+
+
+async def aiter_in_thread(make_iterator: Callable[..., Iterable], *args, buffer: int = 4) -> AsyncIterator:
+    """Drive a blocking iterator in a worker thread, at most ``buffer`` items ahead
+
+    Leaving the ``async for`` early stops the producer at its next item.
+    """
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    slots = threading.Semaphore(buffer)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in make_iterator(*args):
+                slots.acquire()
+                if stop.is_set():
+                    return
+                loop.call_soon_threadsafe(queue.put_nowait, (False, item))
+            loop.call_soon_threadsafe(queue.put_nowait, (True, None))
+        except BaseException as e:
+            if not stop.is_set():
+                loop.call_soon_threadsafe(queue.put_nowait, (True, e))
+
+    loop.run_in_executor(None, produce)
+    try:
+        while True:
+            done, item = await queue.get()
+            if done:
+                if item is not None:
+                    raise item
+                return
+            slots.release()
+            yield item
+    finally:
+        stop.set()
+        slots.release()
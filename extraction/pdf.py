@@ -0,0 +1,70 @@
+# extraction/pdf.py
+import time
+from collections import deque
+from typing import Dict, Any, Iterator, List, Tuple
+
+import PyPDF2
+
+from config import Config
+from extraction.pool import get_process_pool
+
+# Bump when a change alters extracted output, to invalidate cached pages
+EXTRACTOR_VERSION = '1'
+
+
+def _iter_page_range(file_path: str, start: int, end: int) -> Iterator[Dict[str, Any]]:
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        for index in range(start, end):
+            began = time.perf_counter()
+            text = reader.pages[index].extract_text() or ''
+            yield {
+                'page': index + 1,
+                'text': text,
+                'seconds': round(time.perf_counter() - began, 4)
+            }
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> List[Dict[str, Any]]:
+    """Extract pages [start, end) of a PDF; runs inside a pool worker"""
+    return list(_iter_page_range(file_path, start, end))
+
+
+def _page_ranges(page_count: int, workers: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    # Several ranges per worker so one slow range does not leave cores idle
+    size = max(1, min(pages_per_task, -(-page_count // (workers * 4))))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def iter_pdf_pages(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Yield every page of a PDF, in order, with per-page timings
+
+    Large documents are split into page ranges and extracted on the shared
+    process pool; each worker opens the file itself so only page text
+    crosses the process boundary. Only a few ranges are in flight at once,
+    so a slow consumer keeps memory bounded. This blocks, so async callers
+    should iterate it in a thread.
+    """
+
+    with open(file_path, 'rb') as f:
+        page_count = len(PyPDF2.PdfReader(f).pages)
+
+    pool = get_process_pool() if page_count >= Config.PDF_PARALLEL_MIN_PAGES else None
+    if pool is None:
+        yield from _iter_page_range(file_path, 0, page_count)
+        return
+
+    ranges = _page_ranges(page_count, Config.PDF_EXTRACTION_WORKERS, Config.PDF_PAGES_PER_TASK)
+    window = Config.PDF_EXTRACTION_WORKERS * 2
+    pending = deque()
+    try:
+        for start, end in ranges:
+            pending.append(pool.submit(extract_page_range, file_path, start, end))
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        # The consumer stopped early; don't leave queued ranges behind
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,31 @@
+# extraction/pool.py
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from config import Config
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared extraction process pool, or None where child processes are not allowed
+
+    Celery prefork workers are daemonic and cannot spawn children. The pool
+    constructor doesn't notice; the first submit() does, so check up front
+    and let callers fall back to working in-process when this returns None.
+    """
+
+    if multiprocessing.current_process().daemon:
+        return None
+
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            try:
+                _pool = ProcessPoolExecutor(max_workers=Config.PDF_EXTRACTION_WORKERS)
+            except (AssertionError, OSError):
+                return None
+        return _pool
@@ -0,0 +1,88 @@
+# extraction/spreadsheet.py
+import time
+import datetime
+from typing import Dict, Any, Iterator, List, Optional
+
+import openpyxl
+
+from config import Config
+
+# Bump when a change alters extracted output, to invalidate cached pages
+EXTRACTOR_VERSION = '1'
+
+
+def _cell_text(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime.datetime) and value.time() == datetime.time():
+        return value.date().isoformat()
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value).strip()
+
+
+def _page(number: int, sheet: str, header: Optional[List[str]], rows: List[List[str]],
+          first_row: int, last_row: int, began: float) -> Dict[str, Any]:
+    # Every page repeats the sheet name and header row so it reads on its own
+    lines = [f"Sheet: {sheet}"]
+    if header is not None and rows and rows[0] is not header:
+        lines.append("\t".join(header))
+    lines.extend("\t".join(row) for row in rows)
+
+    return {
+        'page': number,
+        'text': "\n".join(lines),
+        'seconds': round(time.perf_counter() - began, 4),
+        'sheet': sheet,
+        'rows': [first_row, last_row],
+        'blocks': [{'type': 'table', 'sheet': sheet, 'header': header, 'rows': rows}]
+    }
+
+
+def iter_spreadsheet_pages(file_path: str, rows_per_page: int = None) -> Iterator[Dict[str, Any]]:
+    """Stream an .xlsx workbook as pages of at most ``rows_per_page`` rows
+
+    The workbook is opened read-only so rows are parsed from the sheet XML as
+    they are iterated rather than loaded up front. Empty rows are skipped and
+    cached formula values are used. The first non-empty row of each sheet is
+    treated as its header.
+    """
+
+    rows_per_page = rows_per_page or Config.SPREADSHEET_ROWS_PER_PAGE
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        number = 1
+        for worksheet in workbook.worksheets:
+            header = None
+            rows: List[List[str]] = []
+            first_row = last_row = 0
+            began = time.perf_counter()
+
+            for row_number, values in enumerate(worksheet.iter_rows(values_only=True), start=1):
+                cells = [_cell_text(value) for value in values]
+                while cells and not cells[-1]:
+                    cells.pop()
+                if not cells:
+                    continue
+
+                if header is None:
+                    header = cells
+                if not rows:
+                    first_row = row_number
+                rows.append(cells)
+                last_row = row_number
+
+                if len(rows) >= rows_per_page:
+                    yield _page(number, worksheet.title, header, rows, first_row, last_row, began)
+                    number += 1
+                    rows = []
+                    began = time.perf_counter()
+
+            if rows:
+                yield _page(number, worksheet.title, header, rows, first_row, last_row, began)
+                number += 1
+    finally:
+        # Read-only workbooks keep the archive open until closed
+        workbook.close()
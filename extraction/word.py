@@ -0,0 +1,186 @@
+# extraction/word.py
+import re
+import time
+import zipfile
+from typing import Dict, Any, Iterator, List, Optional
+from xml.etree.ElementTree import iterparse
+
+# Bump when a change alters extracted output, to invalidate cached pages
+EXTRACTOR_VERSION = '2'
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+HEADING_STYLE = re.compile(r'^heading\s*(\d)$', re.IGNORECASE)
+
+
+def _heading_levels(archive: zipfile.ZipFile) -> Dict[str, int]:
+    """Map paragraph style ids to heading levels, following ``basedOn`` chains"""
+
+    try:
+        styles_xml = archive.open('word/styles.xml')
+    except KeyError:
+        return {}
+
+    direct: Dict[str, Optional[int]] = {}
+    based_on: Dict[str, str] = {}
+    with styles_xml:
+        for _, element in iterparse(styles_xml):
+            if element.tag != f'{W}style' or element.get(f'{W}type') != 'paragraph':
+                continue
+
+            style_id = element.get(f'{W}styleId')
+            name = element.find(f'{W}name')
+            outline = element.find(f'{W}pPr/{W}outlineLvl')
+            parent = element.find(f'{W}basedOn')
+
+            match = HEADING_STYLE.match(name.get(f'{W}val', '')) if name is not None else None
+            if match:
+                direct[style_id] = int(match.group(1))
+            elif name is not None and name.get(f'{W}val', '').lower() == 'title':
+                direct[style_id] = 1
+            elif outline is not None and outline.get(f'{W}val', '').isdigit() and int(outline.get(f'{W}val')) < 9:
+                direct[style_id] = int(outline.get(f'{W}val')) + 1
+            if parent is not None:
+                based_on[style_id] = parent.get(f'{W}val')
+            element.clear()
+
+    def level(style_id: str, depth: int = 0) -> Optional[int]:
+        if style_id in direct or depth > 10:
+            return direct.get(style_id)
+        return level(based_on[style_id], depth + 1) if style_id in based_on else None
+
+    return {style_id: level(style_id) for style_id in set(direct) | set(based_on) if level(style_id)}
+
+
+def _block_text(block: Dict[str, Any]) -> str:
+    if block['type'] == 'table':
+        # One line per row, so multi-paragraph cells are flattened
+        return "\n".join("\t".join(cell.replace("\n", " ") for cell in row) for row in block['rows'])
+    return block['text']
+
+
+def iter_word_pages(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Stream a .docx as pages of paragraph, heading and table blocks
+
+    ``word/document.xml`` is iterparsed in reading order and each element is
+    cleared once handled, so memory stays flat however long the document is.
+    Pages follow the page breaks Word rendered last time the file was saved
+    (plus explicit ones). Horizontally merged cells appear once and
+    vertically merged continuation cells are left empty instead of repeating
+    the text.
+    """
+
+    with zipfile.ZipFile(file_path) as archive:
+        heading_levels = _heading_levels(archive)
+
+        page_number = 1
+        blocks: List[Dict[str, Any]] = []
+        began = time.perf_counter()
+
+        def flush() -> Dict[str, Any]:
+            nonlocal blocks, began, page_number
+            page = {
+                'page': page_number,
+                'text': "\n".join(_block_text(block) for block in blocks),
+                'seconds': round(time.perf_counter() - began, 4),
+                'blocks': blocks
+            }
+            page_number += 1
+            blocks = []
+            began = time.perf_counter()
+            return page
+
+        body = None
+        runs: List[str] = []
+        style = None
+        outline = None
+        break_before = False
+        break_after = False
+        # Open tables, innermost last; each holds its rows and the open row/cell
+        tables: List[Dict[str, Any]] = []
+
+        with archive.open('word/document.xml') as document_xml:
+            for event, element in iterparse(document_xml, events=('start', 'end')):
+                tag = element.tag
+
+                if event == 'start':
+                    if tag == f'{W}body':
+                        body = element
+                    elif tag == f'{W}p':
+                        runs = []
+                        style = outline = None
+                    elif tag == f'{W}tbl':
+                        tables.append({'rows': [], 'row': None, 'cell': None})
+                    elif tag == f'{W}tr' and tables:
+                        tables[-1]['row'] = []
+                    elif tag == f'{W}tc' and tables:
+                        tables[-1]['cell'] = {'paragraphs': [], 'continued': False}
+                    continue
+
+                if tag == f'{W}t':
+                    runs.append(element.text or '')
+                elif tag == f'{W}tab':
+                    runs.append("\t")
+                elif tag in (f'{W}br', f'{W}cr'):
+                    if element.get(f'{W}type') == 'page':
+                        break_after = True
+                    else:
+                        runs.append("\n")
+                elif tag == f'{W}lastRenderedPageBreak':
+                    # A break before any text moves the whole paragraph to the next page
+                    if any(runs):
+                        break_after = True
+                    else:
+                        break_before = True
+                elif tag == f'{W}pStyle':
+                    style = element.get(f'{W}val')
+                elif tag == f'{W}outlineLvl':
+                    outline = element.get(f'{W}val')
+                elif tag == f'{W}vMerge' and tables and tables[-1]['cell'] is not None:
+                    tables[-1]['cell']['continued'] = element.get(f'{W}val', 'continue') == 'continue'
+
+                elif tag == f'{W}p':
+                    text = ''.join(runs)
+                    if tables and tables[-1]['cell'] is not None:
+                        tables[-1]['cell']['paragraphs'].append(text)
+                    elif not tables:
+                        if break_before and blocks:
+                            yield flush()
+                        level = heading_levels.get(style)
+                        if level is None and outline is not None and outline.isdigit() and int(outline) < 9:
+                            level = int(outline) + 1
+                        if text.strip():
+                            if level:
+                                blocks.append({'type': 'heading', 'level': level, 'text': text})
+                            else:
+                                blocks.append({'type': 'paragraph', 'text': text})
+                        if break_after:
+                            yield flush()
+                        break_before = break_after = False
+                    element.clear()
+
+                elif tag == f'{W}tc' and tables:
+                    table = tables[-1]
+                    cell = table['cell']
+                    table['row'].append('' if cell['continued'] else "\n".join(cell['paragraphs']).strip())
+                    table['cell'] = None
+                elif tag == f'{W}tr' and tables:
+                    tables[-1]['rows'].append(tables[-1]['row'])
+                    tables[-1]['row'] = None
+                elif tag == f'{W}tbl' and tables:
+                    table = tables.pop()
+                    if tables and tables[-1]['cell'] is not None:
+                        # Nested table: fold its text into the enclosing cell
+                        tables[-1]['cell']['paragraphs'].append(_block_text({'type': 'table', 'rows': table['rows']}))
+                    else:
+                        blocks.append({'type': 'table', 'rows': table['rows']})
+                        if break_before or break_after:
+                            yield flush()
+                            break_before = break_after = False
+                    element.clear()
+
+                if body is not None and not tables and tag in (f'{W}p', f'{W}tbl', f'{W}sectPr'):
+                    # Top-level element handled; drop it from the tree
+                    body.clear()
+
+        if blocks or page_number == 1:
+            yield flush()
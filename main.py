@@ -1 +1,2 @@
 from app import app  # noqa: F401
+from task_queue import celery  # noqa: F401
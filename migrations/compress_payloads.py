@@ -0,0 +1,113 @@
+# migrations/compress_payloads.py
+"""Move the heavy payload columns from Text/JSON to compressed binary
+
+Run once against a database created before the columns became
+CompressedText/CompressedJSON:
+
+    python -m migrations.compress_payloads
+
+Postgres and MySQL columns are altered to a binary type in place (SQLite
+stores whatever it is given, so it needs no ALTER). Existing values are then
+rewritten in batches with a codec header, compressed where large enough.
+Running it again only touches rows that are still in the old format.
+"""
+
+import json
+from typing import Dict, List, Tuple
+
+from sqlalchemy import bindparam, inspect, text
+
+from db_types import GZIP, RAW, ZSTD, CompressedJSON, CompressedText
+
+# (table, column, type)
+PAYLOAD_COLUMNS: List[Tuple[str, str, object]] = [
+    ('document', 'extracted_text', CompressedText()),
+    ('document', 'extracted_metadata', CompressedJSON()),
+    ('agent_task', 'output_data', CompressedJSON()),
+    ('document_chunk', 'text', CompressedText()),
+]
+
+BATCH_SIZE = 500
+
+
+def _alter_to_binary(connection, table: str, column: str) -> bool:
+    """Change a column to the dialect's binary type; False if already binary"""
+
+    current = next(c for c in inspect(connection).get_columns(table) if c['name'] == column)
+    type_name = str(current['type']).upper()
+    dialect = connection.dialect.name
+
+    if dialect == 'postgresql':
+        if type_name == 'BYTEA':
+            return False
+        connection.execute(text(
+            f'ALTER TABLE {table} ALTER COLUMN {column} TYPE BYTEA '
+            f"USING convert_to({column}::text, 'UTF8')"
+        ))
+        return True
+    if dialect == 'mysql':
+        if 'BLOB' in type_name:
+            return False
+        connection.execute(text(f'ALTER TABLE {table} MODIFY {column} LONGBLOB'))
+        return True
+    return False
+
+
+def _is_legacy(value) -> bool:
+    """Stored without a codec header, i.e. written by the old column type"""
+    if isinstance(value, str):
+        return True
+    return bytes(value[:1]) not in (RAW, GZIP, ZSTD)
+
+
+def _legacy_value(value, column_type):
+    raw = value if isinstance(value, str) else bytes(value).decode('utf-8')
+    return json.loads(raw) if isinstance(column_type, CompressedJSON) else raw
+
+
+def _rewrite_values(connection, table: str, column: str, column_type) -> int:
+    """Re-encode old-format values in id order, one batch at a time"""
+
+    select = text(
+        f'SELECT id, {column} FROM {table} '
+        f'WHERE id > :after AND {column} IS NOT NULL ORDER BY id LIMIT :limit'
+    )
+    update = text(f'UPDATE {table} SET {column} = :value WHERE id = :row_id') \
+        .bindparams(bindparam('value', type_=column_type))
+
+    rewritten = 0
+    after = 0
+    while True:
+        rows = connection.execute(select, {'after': after, 'limit': BATCH_SIZE}).all()
+        if not rows:
+            return rewritten
+        after = rows[-1][0]
+        params = [
+            {'row_id': row_id, 'value': _legacy_value(value, column_type)}
+            for row_id, value in rows if _is_legacy(value)
+        ]
+        if params:
+            connection.execute(update, params)
+            rewritten += len(params)
+
+
+def upgrade(engine) -> Dict[str, int]:
+    """Alter and re-encode every payload column; returns rows rewritten per column"""
+
+    existing = set(inspect(engine).get_table_names())
+    rewritten = {}
+    for table, column, column_type in PAYLOAD_COLUMNS:
+        if table not in existing:
+            continue
+        with engine.begin() as connection:
+            _alter_to_binary(connection, table, column)
+            rewritten[f'{table}.{column}'] = _rewrite_values(connection, table, column, column_type)
+    return rewritten
+
+
+if __name__ == '__main__':
+    from app import app, db
+
+    with app.app_context():
+        for name, count in upgrade(db.engine).items():
+            print(f"✅ {name}: {count} rows rewritten")
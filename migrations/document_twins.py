@@ -0,0 +1,34 @@
+# migrations/document_twins.py
+"""Add the columns behind content-addressed uploads and analysis reuse
+
+Run once against a database created before ``document.duplicate_of_id``
+existed:
+
+    python -m migrations.document_twins
+
+Adds ``document.duplicate_of_id`` and the index on ``document.file_hash``
+used to find an analysed twin. Existing documents keep a NULL twin.
+"""
+
+from typing import Dict
+
+from migrations.helpers import add_column, create_index, index_on
+from models import Document
+
+
+def upgrade(engine) -> Dict[str, bool]:
+    """Apply each step that is missing; returns which ones ran"""
+
+    table = Document.__table__
+    return {
+        'document.duplicate_of_id': add_column(engine, table.c.duplicate_of_id),
+        'ix_document_file_hash': create_index(engine, index_on(table.c.file_hash)),
+    }
+
+
+if __name__ == '__main__':
+    from app import app, db
+
+    with app.app_context():
+        for step, applied in upgrade(db.engine).items():
+            print(f"✅ {step}: {'added' if applied else 'already present'}")
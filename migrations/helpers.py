@@ -0,0 +1,43 @@
+# migrations/helpers.py
+"""Idempotent schema steps shared by the migration scripts
+
+``db.create_all()`` creates missing tables but never changes existing ones,
+so columns and indexes added to the models later are applied with these.
+The model definitions stay the single source of the column types.
+"""
+
+from sqlalchemy import Column, Index, inspect, text
+
+
+def add_column(engine, column: Column) -> bool:
+    """Add a model column to its existing table; False if it is already there"""
+
+    table = column.table.name
+    if column.name in {existing['name'] for existing in inspect(engine).get_columns(table)}:
+        return False
+
+    ddl = f"ALTER TABLE {table} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+    if column.server_default is not None:
+        ddl += f" DEFAULT {column.server_default.arg}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+    for foreign_key in column.foreign_keys:
+        ddl += f" REFERENCES {foreign_key.column.table.name} ({foreign_key.column.name})"
+
+    with engine.begin() as connection:
+        connection.execute(text(ddl))
+    return True
+
+
+def index_on(column: Column) -> Index:
+    """The model index declared with ``index=True`` on a column"""
+    return next(index for index in column.table.indexes if list(index.columns) == [column])
+
+
+def create_index(engine, index: Index) -> bool:
+    """Create a model index on an existing table; False if it is already there"""
+
+    if index.name in {existing['name'] for existing in inspect(engine).get_indexes(index.table.name)}:
+        return False
+    index.create(engine)
+    return True
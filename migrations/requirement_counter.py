@@ -0,0 +1,33 @@
+# migrations/requirement_counter.py
+"""Add the per-project requirement number counter
+
+Run once against a database created before ``project.requirement_counter``
+existed:
+
+    python -m migrations.requirement_counter
+
+The column starts at 0; the next extraction of each project raises it past
+the REQ-### numbers already in use before handing out new ones.
+"""
+
+from sqlalchemy import inspect, text
+
+
+def upgrade(engine) -> bool:
+    """Add the column; False if it is already there"""
+
+    if 'requirement_counter' in {column['name'] for column in inspect(engine).get_columns('project')}:
+        return False
+    with engine.begin() as connection:
+        connection.execute(text('ALTER TABLE project ADD COLUMN requirement_counter INTEGER NOT NULL DEFAULT 0'))
+    return True
+
+
+if __name__ == '__main__':
+    from app import app, db
+
+    with app.app_context():
+        if upgrade(db.engine):
+            print("✅ project.requirement_counter added")
+        else:
+            print("✅ project.requirement_counter already present")
@@ -0,0 +1,35 @@
+# migrations/requirement_duplicates.py
+"""Add the near-duplicate link between requirements
+
+Run once against a database created before ``requirement.duplicate_of_id``
+existed:
+
+    python -m migrations.requirement_duplicates
+
+Adds ``duplicate_of_id``, its index and ``duplicate_score``. Existing
+requirements are unflagged until their project is extracted again.
+"""
+
+from typing import Dict
+
+from migrations.helpers import add_column, create_index, index_on
+from models import Requirement
+
+
+def upgrade(engine) -> Dict[str, bool]:
+    """Apply each step that is missing; returns which ones ran"""
+
+    table = Requirement.__table__
+    return {
+        'requirement.duplicate_of_id': add_column(engine, table.c.duplicate_of_id),
+        'requirement.duplicate_score': add_column(engine, table.c.duplicate_score),
+        'ix_requirement_duplicate_of_id': create_index(engine, index_on(table.c.duplicate_of_id)),
+    }
+
+
+if __name__ == '__main__':
+    from app import app, db
+
+    with app.app_context():
+        for step, applied in upgrade(db.engine).items():
+            print(f"✅ {step}: {'added' if applied else 'already present'}")
@@ -0,0 +1,40 @@
+# migrations/requirement_source_chunk.py
+"""Link requirements to the page chunk they were extracted from
+
+Run once against a database created before ``requirement.source_chunk_id``
+existed:
+
+    python -m migrations.requirement_source_chunk
+
+Creates the ``document_chunk`` table if it is missing, since the new column
+references it. Existing requirements keep a NULL chunk until their document
+is extracted again.
+"""
+
+from typing import Dict
+
+from sqlalchemy import inspect
+
+from migrations.helpers import add_column
+from models import DocumentChunk, Requirement
+
+
+def upgrade(engine) -> Dict[str, bool]:
+    """Apply each step that is missing; returns which ones ran"""
+
+    chunks = DocumentChunk.__table__
+    has_chunks = inspect(engine).has_table(chunks.name)
+    if not has_chunks:
+        chunks.create(engine)
+    return {
+        'document_chunk': not has_chunks,
+        'requirement.source_chunk_id': add_column(engine, Requirement.__table__.c.source_chunk_id),
+    }
+
+
+if __name__ == '__main__':
+    from app import app, db
+
+    with app.app_context():
+        for step, applied in upgrade(db.engine).items():
+            print(f"✅ {step}: {'added' if applied else 'already present'}")
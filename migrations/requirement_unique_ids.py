@@ -0,0 +1,62 @@
+# migrations/requirement_unique_ids.py
+"""Make requirement numbers unique per project
+
+Run once against a database created before
+``uq_requirement_project_requirement_id`` existed:
+
+    python -m migrations.requirement_unique_ids
+
+Parallel extractions used to hand out the same REQ-### twice, so existing
+rows may clash. The oldest row keeps each number; later copies are renamed
+``REQ-###-<row id>`` rather than deleted, so nothing already reviewed is
+lost and the clashes stay easy to find. Then the constraint is added.
+"""
+
+from typing import Dict, Union
+
+from sqlalchemy import inspect, text
+
+CONSTRAINT = 'uq_requirement_project_requirement_id'
+REQUIREMENT_ID_LENGTH = 50
+
+
+def _has_constraint(engine) -> bool:
+    inspector = inspect(engine)
+    names = {constraint['name'] for constraint in inspector.get_unique_constraints('requirement')}
+    names.update(index['name'] for index in inspector.get_indexes('requirement'))
+    return CONSTRAINT in names
+
+
+def upgrade(engine) -> Dict[str, Union[int, bool]]:
+    """Rename clashing rows and add the constraint; returns what changed"""
+
+    if _has_constraint(engine):
+        return {'renamed': 0, CONSTRAINT: False}
+
+    with engine.begin() as connection:
+        clashes = connection.execute(text(
+            'SELECT id, requirement_id FROM requirement WHERE id NOT IN '
+            '(SELECT MIN(id) FROM requirement GROUP BY project_id, requirement_id)')).all()
+        for row_id, requirement_id in clashes:
+            suffix = f"-{row_id}"
+            connection.execute(text('UPDATE requirement SET requirement_id = :renamed WHERE id = :id'),
+                               {'renamed': requirement_id[:REQUIREMENT_ID_LENGTH - len(suffix)] + suffix,
+                                'id': row_id})
+
+        if engine.dialect.name == 'sqlite':
+            # SQLite cannot add constraints to an existing table; a unique
+            # index enforces the same rule and serves as the upsert target
+            connection.execute(text(f'CREATE UNIQUE INDEX {CONSTRAINT} ON requirement (project_id, requirement_id)'))
+        else:
+            connection.execute(text(f'ALTER TABLE requirement ADD CONSTRAINT {CONSTRAINT} '
+                                    'UNIQUE (project_id, requirement_id)'))
+    return {'renamed': len(clashes), CONSTRAINT: True}
+
+
+if __name__ == '__main__':
+    from app import app, db
+
+    with app.app_context():
+        result = upgrade(db.engine)
+        print(f"✅ {result['renamed']} clashing requirement numbers renamed")
+        print(f"✅ {CONSTRAINT}: {'added' if result[CONSTRAINT] else 'already present'}")
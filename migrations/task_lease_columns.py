@@ -0,0 +1,49 @@
+# migrations/task_lease_columns.py
+"""Add the lease columns workers use to claim agent tasks
+
+Run once, with the workers stopped, against a database created before
+``agent_task.lease_expires_at`` existed:
+
+    python -m migrations.task_lease_columns
+
+Adds ``lease_owner``, ``lease_expires_at``, ``heartbeat_at`` and
+``attempts`` plus the indexes the claim and reclaim queries filter on.
+Tasks left ``in_progress`` by workers that predate leases have no owner to
+renew them, so they get an already expired lease and the reaper requeues
+them.
+"""
+
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import text
+
+from migrations.helpers import add_column, create_index, index_on
+from models import AgentTask
+
+
+def upgrade(engine) -> Dict[str, bool]:
+    """Apply each step that is missing; returns which ones ran"""
+
+    table = AgentTask.__table__
+    steps = {
+        f"agent_task.{name}": add_column(engine, table.c[name])
+        for name in ('lease_owner', 'lease_expires_at', 'heartbeat_at', 'attempts')
+    }
+    steps['ix_agent_task_status'] = create_index(engine, index_on(table.c.status))
+    steps['ix_agent_task_lease_expires_at'] = create_index(engine, index_on(table.c.lease_expires_at))
+
+    with engine.begin() as connection:
+        connection.execute(text('UPDATE agent_task SET attempts = 0 WHERE attempts IS NULL'))
+        connection.execute(text("UPDATE agent_task SET lease_expires_at = :now "
+                                "WHERE status = 'in_progress' AND lease_expires_at IS NULL"),
+                           {'now': datetime.utcnow()})
+    return steps
+
+
+if __name__ == '__main__':
+    from app import app, db
+
+    with app.app_context():
+        for step, applied in upgrade(db.engine).items():
+            print(f"✅ {step}: {'added' if applied else 'already present'}")
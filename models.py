@@ -6,6 +6,8 @@ from sqlalchemy.orm import DeclarativeBase, relationship
 from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
 
+from db_types import CompressedJSON, CompressedText
+
 class Base(DeclarativeBase):
     pass
 
@@ -46,7 +48,8 @@ class Project(db.Model):
     status = db.Column(db.String(50), default='active')  # active, completed, cancelled, submitted
     priority = db.Column(db.String(20), default='medium')  # high, medium, low
     completion_percentage = db.Column(db.Integer, default=0)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    requirement_counter = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Last REQ-### number reserved
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -84,18 +87,82 @@ class Document(db.Model):
     file_path = db.Column(db.String(500), nullable=False)
     file_size = db.Column(db.Integer)
     mime_type = db.Column(db.String(100))
-    file_hash = db.Column(db.String(64))  # SHA-256 hash
+    file_hash = db.Column(db.String(64), index=True)  # SHA-256 hash, also the blob address
     document_type = db.Column(db.String(100))  # rfp, technical_spec, legal, financial
     processing_status = db.Column(db.String(50), default='uploaded')  # uploaded, processing, completed, failed
-    extracted_text = db.Column(db.Text)
-    extracted_metadata = db.Column(JSON)
+    # Heavy payloads are compressed and only loaded on access or with with_text()
+    extracted_text = db.deferred(db.Column(CompressedText), group='extraction')
+    extracted_metadata = db.deferred(db.Column(CompressedJSON), group='extraction')
     page_count = db.Column(db.Integer)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
-    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    uploaded_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    duplicate_of_id = db.Column(db.Integer, db.ForeignKey('document.id'))  # Twin whose analysis was reused
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
     requirements = db.relationship('Requirement', backref='source_document', lazy=True)
+    chunks = db.relationship('DocumentChunk', backref='document', lazy='dynamic', cascade='all, delete-orphan')
+
+    @staticmethod
+    def with_text():
+        """Loader option that fetches the deferred extraction payloads up front"""
+        return db.undefer_group('extraction')
+
+    @property
+    def has_extracted_text(self):
+        """Whether text was extracted, without loading it"""
+        if 'extracted_text' in self.__dict__:
+            return bool(self.extracted_text)
+        return db.session.query(Document.id).filter(
+            Document.id == self.id, Document.extracted_text.isnot(None)
+        ).first() is not None
+
+    @property
+    def content_document_id(self):
+        """Document whose page and section chunks hold this document's text"""
+        return self.duplicate_of_id or self.id
+
+    @staticmethod
+    def find_analyzed_twin(file_hash, exclude_id=None):
+        """Find a completed document with identical content, its text loaded for reuse"""
+        if not file_hash:
+            return None
+        query = Document.query.options(Document.with_text()) \
+            .filter_by(file_hash=file_hash, processing_status='completed')
+        if exclude_id is not None:
+            query = query.filter(Document.id != exclude_id)
+        return query.order_by(Document.id).first()
+
+    def reuse_analysis_from(self, twin):
+        """Copy extraction results from a twin instead of re-analyzing"""
+        self.extracted_text = twin.extracted_text
+        self.extracted_metadata = twin.extracted_metadata
+        self.page_count = twin.page_count
+        self.document_type = twin.document_type
+        self.duplicate_of_id = twin.duplicate_of_id or twin.id
+        self.processing_status = 'completed'
+
+class DocumentChunk(db.Model):
+    """Per-page and per-section slices of a document's extracted text"""
+    id = db.Column(db.Integer, primary_key=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), nullable=False)
+    chunk_type = db.Column(db.String(20), nullable=False)  # page, section
+    sequence = db.Column(db.Integer, nullable=False)  # Order among chunks of the same type
+    page_number = db.Column(db.Integer)  # Page the chunk starts on
+    end_page_number = db.Column(db.Integer)  # Page a section runs onto
+    start_offset = db.Column(db.Integer, nullable=False)  # Character offsets into Document.extracted_text
+    end_offset = db.Column(db.Integer, nullable=False)
+    heading = db.Column(db.String(500))  # Section heading, or the heading in effect on a page
+    heading_level = db.Column(db.Integer)
+    token_count = db.Column(db.Integer)
+    text = db.deferred(db.Column(CompressedText))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('document_id', 'chunk_type', 'sequence', name='uq_document_chunk_sequence'),
+        db.Index('ix_document_chunk_offset', 'document_id', 'chunk_type', 'start_offset'),
+        db.Index('ix_document_chunk_page', 'document_id', 'chunk_type', 'page_number'),
+    )
 
 class Requirement(db.Model):
     """Extracted requirements from documents"""
@@ -109,6 +176,9 @@ class Requirement(db.Model):
     estimated_effort = db.Column(db.Integer)  # in hours
     source_document_id = db.Column(db.Integer, db.ForeignKey('document.id'))
     source_page = db.Column(db.String(20))
+    source_chunk_id = db.Column(db.Integer, db.ForeignKey('document_chunk.id'))  # Page the requirement came from
+    duplicate_of_id = db.Column(db.Integer, db.ForeignKey('requirement.id'), index=True)  # Earlier near-identical requirement
+    duplicate_score = db.Column(db.Float)  # Estimated similarity to duplicate_of
     status = db.Column(db.String(50), default='identified')  # identified, analyzed, designed, implemented
     conflicts_with = db.Column(JSON)  # List of conflicting requirement IDs
     dependencies = db.Column(JSON)  # List of dependent requirement IDs
@@ -117,6 +187,14 @@ class Requirement(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Relationships
+    source_chunk = db.relationship('DocumentChunk')
+
+    __table_args__ = (
+        # Also the conflict target of bulk upserts
+        db.UniqueConstraint('project_id', 'requirement_id', name='uq_requirement_project_requirement_id'),
+    )
+
 class AgentTask(db.Model):
     """Tasks assigned to agents"""
     id = db.Column(db.Integer, primary_key=True)
@@ -124,17 +202,21 @@ class AgentTask(db.Model):
     task_type = db.Column(db.String(100), nullable=False)  # document_analysis, requirement_extraction, etc.
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
-    status = db.Column(db.String(50), default='pending')  # pending, in_progress, completed, failed, cancelled
+    status = db.Column(db.String(50), default='pending', index=True)  # pending, queued, in_progress, completed, failed, cancelled
     priority = db.Column(db.String(20), default='medium')  # high, medium, low
     progress_percentage = db.Column(db.Integer, default=0)
     input_data = db.Column(JSON)  # Task input parameters
-    output_data = db.Column(JSON)  # Task results
+    output_data = db.deferred(db.Column(CompressedJSON))  # Task results, loaded on access
     error_message = db.Column(db.Text)
     estimated_duration = db.Column(db.Integer)  # in minutes
     actual_duration = db.Column(db.Integer)  # in minutes
     agent_id = db.Column(db.Integer, db.ForeignKey('agent.id'), nullable=False)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
     parent_task_id = db.Column(db.Integer, db.ForeignKey('agent_task.id'))  # For subtasks
+    lease_owner = db.Column(db.String(100))  # Worker currently holding the task
+    lease_expires_at = db.Column(db.DateTime, index=True)  # Reclaimable once passed
+    heartbeat_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     started_at = db.Column(db.DateTime)
     completed_at = db.Column(db.DateTime)
@@ -185,7 +267,7 @@ class Proposal(db.Model):
     word_count = db.Column(db.Integer)
     confidence_score = db.Column(db.Float)  # AI confidence in proposal quality
     created_by_agent = db.Column(db.Integer, db.ForeignKey('agent.id'))
-    reviewed_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    reviewed_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -200,7 +282,7 @@ class SystemLog(db.Model):
     event_type = db.Column(db.String(100), nullable=False)  # task_started, document_processed, error_occurred
     message = db.Column(db.Text, nullable=False)
     details = db.Column(JSON)  # Additional structured data
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'))
     agent_id = db.Column(db.Integer, db.ForeignKey('agent.id'))
     task_id = db.Column(db.String(100))  # Reference to AgentTask
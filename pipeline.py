@@ -0,0 +1,240 @@
+# pipeline.py - DAG orchestration of agent tasks from upload to analyzed requirements
+import uuid
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Agent, AgentTask, Document
+
+# Stage graph. Document-scoped stages run once per document and their
+# branches proceed independently; project-scoped stages fan in and start once
+# every document branch has resolved the stages they depend on.
+PIPELINE_STAGES = {
+    'document_analysis': {
+        'agent': 'Document Intelligence',
+        'scope': 'document',
+        'depends_on': [],
+        'title': 'Analyze {filename}',
+    },
+    'requirement_extraction': {
+        'agent': 'Requirements Engineering',
+        'scope': 'document',
+        'depends_on': ['document_analysis'],
+        'title': 'Extract requirements from {filename}',
+    },
+    'requirement_analysis': {
+        'agent': 'Requirements Engineering',
+        'scope': 'project',
+        'depends_on': ['requirement_extraction'],
+        'title': 'Analyze requirements',
+    },
+    'dependency_mapping': {
+        'agent': 'Requirements Engineering',
+        'scope': 'project',
+        'depends_on': ['requirement_analysis'],
+        'title': 'Map requirement dependencies',
+    },
+}
+
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+def stage_task_id(pipeline_id: str, stage: str, document_id: Optional[int] = None) -> str:
+    """Deterministic task_id; the unique constraint stops duplicate stage tasks"""
+
+    if document_id is None:
+        return f"{pipeline_id}:{stage}"
+    return f"{pipeline_id}:{stage}:{document_id}"
+
+
+def pipeline_tasks(pipeline_id: str) -> Dict[str, AgentTask]:
+    tasks = AgentTask.query.filter(AgentTask.task_id.like(f"{pipeline_id}:%")).all()
+    return {task.task_id: task for task in tasks}
+
+
+def _create_stage_task(pipeline_id: str, stage: str, project_id: int, document_ids: List[int],
+                       document: Optional[Document] = None,
+                       parent: Optional[AgentTask] = None) -> Optional[AgentTask]:
+    """Insert a stage task unless another worker already did"""
+
+    spec = PIPELINE_STAGES[stage]
+    agent = Agent.query.filter_by(name=spec['agent']).first()
+    if not agent:
+        return None
+
+    input_data = {
+        'project_id': project_id,
+        'pipeline_id': pipeline_id,
+        'pipeline_stage': stage,
+        'pipeline_documents': document_ids,
+    }
+    if document is not None:
+        input_data['document_id'] = document.id
+        input_data['document_ids'] = [document.id]
+
+    task = AgentTask(
+        task_id=stage_task_id(pipeline_id, stage, document.id if document else None),
+        task_type=stage,
+        title=spec['title'].format(filename=document.original_filename if document else ''),
+        description=f'Pipeline {pipeline_id} stage {stage}',
+        agent_id=agent.id,
+        project_id=project_id,
+        parent_task_id=parent.id if parent else None,
+        priority=parent.priority if parent else 'medium',
+        input_data=input_data,
+        status='pending'
+    )
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(task)
+    except IntegrityError:
+        # Another upstream task completing at the same moment created it first
+        return None
+
+    return task
+
+
+def _entry_stage(document: Document) -> str:
+    """First stage a document still needs; reused analyses skip straight ahead"""
+
+    if document.processing_status == 'completed' and document.has_extracted_text:
+        return 'requirement_extraction'
+    return 'document_analysis'
+
+
+def start_pipeline(project_id: int, document_ids: List[int]) -> Dict[str, Any]:
+    """Create the entry tasks of a new pipeline run
+
+    Returns the pipeline id and the tasks ready to be queued.
+    """
+
+    pipeline_id = str(uuid.uuid4())
+    documents = Document.query.filter(Document.id.in_(document_ids)).all()
+
+    ready = []
+    for document in documents:
+        task = _create_stage_task(pipeline_id, _entry_stage(document), project_id,
+                                  document_ids, document=document)
+        if task:
+            ready.append(task)
+
+    db.session.commit()
+    return {'pipeline_id': pipeline_id, 'tasks': ready}
+
+
+def _branch_resolved(tasks: Dict[str, AgentTask], pipeline_id: str, stage: str,
+                     document_id: int) -> bool:
+    """Whether a document branch is finished with ``stage``
+
+    A branch counts as resolved if its stage task reached a terminal state,
+    or if an upstream stage failed so the stage will never be created.
+    """
+
+    task = tasks.get(stage_task_id(pipeline_id, stage, document_id))
+    if task is not None:
+        return task.status in TERMINAL_STATUSES
+
+    for upstream in PIPELINE_STAGES[stage]['depends_on']:
+        upstream_task = tasks.get(stage_task_id(pipeline_id, upstream, document_id))
+        if upstream_task is not None and upstream_task.status in ('failed', 'cancelled'):
+            return True
+        if upstream_task is None and _branch_resolved(tasks, pipeline_id, upstream, document_id):
+            return True
+
+    return False
+
+
+def _stage_succeeded(tasks: Dict[str, AgentTask], pipeline_id: str, stage: str,
+                     document_ids: List[int]) -> bool:
+    if PIPELINE_STAGES[stage]['scope'] == 'project':
+        task = tasks.get(stage_task_id(pipeline_id, stage))
+        return task is not None and task.status == 'completed'
+
+    return any(
+        tasks.get(stage_task_id(pipeline_id, stage, doc_id)) is not None
+        and tasks[stage_task_id(pipeline_id, stage, doc_id)].status == 'completed'
+        for doc_id in document_ids
+    )
+
+
+def _stage_resolved(tasks: Dict[str, AgentTask], pipeline_id: str, stage: str,
+                    document_ids: List[int]) -> bool:
+    if PIPELINE_STAGES[stage]['scope'] == 'project':
+        task = tasks.get(stage_task_id(pipeline_id, stage))
+        return task is not None and task.status in TERMINAL_STATUSES
+
+    return all(_branch_resolved(tasks, pipeline_id, stage, doc_id) for doc_id in document_ids)
+
+
+def advance_pipeline(task: AgentTask) -> List[AgentTask]:
+    """Create every downstream stage task whose inputs are now complete
+
+    Called whenever a pipeline task reaches a terminal state. Returns the
+    newly created tasks so the caller can queue them. Document stages only
+    follow their own upstream edge, but every project stage is re-checked:
+    a failure in one branch can be what resolves a fan-in that depends on
+    a later stage of that branch.
+    """
+
+    input_data = task.input_data or {}
+    pipeline_id = input_data.get('pipeline_id')
+    stage = input_data.get('pipeline_stage')
+    if not pipeline_id or stage not in PIPELINE_STAGES or task.status not in TERMINAL_STATUSES:
+        return []
+
+    project_id = task.project_id
+    document_ids = input_data.get('pipeline_documents') or []
+    tasks = pipeline_tasks(pipeline_id)
+    ready = []
+
+    for next_stage, spec in PIPELINE_STAGES.items():
+        if spec['scope'] == 'document':
+            if stage not in spec['depends_on']:
+                continue
+            # Per-document edge: only this branch can have become ready
+            document_id = input_data.get('document_id')
+            if task.status != 'completed' or document_id is None:
+                continue
+            upstream_done = all(
+                tasks.get(stage_task_id(pipeline_id, dep, document_id)) is not None
+                and tasks[stage_task_id(pipeline_id, dep, document_id)].status == 'completed'
+                for dep in spec['depends_on']
+            )
+            if upstream_done:
+                document = Document.query.get(document_id)
+                new_task = _create_stage_task(pipeline_id, next_stage, project_id, document_ids,
+                                              document=document, parent=task)
+                if new_task:
+                    ready.append(new_task)
+        else:
+            # Fan-in: wait for every branch, and need at least one success
+            if stage_task_id(pipeline_id, next_stage) in tasks or not spec['depends_on']:
+                continue
+            if not all(_stage_resolved(tasks, pipeline_id, dep, document_ids) for dep in spec['depends_on']):
+                continue
+            if not all(_stage_succeeded(tasks, pipeline_id, dep, document_ids) for dep in spec['depends_on']):
+                continue
+            new_task = _create_stage_task(pipeline_id, next_stage, project_id, document_ids, parent=task)
+            if new_task:
+                ready.append(new_task)
+
+    db.session.commit()
+    return ready
+
+
+def pipeline_status(pipeline_id: str) -> Dict[str, Any]:
+    """Summarize the stage tasks of a pipeline run"""
+
+    stages = {stage: [] for stage in PIPELINE_STAGES}
+    for task in pipeline_tasks(pipeline_id).values():
+        stage = (task.input_data or {}).get('pipeline_stage')
+        if stage in stages:
+            stages[stage].append({
+                'task_id': task.task_id,
+                'document_id': (task.input_data or {}).get('document_id'),
+                'status': task.status,
+                'progress_percentage': task.progress_percentage
+            })
+
+    return {'pipeline_id': pipeline_id, 'stages': stages}
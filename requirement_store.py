@@ -0,0 +1,310 @@
+# requirement_store.py - batched writes of requirement rows
+import csv
+import io
+import json
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Project, Requirement
+
+# Rows per executemany batch
+WRITE_BATCH = 500
+# Upserts this large go through COPY into a temporary table on PostgreSQL
+COPY_MIN_ROWS = 1000
+# Streamed rows are written once this many wait or the oldest has waited this long
+STREAM_BATCH = 50
+STREAM_WINDOW_SECONDS = 1.0
+# REQ-### numbers reserved from a project's counter per round trip
+NUMBER_BLOCK = 20
+
+UPSERT_KEY = ('project_id', 'requirement_id')
+# Every column the bulk paths write; id comes from the database
+COLUMNS = [column.name for column in Requirement.__table__.columns if column.name != 'id']
+JSON_COLUMNS = {'conflicts_with', 'dependencies', 'acceptance_criteria'}
+# An INSERT ... ON CONFLICT row must pass NOT NULL checks even when it ends up updating
+REQUIRED_COLUMNS = {column.name for column in Requirement.__table__.columns
+                    if not column.nullable and column.default is None and column.name != 'id'}
+
+
+def _batches(rows: List[Dict[str, Any]], size: int = WRITE_BATCH) -> Iterable[List[Dict[str, Any]]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _complete(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows with every column present, so executemany can batch them together"""
+
+    now = datetime.utcnow()
+    completed = []
+    for row in rows:
+        values = {column: row.get(column) for column in COLUMNS}
+        values['status'] = values['status'] or 'identified'
+        values['created_at'] = values['created_at'] or now
+        values['updated_at'] = values['updated_at'] or now
+        completed.append(values)
+    return completed
+
+
+def insert_requirements(rows: List[Dict[str, Any]]) -> List[int]:
+    """Insert requirement rows with batched executemany, returning their ids in order
+
+    Runs inside the caller's transaction; nothing is committed.
+    """
+
+    ids: List[int] = []
+    statement = db.insert(Requirement).returning(Requirement.id, sort_by_parameter_order=True)
+    for batch in _batches(_complete(rows)):
+        ids.extend(db.session.execute(statement, batch).scalars().all())
+    return ids
+
+
+def update_requirements(updates: List[Dict[str, Any]]):
+    """Apply per-row updates keyed by ``id`` as executemany UPDATEs
+
+    Rows may set different columns; rows setting the same columns share a
+    statement. ``updated_at`` is stamped here since bulk UPDATEs skip
+    ORM-side ``onupdate`` defaults.
+    """
+
+    now = datetime.utcnow()
+    for batch in _batches([dict(update, updated_at=now) for update in updates]):
+        db.session.execute(db.update(Requirement), batch)
+
+
+def upsert_requirements(rows: List[Dict[str, Any]]) -> int:
+    """Insert or update requirement rows on (project_id, requirement_id)
+
+    Columns a row does not mention keep their stored values on update, so
+    rows are grouped by the columns they set. PostgreSQL and SQLite use
+    native ON CONFLICT; large PostgreSQL groups are streamed with COPY into
+    a temporary table first. Other databases, and partial rows that could
+    not be inserted as they stand, go through a lookup followed by batched
+    inserts and updates.
+    """
+
+    groups: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        groups[tuple(sorted(column for column in row if column in COLUMNS))].append(row)
+
+    dialect = db.session.get_bind().dialect.name
+    for provided, group in groups.items():
+        updated_columns = [column for column in provided
+                           if column not in UPSERT_KEY and column not in ('created_at', 'updated_at')]
+
+        if not REQUIRED_COLUMNS <= set(provided):
+            _lookup_upsert(group, updated_columns)
+        elif dialect == 'postgresql' and len(group) >= COPY_MIN_ROWS:
+            _copy_upsert(_complete(group), updated_columns)
+        elif dialect in ('postgresql', 'sqlite'):
+            insert = (postgresql if dialect == 'postgresql' else sqlite).insert(Requirement.__table__)
+            statement = insert.on_conflict_do_update(
+                index_elements=list(UPSERT_KEY),
+                set_={column: insert.excluded[column] for column in updated_columns + ['updated_at']}
+            )
+            for batch in _batches(_complete(group)):
+                db.session.execute(statement, batch)
+        else:
+            _lookup_upsert(group, updated_columns)
+    return len(rows)
+
+
+def _lookup_upsert(rows: List[Dict[str, Any]], updated_columns: List[str]):
+    existing = {}
+    for project_id in {row['project_id'] for row in rows}:
+        existing.update(
+            ((project_id, requirement_id), row_id)
+            for row_id, requirement_id in db.session.query(Requirement.id, Requirement.requirement_id)
+            .filter(Requirement.project_id == project_id)
+        )
+
+    inserts, updates = [], []
+    for row in rows:
+        row_id = existing.get((row['project_id'], row['requirement_id']))
+        if row_id is None:
+            inserts.append(row)
+        else:
+            updates.append(dict({column: row.get(column) for column in updated_columns}, id=row_id))
+    insert_requirements(inserts)
+    update_requirements(updates)
+
+
+def _copy_value(column: str, value: Any) -> str:
+    if value is None:
+        return r'\N'
+    if column in JSON_COLUMNS:
+        return json.dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _copy_upsert(rows: List[Dict[str, Any]], updated_columns: List[str]):
+    """COPY rows into a temporary table, then merge with one INSERT ... ON CONFLICT"""
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(column, row[column]) for column in COLUMNS])
+    buffer.seek(0)
+
+    column_list = ', '.join(COLUMNS)
+    db.session.execute(text("DROP TABLE IF EXISTS requirement_upsert"))
+    db.session.execute(text("CREATE TEMP TABLE requirement_upsert (LIKE requirement INCLUDING DEFAULTS) ON COMMIT DROP"))
+
+    copy_sql = f"COPY requirement_upsert ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    cursor = db.session.connection().connection.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):
+            # psycopg2
+            cursor.copy_expert(copy_sql, buffer)
+        else:
+            # psycopg 3
+            with cursor.copy(copy_sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+    assignments = ', '.join(f"{column} = EXCLUDED.{column}" for column in updated_columns + ['updated_at'])
+    db.session.execute(text(
+        f"INSERT INTO requirement ({column_list}) SELECT {column_list} FROM requirement_upsert "
+        f"ON CONFLICT ({', '.join(UPSERT_KEY)}) DO UPDATE SET {assignments}"
+    ))
+
+
+class RequirementNumbers(Iterator[int]):
+    """Free REQ-### numbers of a project, safe to share between workers
+
+    Numbers are reserved a block at a time by advancing the project's
+    counter row in a short transaction of its own, so parallel extractions
+    never hand out the same one and the row is locked only for that single
+    UPDATE. Numbers of a block still unused when the extraction ends are
+    skipped. ``floor`` is the highest number already in use, for rows
+    numbered outside the counter (imports, databases older than it).
+    """
+
+    def __init__(self, project_id: int, floor: int = 0, block: int = NUMBER_BLOCK):
+        self.project_id = project_id
+        self.block = block
+        self._next = self._end = 0
+        project = Project.__table__
+        with db.engine.begin() as connection:
+            connection.execute(
+                db.update(project)
+                .where(project.c.id == project_id, project.c.requirement_counter < floor)
+                .values(requirement_counter=floor)
+            )
+
+    def __next__(self) -> int:
+        if self._next >= self._end:
+            self._end = self._reserve(self.block) + 1
+            self._next = self._end - self.block
+        number = self._next
+        self._next += 1
+        return number
+
+    def _reserve(self, count: int) -> int:
+        """Advance the counter by ``count``, returning its new value"""
+
+        project = Project.__table__
+        statement = db.update(project).where(project.c.id == self.project_id) \
+            .values(requirement_counter=project.c.requirement_counter + count)
+        with db.engine.begin() as connection:
+            if connection.dialect.update_returning:
+                return connection.execute(statement.returning(project.c.requirement_counter)).scalar_one()
+            # The row lock taken by the UPDATE keeps the value ours until commit
+            connection.execute(statement)
+            return connection.execute(
+                db.select(project.c.requirement_counter).where(project.c.id == self.project_id)).scalar_one()
+
+
+class RequirementWriter:
+    """Buffer new requirements and edits to them, writing both in batches
+
+    Rows are addressed by ``requirement_id`` throughout. An edit to a row
+    that has not been written yet simply changes the pending row. Ids of
+    rows that already exist can be registered with ``known`` so edits to
+    them are queued as updates. With ``max_delay`` set, pending rows are
+    also written once the oldest has waited that many seconds (see ``due``).
+    """
+
+    def __init__(self, batch_size: int = WRITE_BATCH, max_delay: Optional[float] = None):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._oldest: Optional[float] = None
+        self.ids: Dict[str, int] = {}
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.pending: List[Dict[str, Any]] = []
+        self.updates: Dict[int, Dict[str, Any]] = {}
+        self.inserted = 0
+
+    def known(self, requirement_id: str, row_id: int):
+        self.ids[requirement_id] = row_id
+
+    def add(self, row: Dict[str, Any]):
+        self.rows[row['requirement_id']] = row
+        if not self.pending:
+            self._oldest = time.monotonic()
+        self.pending.append(row)
+        if len(self.pending) >= self.batch_size or self.due():
+            self.flush()
+
+    def due(self) -> bool:
+        """Whether pending rows have waited past ``max_delay``"""
+        return bool(self.pending) and self.max_delay is not None and \
+            time.monotonic() - self._oldest >= self.max_delay
+
+    def update(self, requirement_id: str, **values):
+        self.rows.setdefault(requirement_id, {}).update(values)
+        row_id = self.ids.get(requirement_id)
+        if row_id is not None:
+            self.updates.setdefault(row_id, {'id': row_id}).update(values)
+
+    def get(self, requirement_id: str, column: str) -> Any:
+        """Latest value of a column, from this writer or else the database"""
+
+        row = self.rows.get(requirement_id)
+        if row is not None and column in row:
+            return row[column]
+        row_id = self.ids.get(requirement_id)
+        if row_id is None:
+            return None
+        return db.session.query(getattr(Requirement, column)).filter(Requirement.id == row_id).scalar()
+
+    def id_of(self, requirement_id: str) -> Optional[int]:
+        """Database id of a row, writing pending rows first if needed"""
+
+        if requirement_id not in self.ids and requirement_id in self.rows:
+            self.flush()
+        return self.ids.get(requirement_id)
+
+    def flush(self):
+        """Write pending rows and queued updates, then commit
+
+        On failure the transaction is rolled back and the rows and updates
+        it held are dropped before the error is raised, so one bad row does
+        not fail every later flush.
+        """
+
+        pending, updates = self.pending, list(self.updates.values())
+        try:
+            ids = insert_requirements(pending) if pending else []
+            if updates:
+                update_requirements(updates)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self.pending, self.updates, self._oldest = [], {}, None
+            for row in pending:
+                if row['requirement_id'] not in self.ids:
+                    self.rows.pop(row['requirement_id'], None)
+            raise
+
+        self.pending, self.updates, self._oldest = [], {}, None
+        for row, row_id in zip(pending, ids):
+            self.ids[row['requirement_id']] = row_id
+        self.inserted += len(pending)
@@ -0,0 +1,166 @@
+# task_leases.py - Lease-based claiming of AgentTask rows across workers
+import os
+import uuid
+import socket
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func, update
+
+from config import Config
+from models import db, AgentTask
+
+CLAIMABLE_STATUSES = ('pending', 'queued')
+PRIORITY_ORDER = case({'high': 0, 'medium': 1, 'low': 2}, value=AgentTask.priority, else_=1)
+
+
+class LeaseLost(Exception):
+    """Raised when a worker finds another worker now holds its task"""
+    pass
+
+
+def make_worker_id() -> str:
+    """Unique identity for a worker process"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _lease_expiry(lease_seconds: Optional[int] = None) -> datetime:
+    return datetime.utcnow() + timedelta(seconds=lease_seconds or Config.TASK_LEASE_SECONDS)
+
+
+def _supports_skip_locked() -> bool:
+    return db.engine.dialect.name == 'postgresql'
+
+
+def _try_lease(task_pk: int, worker_id: str, lease_seconds: Optional[int] = None) -> bool:
+    """Compare-and-swap a claimable row into in_progress under our lease
+
+    The WHERE clause makes this safe on SQLite, which has no row locks:
+    only one concurrent UPDATE can see the row still claimable.
+    """
+
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(AgentTask)
+        .where(AgentTask.id == task_pk, AgentTask.status.in_(CLAIMABLE_STATUSES))
+        .values(status='in_progress',
+                lease_owner=worker_id,
+                lease_expires_at=_lease_expiry(lease_seconds),
+                heartbeat_at=now,
+                started_at=now,
+                attempts=func.coalesce(AgentTask.attempts, 0) + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def claim_next_tasks(worker_id: str, limit: int = 1, agent_ids: Optional[List[int]] = None,
+                     lease_seconds: Optional[int] = None) -> List[str]:
+    """Lease up to ``limit`` runnable tasks, highest priority first
+
+    On Postgres candidate rows are locked with FOR UPDATE SKIP LOCKED so
+    concurrent workers never block on or double-claim the same row. Other
+    databases fall back to the compare-and-swap in ``_try_lease``.
+    """
+
+    query = AgentTask.query.filter(AgentTask.status.in_(CLAIMABLE_STATUSES))
+    if agent_ids is not None:
+        query = query.filter(AgentTask.agent_id.in_(agent_ids))
+    query = query.order_by(PRIORITY_ORDER, AgentTask.created_at).limit(limit)
+
+    if _supports_skip_locked():
+        query = query.with_for_update(skip_locked=True)
+
+    claimed = []
+    try:
+        for task_pk, task_id in query.with_entities(AgentTask.id, AgentTask.task_id).all():
+            if _try_lease(task_pk, worker_id, lease_seconds):
+                claimed.append(task_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return claimed
+
+
+def claim_task(task_id: str, worker_id: str, lease_seconds: Optional[int] = None) -> bool:
+    """Lease a specific task; returns False if it is not claimable"""
+
+    task_pk = db.session.query(AgentTask.id).filter_by(task_id=task_id).scalar()
+    if task_pk is None:
+        return False
+
+    claimed = _try_lease(task_pk, worker_id, lease_seconds)
+    db.session.commit()
+    return claimed
+
+
+def heartbeat(task_id: str, worker_id: str, progress: Optional[int] = None,
+              lease_seconds: Optional[int] = None) -> bool:
+    """Extend our lease and optionally record progress
+
+    Runs on its own connection so it never flushes or commits half-finished
+    work pending in the agent's session. Returns False if the lease was lost.
+    """
+
+    values = {'lease_expires_at': _lease_expiry(lease_seconds), 'heartbeat_at': datetime.utcnow()}
+    if progress is not None:
+        values['progress_percentage'] = max(0, min(100, int(progress)))
+
+    with db.engine.begin() as connection:
+        result = connection.execute(
+            update(AgentTask)
+            .where(AgentTask.task_id == task_id,
+                   AgentTask.lease_owner == worker_id,
+                   AgentTask.status == 'in_progress')
+            .values(**values)
+        )
+    return result.rowcount == 1
+
+
+def release_task(task: AgentTask):
+    """Drop the lease once a task reaches a final state"""
+
+    task.lease_owner = None
+    task.lease_expires_at = None
+
+
+def reclaim_expired_tasks(max_attempts: Optional[int] = None) -> Dict[str, List[str]]:
+    """Return tasks whose worker stopped heartbeating to the queue
+
+    Tasks that already used up their attempts are failed instead so a
+    poison task cannot loop forever. Returns the ids of the tasks requeued
+    and failed. Each row is switched with a compare-and-swap, so when
+    several workers reclaim at once every task is reported by exactly one.
+    """
+
+    max_attempts = max_attempts or Config.TASK_MAX_ATTEMPTS
+    now = datetime.utcnow()
+    expired = (AgentTask.status == 'in_progress', AgentTask.lease_expires_at < now)
+    candidates = db.session.query(AgentTask.id, AgentTask.task_id, AgentTask.attempts).filter(*expired).all()
+
+    reclaimed = {'requeued': [], 'failed': []}
+    try:
+        for task_pk, task_id, attempts in candidates:
+            if (attempts or 0) >= max_attempts:
+                outcome, values = 'failed', {'status': 'failed',
+                                             'error_message': 'Lease expired after maximum attempts',
+                                             'completed_at': now}
+            else:
+                outcome, values = 'requeued', {'status': 'pending'}
+
+            result = db.session.execute(
+                update(AgentTask)
+                .where(AgentTask.id == task_pk, *expired)
+                .values(lease_owner=None, lease_expires_at=None, **values)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                reclaimed[outcome].append(task_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return reclaimed
@@ -0,0 +1,350 @@
+# task_queue.py - Background execution of AgentTask rows
+import time
+import atexit
+import asyncio
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from celery import Celery
+from celery.signals import worker_process_shutdown, worker_ready
+
+from config import Config
+from models import db, AgentTask, Agent
+from pipeline import advance_pipeline
+from task_leases import make_worker_id, claim_task, claim_next_tasks, reclaim_expired_tasks, release_task
+from agents.document_intelligence import DocumentIntelligenceAgent
+from agents.llm_clients import LLMClientPool
+from agents.requirements_engineering import RequirementsEngineeringAgent
+from extraction.pages import purge_stale_cache
+
+logger = logging.getLogger('TaskQueue')
+
+# Agents that can execute tasks, keyed by Agent.name
+AGENT_CLASSES = {
+    'Document Intelligence': DocumentIntelligenceAgent,
+    'Requirements Engineering': RequirementsEngineeringAgent,
+}
+
+TASK_QUEUE_BACKEND = Config.TASK_QUEUE_BACKEND
+TASK_WORKER_CONCURRENCY = Config.TASK_WORKER_CONCURRENCY
+TASK_POLL_INTERVAL = Config.TASK_POLL_INTERVAL
+TASK_RECLAIM_INTERVAL = Config.TASK_RECLAIM_INTERVAL
+
+# One identity per process; leases record which worker holds a task
+WORKER_ID = make_worker_id()
+
+celery = Celery('tender', broker=Config.REDIS_URL or 'memory://', backend=None)
+celery.conf.update(
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    worker_concurrency=TASK_WORKER_CONCURRENCY,
+    task_ignore_result=True,
+)
+
+
+def get_flask_app():
+    """Import the Flask app lazily; app.py imports this module"""
+    from app import app
+    return app
+
+
+def agent_class_for(agent: Agent):
+    return AGENT_CLASSES.get(agent.name) if agent else None
+
+
+_thread_state = threading.local()
+# Every thread loop, so they can be closed once their thread is done with them
+_thread_loops: Dict[threading.Thread, asyncio.AbstractEventLoop] = {}
+_thread_loops_lock = threading.Lock()
+
+
+def run_in_thread_loop(coro):
+    """Run a coroutine on this thread's long-lived event loop
+
+    Reusing one loop per worker thread keeps the pooled LLM clients and their
+    keep-alive connections alive across tasks; asyncio.run would discard them.
+    """
+
+    loop = getattr(_thread_state, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _thread_state.loop = loop
+        with _thread_loops_lock:
+            _thread_loops[threading.current_thread()] = loop
+        # Loops left behind by worker threads that have since exited
+        close_thread_loops(finished_only=True)
+    return loop.run_until_complete(coro)
+
+
+def close_thread_loop(loop: asyncio.AbstractEventLoop):
+    """Close an idle thread loop along with the LLM clients and connection pools bound to it"""
+
+    if loop.is_closed() or loop.is_running():
+        return
+    try:
+        loop.run_until_complete(LLMClientPool.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    except Exception as e:
+        logger.warning(f"Failed to close LLM clients: {str(e)}")
+    finally:
+        loop.close()
+
+
+def close_thread_loops(finished_only: bool = False):
+    """Close the loops of worker threads; with ``finished_only`` just those of exited threads"""
+
+    with _thread_loops_lock:
+        threads = [thread for thread in _thread_loops if not finished_only or not thread.is_alive()]
+        loops = [_thread_loops.pop(thread) for thread in threads]
+    for loop in loops:
+        close_thread_loop(loop)
+
+
+# Thread pools join their workers before atexit handlers run, so every loop is idle by then
+atexit.register(close_thread_loops)
+
+
+def execute_task(task_id: str, worker_id: str = WORKER_ID, claimed: bool = False) -> Optional[Dict[str, Any]]:
+    """Lease and run a single task; must be called inside an app context"""
+
+    if not claimed and not claim_task(task_id, worker_id):
+        logger.info(f"Task {task_id} already claimed, skipping")
+        return None
+
+    task = AgentTask.query.filter_by(task_id=task_id).first()
+    agent_class = agent_class_for(task.agent)
+    if not agent_class:
+        task.status = 'failed'
+        task.error_message = f'Agent {task.agent.name} not implemented yet'
+        release_task(task)
+        db.session.commit()
+        return None
+
+    result = None
+    try:
+        agent = agent_class(task.agent_id)
+        result = run_in_thread_loop(agent.process_task(task_id, worker_id=worker_id))
+    except Exception as e:
+        # process_task records the failure on the task row
+        logger.error(f"Task {task_id} failed: {str(e)}")
+
+    try:
+        # Fire any pipeline stages this task was the last input for
+        task = AgentTask.query.filter_by(task_id=task_id).first()
+        for next_task in advance_pipeline(task):
+            enqueue_task(next_task)
+    except Exception as e:
+        logger.error(f"Failed to advance pipeline after task {task_id}: {str(e)}")
+    finally:
+        db.session.remove()
+
+    return result
+
+
+def reclaim_and_dispatch(app=None, dispatch: bool = True) -> Dict[str, List[str]]:
+    """Reclaim expired leases and get the affected work moving again
+
+    Requeued tasks are handed back to the queue backend, unless the caller
+    polls the table itself (``dispatch=False``), and pipelines waiting on
+    tasks that ran out of attempts are advanced. Must be called inside an
+    app context.
+    """
+
+    reclaimed = reclaim_expired_tasks()
+    task_ids = reclaimed['requeued'] + reclaimed['failed']
+    if not task_ids:
+        return reclaimed
+
+    logger.info(f"Reclaimed expired leases: {reclaimed}")
+    for task in AgentTask.query.filter(AgentTask.task_id.in_(task_ids)).all():
+        try:
+            if task.status == 'pending' and dispatch:
+                enqueue_task(task, app)
+            elif task.status == 'failed':
+                for next_task in advance_pipeline(task):
+                    enqueue_task(next_task, app)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to dispatch reclaimed task {task.task_id}: {str(e)}")
+    return reclaimed
+
+
+class LeaseReaper:
+    """Background thread reclaiming tasks whose worker died, one per process"""
+
+    _thread: Optional[threading.Thread] = None
+    _stop: Optional[threading.Event] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def start(cls, app, interval: float = TASK_RECLAIM_INTERVAL):
+        with cls._lock:
+            if cls._thread is not None and cls._thread.is_alive():
+                return
+            cls._stop = threading.Event()
+            cls._thread = threading.Thread(target=cls._run, args=(app, interval, cls._stop),
+                                           name='lease-reaper', daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def stop(cls):
+        with cls._lock:
+            thread, stop = cls._thread, cls._stop
+            cls._thread = cls._stop = None
+        if thread is not None:
+            stop.set()
+            thread.join()
+
+    @staticmethod
+    def _run(app, interval: float, stop: threading.Event):
+        while not stop.is_set():
+            with app.app_context():
+                try:
+                    reclaim_and_dispatch(app)
+                except Exception as e:
+                    logger.error(f"Reclaiming expired leases failed: {str(e)}")
+                finally:
+                    db.session.remove()
+            stop.wait(interval)
+
+
+def purge_extraction_cache():
+    """Drop extraction cache entries no current extractor will read again
+
+    Extractor versions only change with a deploy, so workers do this once
+    when they start.
+    """
+
+    try:
+        removed = purge_stale_cache()
+    except OSError as e:
+        logger.warning(f"Purging the extraction cache failed: {str(e)}")
+        return
+    if removed:
+        logger.info(f"Removed {removed} stale extraction cache versions")
+
+
+@worker_ready.connect
+def _start_lease_reaper(**kwargs):
+    # Runs in the main worker process; reclaimed tasks go back through the broker
+    LeaseReaper.start(get_flask_app())
+
+
+@worker_ready.connect
+def _purge_extraction_cache(**kwargs):
+    purge_extraction_cache()
+
+
+@worker_process_shutdown.connect
+def _close_worker_loops(**kwargs):
+    # Prefork children exit without running atexit handlers
+    close_thread_loops()
+
+
+@celery.task(name='tender.execute_agent_task')
+def execute_agent_task(task_id: str):
+    """Celery entry point for running an AgentTask"""
+
+    with get_flask_app().app_context():
+        execute_task(task_id)
+
+
+class InProcessQueue:
+    """Thread pool used when no Redis broker is configured"""
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def submit(cls, app, task_id: str):
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=TASK_WORKER_CONCURRENCY,
+                                                   thread_name_prefix='agent-task')
+                # Tasks of a previous process that died mid-run come back through here
+                LeaseReaper.start(app)
+                purge_extraction_cache()
+        cls._executor.submit(cls._run, app, task_id)
+
+    @staticmethod
+    def _run(app, task_id: str):
+        with app.app_context():
+            execute_task(task_id)
+
+
+def enqueue_task(task: AgentTask, app=None):
+    """Mark a task as queued and hand it to the configured backend"""
+
+    task.status = 'queued'
+    db.session.commit()
+
+    if TASK_QUEUE_BACKEND == 'celery':
+        execute_agent_task.delay(task.task_id)
+    else:
+        InProcessQueue.submit(app or get_flask_app(), task.task_id)
+
+
+def implemented_agent_ids():
+    return [a.id for a in Agent.query.filter(Agent.name.in_(list(AGENT_CLASSES.keys()))).all()]
+
+
+def run_worker(concurrency: int = TASK_WORKER_CONCURRENCY, poll_interval: float = TASK_POLL_INTERVAL):
+    """Lease tasks from the agent_task table and run them on a thread pool
+
+    The table is the durable queue: tasks survive broker and worker restarts
+    because anything still pending is picked up on the next poll, and tasks
+    held by a worker that died are requeued once their lease expires. Any
+    number of worker processes can poll the same table.
+    """
+
+    app = get_flask_app()
+    in_flight = set()
+    in_flight_lock = threading.Lock()
+
+    def run(task_id):
+        try:
+            with app.app_context():
+                execute_task(task_id, WORKER_ID, claimed=True)
+        finally:
+            with in_flight_lock:
+                in_flight.discard(task_id)
+
+    with app.app_context():
+        agent_ids = implemented_agent_ids()
+        db.session.remove()
+
+    purge_extraction_cache()
+    logger.info(f"Worker {WORKER_ID} started with concurrency={concurrency}")
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='agent-task') as executor:
+            while True:
+                with in_flight_lock:
+                    free_slots = concurrency - len(in_flight)
+
+                with app.app_context():
+                    # Requeued tasks are claimed below like any other pending task
+                    reclaim_and_dispatch(app, dispatch=False)
+                    task_ids = claim_next_tasks(WORKER_ID, free_slots, agent_ids) if free_slots > 0 else []
+                    db.session.remove()
+
+                for task_id in task_ids:
+                    with in_flight_lock:
+                        in_flight.add(task_id)
+                    executor.submit(run, task_id)
+
+                time.sleep(poll_interval)
+    finally:
+        close_thread_loops()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the agent task worker')
+    parser.add_argument('--concurrency', type=int, default=TASK_WORKER_CONCURRENCY)
+    parser.add_argument('--poll-interval', type=float, default=TASK_POLL_INTERVAL)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    run_worker(args.concurrency, args.poll_interval)
@@ -0,0 +1,46 @@
+# tests/conftest.py
+import pytest
+from flask import Flask
+
+from config import TestingConfig
+from models import db, Agent, Project, User
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Flask app on a throwaway SQLite file, so worker threads share the database"""
+
+    app = Flask(__name__)
+    app.config.from_object(TestingConfig)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.sqlite3'}"
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def project(app):
+    user = User(username='owner', email='owner@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    project = Project(name='Tender', user_id=user.id)
+    db.session.add(project)
+    db.session.commit()
+    return project
+
+
+@pytest.fixture
+def agents(app):
+    """The agents pipeline stages are assigned to"""
+
+    created = {}
+    for name, agent_type in (('Document Intelligence', 'analysis'), ('Requirements Engineering', 'analysis')):
+        created[name] = Agent(name=name, agent_type=agent_type, model_name='claude-sonnet-4')
+        db.session.add(created[name])
+    db.session.commit()
+    return created
@@ -0,0 +1,51 @@
+# tests/test_conflict_blocking.py
+from agents.conflict_blocking import MAX_BLOCK, candidate_pairs, conflict_groups
+
+REQUIREMENTS = [
+    {'id': 'R1', 'title': 'Data residency', 'description': 'Customer data shall be hosted in Germany.',
+     'type': 'non_functional'},
+    {'id': 'R2', 'title': 'Hosting region', 'description': 'Customer data must be hosted in the United States.',
+     'type': 'non_functional'},
+    {'id': 'R3', 'title': 'Login', 'description': 'Users shall sign in with single sign-on via SAML.',
+     'type': 'functional'},
+    {'id': 'R4', 'title': 'Password login', 'description': 'Users shall sign in with a password, never SAML.',
+     'type': 'functional'},
+    {'id': 'R5', 'title': 'Invoices', 'description': 'Invoices are issued monthly in euros.', 'type': 'business'},
+]
+
+
+def _generic(prefix, count, requirement_type):
+    return [{'id': f"{prefix}{number:02d}", 'title': 'Encryption', 'type': requirement_type,
+             'description': f"Encryption of component {prefix}{number:02d}"} for number in range(count)]
+
+
+def test_only_requirements_sharing_rare_terms_are_paired():
+    pairs = candidate_pairs(REQUIREMENTS, threshold=0.3)
+
+    assert [(first, second) for first, second, _ in pairs] == [('R3', 'R4'), ('R1', 'R2')]
+    assert all(0.3 <= score <= 1 for _, _, score in pairs)
+    assert candidate_pairs(REQUIREMENTS, threshold=0.9) == []
+
+
+def test_oversized_blocks_are_split_by_type_then_dropped():
+    kept = MAX_BLOCK // 2
+    pairs = candidate_pairs(_generic('A', kept, 'security') + _generic('B', MAX_BLOCK + 5, 'functional'),
+                            threshold=0.0)
+
+    # Only the small per-type block is compared; the big one would cost too much
+    assert len(pairs) == kept * (kept - 1) // 2
+    assert all(first.startswith('A') and second.startswith('A') for first, second, _ in pairs)
+
+
+def test_groups_keep_clusters_together_within_the_size_limit():
+    pairs = [('A', 'B', 0.9), ('B', 'C', 0.8), ('C', 'D', 0.7), ('E', 'F', 0.5)]
+
+    groups = conflict_groups(pairs, max_size=3)
+
+    assert groups == [
+        {'requirements': ['A', 'B', 'C'], 'pairs': [('A', 'B', 0.9), ('B', 'C', 0.8)]},
+        {'requirements': ['C', 'D'], 'pairs': [('C', 'D', 0.7)]},
+        {'requirements': ['E', 'F'], 'pairs': [('E', 'F', 0.5)]},
+    ]
+    assert sorted(pair for group in groups for pair in group['pairs']) == sorted(pairs)
+    assert conflict_groups(pairs, max_size=4)[0]['requirements'] == ['A', 'B', 'C', 'D']
@@ -0,0 +1,79 @@
+# tests/test_db_types.py
+from sqlalchemy import create_engine, text
+
+from db_types import COMPRESS_MIN_BYTES, RAW, CompressedJSON, CompressedText
+from migrations.compress_payloads import upgrade
+from models import AgentTask, Document, db
+
+
+def _stored(column, row_id):
+    table = column.class_.__tablename__
+    return db.session.execute(
+        text(f'SELECT {column.key} FROM {table} WHERE id = :id'), {'id': row_id}).scalar()
+
+
+def _document(project, **fields):
+    return Document(filename='a.pdf', original_filename='a.pdf', file_path='/tmp/a.pdf',
+                    project_id=project.id, **fields)
+
+
+def test_payloads_round_trip_compressed(app, project, agents):
+    long_text = 'The supplier shall provide 24/7 support. ' * 200
+    metadata = {'pages': 12, 'headings': ['Scope', 'Support'] * 100}
+    document = _document(project, extracted_text=long_text, extracted_metadata=metadata)
+    task = AgentTask(agent_id=agents['Document Intelligence'].id, project_id=project.id,
+                     task_type='document_analysis', title='Analyze', output_data={'ok': True})
+    db.session.add_all([document, task])
+    db.session.commit()
+    document_id, task_id = document.id, task.id
+    db.session.expunge_all()
+
+    stored = _stored(Document.extracted_text, document_id)
+    assert stored[:1] != RAW
+    assert len(stored) < len(long_text) // 4
+    assert _stored(AgentTask.output_data, task_id)[:1] == RAW
+
+    loaded = db.session.get(Document, document_id)
+    assert 'extracted_text' not in loaded.__dict__
+    assert loaded.extracted_text == long_text
+    assert loaded.extracted_metadata == metadata
+    assert db.session.get(AgentTask, task_id).output_data == {'ok': True}
+
+
+def test_twin_lookup_loads_text_up_front(app, project):
+    document = _document(project, file_hash='abc', processing_status='completed', extracted_text='x')
+    db.session.add(document)
+    db.session.commit()
+    db.session.expunge_all()
+
+    twin = Document.find_analyzed_twin('abc')
+    assert twin.__dict__['extracted_text'] == 'x'
+
+
+def test_migration_re_encodes_old_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.sqlite3'}")
+    long_text = 'Section 4.2 applies. ' * 100
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE document (id INTEGER PRIMARY KEY, extracted_text TEXT, extracted_metadata JSON)'))
+        connection.execute(text('CREATE TABLE agent_task (id INTEGER PRIMARY KEY, output_data JSON)'))
+        connection.execute(text("INSERT INTO document VALUES (1, :text, '{\"pages\": 3}'), (2, NULL, NULL)"),
+                           {'text': long_text})
+        connection.execute(text("INSERT INTO agent_task VALUES (1, '[1, 2]')"))
+
+    assert upgrade(engine) == {
+        'document.extracted_text': 1,
+        'document.extracted_metadata': 1,
+        'agent_task.output_data': 1,
+    }
+    # Already converted rows are left alone
+    assert set(upgrade(engine).values()) == {0}
+
+    with engine.connect() as connection:
+        stored_text, stored_metadata = connection.execute(
+            text('SELECT extracted_text, extracted_metadata FROM document WHERE id = 1')).one()
+        output = connection.execute(text('SELECT output_data FROM agent_task')).scalar()
+
+    assert len(long_text.encode()) >= COMPRESS_MIN_BYTES
+    assert CompressedText().process_result_value(stored_text, None) == long_text
+    assert CompressedJSON().process_result_value(stored_metadata, None) == {'pages': 3}
+    assert CompressedJSON().process_result_value(output, None) == [1, 2]
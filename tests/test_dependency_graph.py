@@ -0,0 +1,96 @@
+# tests/test_dependency_graph.py
+from datetime import datetime, timedelta
+
+import dependency_graph
+from dependency_graph import DependencyGraph, dependency_ids, project_graph
+from models import Requirement, db
+
+
+def _graph(edges, weights=None):
+    graph = DependencyGraph()
+    for node, targets in edges.items():
+        graph.set_node(node, targets, (weights or {}).get(node, 1.0))
+    return graph
+
+
+def test_dependency_ids_accepts_mixed_values():
+    assert dependency_ids(['REQ-001', {'requirement_id': 'REQ-002'}, {'id': ' REQ-003 '}, '', None]) == \
+        ['REQ-001', 'REQ-002', 'REQ-003']
+    assert dependency_ids('REQ-009') == ['REQ-009']
+    assert dependency_ids(None) == []
+
+
+def test_build_order_and_cycles():
+    # D -> C -> B <-> A, and C also names a requirement that does not exist
+    graph = _graph({'A': ['B'], 'B': ['A'], 'C': ['B', 'X'], 'D': ['C', 'D']})
+
+    order = graph.topological_order()
+    assert order == ['A', 'B', 'C', 'D']
+    assert graph.cycles() == [['A', 'B']]
+    assert graph.missing() == {'X': ['C']}
+    assert graph.edge_count == 5  # the self-reference is dropped
+
+
+def test_transitive_closure():
+    graph = _graph({'A': ['B'], 'B': ['A'], 'C': ['B'], 'D': ['C'], 'E': []})
+
+    assert graph.dependencies_of('D') == ['A', 'B', 'C']
+    assert graph.dependencies_of('A') == ['B']
+    assert graph.dependencies_of('E') == []
+    assert graph.dependencies_of('unknown') == []
+    assert graph.closure_sizes() == {'A': 1, 'B': 1, 'C': 2, 'D': 3, 'E': 0}
+    assert graph.impact('A') == {'B': 1, 'C': 2, 'D': 3}
+
+
+def test_derived_results_follow_edits():
+    graph = _graph({'A': ['B'], 'B': []})
+    assert graph.cycles() == []
+
+    assert graph.set_node('B', ['A'])
+    assert not graph.set_node('B', ['A'])
+    assert graph.cycles() == [['A', 'B']]
+
+    assert graph.remove_node('A')
+    assert graph.cycles() == []
+    assert graph.missing() == {'A': ['B']}
+
+
+def test_critical_path_counts_a_cycle_as_one_step():
+    graph = _graph({'A': [], 'B': ['A'], 'C': ['D'], 'D': ['C'], 'E': ['B', 'C']},
+                   weights={'A': 5, 'B': 1, 'C': 2, 'D': 2, 'E': 1})
+
+    assert graph.critical_path() == {'path': ['A', 'B', 'E'], 'effort': 7.0, 'length': 3}
+    assert DependencyGraph().critical_path() == {'path': [], 'effort': 0, 'length': 0}
+
+
+def test_long_chain_does_not_recurse():
+    graph = _graph({f'R{i}': [f'R{i + 1}'] for i in range(5000)})
+
+    order = graph.topological_order()
+    assert order[0] == 'R4999' and order[-1] == 'R0'
+    assert graph.closure_sizes()['R0'] == 4999
+
+
+def test_project_graph_applies_edits_to_the_cached_graph(app, project, monkeypatch):
+    monkeypatch.setattr(dependency_graph, '_graphs', {})
+    now = datetime.utcnow()
+    db.session.add_all([
+        Requirement(requirement_id='REQ-001', title='a', description='a', project_id=project.id, updated_at=now),
+        Requirement(requirement_id='REQ-002', title='b', description='b', project_id=project.id,
+                    dependencies=['REQ-001'], updated_at=now),
+    ])
+    db.session.commit()
+
+    first = project_graph(project.id)
+    assert first.topological_order() == ['REQ-001', 'REQ-002']
+    assert project_graph(project.id) is first
+
+    requirement = Requirement.query.filter_by(requirement_id='REQ-001').one()
+    requirement.dependencies = ['REQ-002']
+    requirement.updated_at = now + timedelta(seconds=1)
+    db.session.commit()
+
+    second = project_graph(project.id)
+    assert second is not first
+    assert second.cycles() == [['REQ-001', 'REQ-002']]
+    assert first.cycles() == []
@@ -0,0 +1,19 @@
+# tests/test_document_intelligence.py
+import asyncio
+
+import pytest
+
+from agents.document_intelligence import DocumentIntelligenceAgent
+from extraction.pages import UnsupportedDocumentError
+
+
+def test_unsupported_format_fails_instead_of_yielding_an_empty_page(tmp_path, agents):
+    path = tmp_path / 'spec.doc'
+    path.write_bytes(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1')
+    agent = DocumentIntelligenceAgent(agents['Document Intelligence'].id)
+
+    async def pages():
+        return [page async for page in agent._iter_pages(str(path), 'application/msword')]
+
+    with pytest.raises(UnsupportedDocumentError, match=r'\.docx'):
+        asyncio.run(pages())
@@ -0,0 +1,91 @@
+# tests/test_extraction_cache.py
+import os
+
+import pytest
+
+from config import Config
+from extraction import cache, pages as pages_module, word as word_extractor
+from extraction.pages import WORD_MIME_TYPES, current_extractors, purge_stale_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'EXTRACTION_CACHE_DIR', str(tmp_path / 'cache'))
+    return tmp_path / 'cache'
+
+
+def _store(file_hash, extractor, version, pages):
+    for _ in cache.cache_pages(pages, file_hash, extractor, version):
+        pass
+
+
+def test_purge_keeps_only_current_extractor_versions(cache_dir):
+    versions = current_extractors()
+    _store('ab12', 'word', versions['word'], [{'page': 1, 'text': 'current'}])
+    _store('ab12', 'word', 'old', [{'page': 1, 'text': 'stale'}])
+    _store('cd34', 'pdf', 'old', [{'page': 1, 'text': 'stale'}])
+
+    assert purge_stale_cache() == 2
+    assert sorted(os.listdir(cache_dir / 'word')) == [versions['word']]
+    assert os.listdir(cache_dir / 'pdf') == []
+    assert list(cache.iter_cached_pages('ab12', 'word', versions['word'])) == [{'page': 1, 'text': 'current'}]
+    assert purge_stale_cache() == 0
+
+
+@pytest.fixture
+def extractions(monkeypatch):
+    """Word extraction that counts how often it actually ran"""
+
+    runs = []
+
+    def iter_raw_pages(file_path, mime_type):
+        runs.append(file_path)
+        for number in (1, 2):
+            yield {'page': number, 'text': f"{file_path} page {number}"}
+
+    monkeypatch.setattr(pages_module, 'iter_raw_pages', iter_raw_pages)
+    return runs
+
+
+def _read(file_path, file_hash):
+    return [page['text'] for page in pages_module.iter_document_pages(file_path, WORD_MIME_TYPES[-1], file_hash)]
+
+
+def test_pages_are_cached_by_file_hash_and_extractor_version(cache_dir, extractions, monkeypatch):
+    assert _read('a.docx', 'ab12') == ['a.docx page 1', 'a.docx page 2']
+    # Same content under another name is served from the cache
+    assert _read('copy.docx', 'ab12') == ['a.docx page 1', 'a.docx page 2']
+    assert extractions == ['a.docx']
+
+    cached = list(pages_module.iter_cached_document_pages(WORD_MIME_TYPES[-1], 'ab12'))
+    assert all(page['cached'] for page in cached)
+    assert [(page['start'], page['end']) for page in cached] == [(0, 13), (14, 27)]
+
+    _read('b.docx', 'cd34')
+    previous = word_extractor.EXTRACTOR_VERSION
+    monkeypatch.setattr(word_extractor, 'EXTRACTOR_VERSION', 'next')
+    assert _read('a.docx', 'ab12') == ['a.docx page 1', 'a.docx page 2']
+    assert extractions == ['a.docx', 'b.docx', 'a.docx']
+    assert sorted(os.listdir(cache_dir / 'word')) == sorted([previous, 'next'])
+
+
+def test_incomplete_extractions_are_not_cached(cache_dir, extractions, monkeypatch):
+    def broken_pages(file_path, mime_type):
+        yield {'page': 1, 'text': 'readable'}
+        raise ValueError('truncated file')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(pages_module, 'iter_raw_pages', broken_pages)
+        with pytest.raises(ValueError):
+            _read('a.docx', 'ab12')
+    assert pages_module.iter_cached_document_pages(WORD_MIME_TYPES[-1], 'ab12') is None
+    assert os.listdir(cache_dir / 'word' / current_extractors()['word'] / 'ab') == []
+
+    failed = cache.cache_pages([{'page': 1, 'text': '', 'ocr_failed': True}], 'cd34', 'pdf', '1')
+    assert [page['page'] for page in failed] == [1]
+    assert cache.iter_cached_pages('cd34', 'pdf', '1') is None
+
+    # Without a hash nothing is written
+    _read('c.docx', None)
+    _read('c.docx', None)
+    assert extractions == ['c.docx', 'c.docx']
@@ -0,0 +1,36 @@
+# tests/test_extraction_normalize.py
+from extraction.normalize import normalize_text, strip_boilerplate
+
+
+def _page(number, total=12):
+    return {'page': number, 'text': (
+        f"ACME Tender RFP-17   Confidential\nPage {number} of {total}\n\nSection {number}\n"
+        f"The supplier shall meet require-\nments   of clause {number}.\n\n\n\nSee annex {number}.\n- {number} -")}
+
+
+def test_running_headers_footers_and_page_numbers_are_stripped():
+    pages = list(strip_boilerplate(_page(number) for number in range(1, 13)))
+
+    assert [page['page'] for page in pages] == list(range(1, 13))
+    # The first page already knows the header repeats further on
+    assert pages[0]['text'] == "Section 1\nThe supplier shall meet requirements of clause 1.\n\nSee annex 1."
+    assert pages[11]['text'] == "Section 12\nThe supplier shall meet requirements of clause 12.\n\nSee annex 12."
+    assert pages[0]['boilerplate_lines'] == 3
+    assert pages[0]['raw_chars'] == len(_page(1)['text'])
+
+
+def test_short_documents_only_lose_page_numbers():
+    page, = strip_boilerplate([_page(1, total=1)])
+
+    assert page['text'].startswith("ACME Tender RFP-17 Confidential\n\nSection 1\n")
+    assert page['boilerplate_lines'] == 2
+
+
+def test_structured_pages_pass_through_untouched():
+    page = {'page': 1, 'text': 'Header\n1', 'blocks': []}
+
+    assert list(strip_boilerplate([page])) == [{'page': 1, 'text': 'Header\n1', 'blocks': []}]
+
+
+def test_normalize_text_joins_hyphenation_and_collapses_whitespace():
+    assert normalize_text("  Avail-\n  ability   is\t key\n\n\n\nNext-Gen\n") == "Availability is key\n\nNext-Gen"
@@ -0,0 +1,60 @@
+# tests/test_extraction_ocr.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from extraction import ocr
+
+TEXT_LAYER = 'The supplier shall provide the platform as a managed service.'
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    """OCR that records which pages it was asked for; page 3 fails"""
+
+    calls = []
+    lock = threading.Lock()
+
+    def ocr_pdf_page(file_path, page_number):
+        with lock:
+            calls.append(page_number)
+        if page_number == 3:
+            raise RuntimeError('tesseract crashed')
+        return {'page': page_number, 'text': f"Scanned page {page_number} text", 'source': 'ocr'}
+
+    monkeypatch.setattr(ocr, 'ocr_pdf_page', ocr_pdf_page)
+    return calls
+
+
+def _pages():
+    return [{'page': 1, 'text': TEXT_LAYER}, {'page': 2, 'text': ''},
+            {'page': 3, 'text': '  '}, {'page': 4, 'text': 'Page 4'}, {'page': 5, 'text': TEXT_LAYER}]
+
+
+@pytest.mark.parametrize('pooled', [True, False])
+def test_only_pages_without_a_text_layer_are_ocred(monkeypatch, scans, pooled):
+    executor = ThreadPoolExecutor(max_workers=2) if pooled else None
+    monkeypatch.setattr(ocr, 'get_process_pool', lambda: executor)
+    try:
+        pages = list(ocr.iter_ocr_missing_pages('scan.pdf', iter(_pages())))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    assert sorted(scans) == [2, 3, 4]
+    assert [page['page'] for page in pages] == [1, 2, 3, 4, 5]
+    assert [page['source'] for page in pages] == ['text', 'ocr', 'text', 'ocr', 'text']
+    assert pages[0]['text'] == TEXT_LAYER and pages[3]['text'] == 'Scanned page 4 text'
+    # A failed page keeps its (empty) text layer and is flagged
+    assert pages[2]['ocr_failed'] and pages[2]['ocr_error'] == 'tesseract crashed'
+    assert not any(page.get('ocr_failed') for page in pages if page['page'] != 3)
+
+
+def test_unreadable_pdf_is_ocred_page_by_page(monkeypatch, scans):
+    monkeypatch.setattr(ocr, 'get_process_pool', lambda: None)
+
+    pages = list(ocr.iter_ocr_pdf('scan.pdf', page_count=2))
+
+    assert scans == [1, 2]
+    assert [page['text'] for page in pages] == ['Scanned page 1 text', 'Scanned page 2 text']
@@ -0,0 +1,12 @@
+# tests/test_extraction_pages.py
+import pytest
+
+from extraction.pages import UnsupportedDocumentError, iter_raw_pages
+
+
+def test_legacy_word_document_is_rejected_with_a_hint(tmp_path):
+    path = tmp_path / 'spec.doc'
+    path.write_bytes(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1')
+
+    with pytest.raises(UnsupportedDocumentError, match=r'save the file as \.docx'):
+        next(iter_raw_pages(str(path), 'application/msword'))
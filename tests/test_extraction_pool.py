@@ -0,0 +1,12 @@
+# tests/test_extraction_pool.py
+import multiprocessing
+
+from extraction import pool
+
+
+def test_no_pool_inside_daemonic_process(monkeypatch):
+    monkeypatch.setattr(multiprocessing.current_process(), 'daemon', True, raising=False)
+    monkeypatch.setattr(pool, '_pool', None)
+
+    assert pool.get_process_pool() is None
+    assert pool._pool is None
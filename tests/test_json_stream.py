@@ -0,0 +1,49 @@
+# tests/test_json_stream.py
+from agents.json_stream import JSONArrayStreamParser
+
+
+def feed_all(parser, pieces):
+    return [element for piece in pieces for element in parser.feed(piece)]
+
+
+def test_elements_are_yielded_as_they_close():
+    parser = JSONArrayStreamParser()
+
+    assert feed_all(parser, ['[{"id": 1, "ti', 'tle": "A"}']) == [{'id': 1, 'title': 'A'}]
+    assert feed_all(parser, [', {"id": 2}', ']']) == [{'id': 2}]
+    assert parser.finished
+
+
+def test_single_character_chunks():
+    text = '[{"a": [1, {"b": 2}]}, {"c": "x"}]'
+    parser = JSONArrayStreamParser()
+
+    assert feed_all(parser, list(text)) == [{'a': [1, {'b': 2}]}, {'c': 'x'}]
+
+
+def test_prose_and_fences_around_the_array_are_skipped():
+    parser = JSONArrayStreamParser()
+    text = 'Here are the requirements:\n```json\n[{"id": 1}]\n```\nLet me know if [anything] else.'
+
+    assert feed_all(parser, [text]) == [{'id': 1}]
+
+
+def test_brackets_and_escapes_inside_strings():
+    parser = JSONArrayStreamParser()
+    text = r'[{"text": "closing } and ] and \"quoted\" \\"}, {"n": 2}]'
+
+    assert feed_all(parser, [text]) == [{'text': 'closing } and ] and "quoted" \\'}, {'n': 2}]
+
+
+def test_truncated_stream_keeps_completed_elements():
+    parser = JSONArrayStreamParser()
+
+    assert feed_all(parser, ['[{"id": 1}, {"id": 2, "title": "cut o']) == [{'id': 1}]
+    assert not parser.finished
+
+
+def test_malformed_elements_are_counted_and_skipped():
+    parser = JSONArrayStreamParser()
+
+    assert feed_all(parser, ['[{"id": 1,}, {"id": 2}]']) == [{'id': 2}]
+    assert parser.errors == 1
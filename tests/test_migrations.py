@@ -0,0 +1,92 @@
+# tests/test_migrations.py
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from migrations import (document_twins, requirement_duplicates, requirement_source_chunk,
+                        requirement_unique_ids, task_lease_columns)
+
+
+def _legacy(tmp_path, *statements):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.sqlite3'}")
+    with engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+    return engine
+
+
+def _columns(engine, table):
+    return {column['name'] for column in inspect(engine).get_columns(table)}
+
+
+def _indexes(engine, table):
+    return {index['name'] for index in inspect(engine).get_indexes(table)}
+
+
+def test_document_twins_adds_the_twin_column_and_hash_index(tmp_path):
+    engine = _legacy(tmp_path,
+                     'CREATE TABLE document (id INTEGER PRIMARY KEY, file_hash VARCHAR(64))',
+                     "INSERT INTO document VALUES (1, 'abc')")
+
+    assert document_twins.upgrade(engine) == {'document.duplicate_of_id': True, 'ix_document_file_hash': True}
+    assert set(document_twins.upgrade(engine).values()) == {False}
+
+    assert 'duplicate_of_id' in _columns(engine, 'document')
+    assert 'ix_document_file_hash' in _indexes(engine, 'document')
+    assert [fk['referred_table'] for fk in inspect(engine).get_foreign_keys('document')] == ['document']
+    with engine.connect() as connection:
+        assert connection.execute(text('SELECT duplicate_of_id FROM document')).scalar() is None
+
+
+def test_task_lease_columns_expire_tasks_left_running(tmp_path):
+    engine = _legacy(tmp_path,
+                     'CREATE TABLE agent_task (id INTEGER PRIMARY KEY, status VARCHAR(50))',
+                     "INSERT INTO agent_task VALUES (1, 'in_progress'), (2, 'pending')")
+
+    assert set(task_lease_columns.upgrade(engine).values()) == {True}
+    assert set(task_lease_columns.upgrade(engine).values()) == {False}
+
+    assert {'lease_owner', 'lease_expires_at', 'heartbeat_at', 'attempts'} <= _columns(engine, 'agent_task')
+    assert {'ix_agent_task_status', 'ix_agent_task_lease_expires_at'} <= _indexes(engine, 'agent_task')
+    with engine.connect() as connection:
+        rows = connection.execute(text('SELECT id, attempts, lease_expires_at FROM agent_task ORDER BY id')).all()
+    assert [(row.id, row.attempts, row.lease_expires_at is not None) for row in rows] == [(1, 0, True), (2, 0, False)]
+
+
+def test_requirement_source_chunk_creates_the_chunk_table_first(tmp_path):
+    engine = _legacy(tmp_path,
+                     'CREATE TABLE document (id INTEGER PRIMARY KEY)',
+                     'CREATE TABLE requirement (id INTEGER PRIMARY KEY, requirement_id VARCHAR(50))')
+
+    assert requirement_source_chunk.upgrade(engine) == {'document_chunk': True, 'requirement.source_chunk_id': True}
+    assert set(requirement_source_chunk.upgrade(engine).values()) == {False}
+
+    assert 'source_chunk_id' in _columns(engine, 'requirement')
+    assert [fk['referred_table'] for fk in inspect(engine).get_foreign_keys('requirement')] == ['document_chunk']
+
+
+def test_requirement_duplicates_adds_the_link_and_score(tmp_path):
+    engine = _legacy(tmp_path, 'CREATE TABLE requirement (id INTEGER PRIMARY KEY, requirement_id VARCHAR(50))')
+
+    assert set(requirement_duplicates.upgrade(engine).values()) == {True}
+    assert set(requirement_duplicates.upgrade(engine).values()) == {False}
+
+    assert {'duplicate_of_id', 'duplicate_score'} <= _columns(engine, 'requirement')
+    assert 'ix_requirement_duplicate_of_id' in _indexes(engine, 'requirement')
+
+
+def test_requirement_unique_ids_renames_clashes_before_adding_the_constraint(tmp_path):
+    engine = _legacy(tmp_path,
+                     'CREATE TABLE requirement (id INTEGER PRIMARY KEY, project_id INTEGER, requirement_id VARCHAR(50))',
+                     "INSERT INTO requirement VALUES (1, 1, 'REQ-001'), (2, 1, 'REQ-002'), (3, 1, 'REQ-001'), "
+                     "(4, 2, 'REQ-001'), (5, 1, 'REQ-001')")
+
+    assert requirement_unique_ids.upgrade(engine) == {'renamed': 2, 'uq_requirement_project_requirement_id': True}
+    assert requirement_unique_ids.upgrade(engine) == {'renamed': 0, 'uq_requirement_project_requirement_id': False}
+
+    with engine.connect() as connection:
+        rows = connection.execute(text('SELECT id, requirement_id FROM requirement ORDER BY id')).all()
+    assert [tuple(row) for row in rows] == [(1, 'REQ-001'), (2, 'REQ-002'), (3, 'REQ-001-3'),
+                                            (4, 'REQ-001'), (5, 'REQ-001-5')]
+    with pytest.raises(IntegrityError), engine.begin() as connection:
+        connection.execute(text("INSERT INTO requirement VALUES (6, 2, 'REQ-001')"))
@@ -0,0 +1,63 @@
+# tests/test_pipeline.py
+from models import db, Document
+from pipeline import advance_pipeline, pipeline_tasks, stage_task_id, start_pipeline
+
+
+def make_documents(project, count):
+    documents = [Document(filename=f"doc{n}.pdf", original_filename=f"doc{n}.pdf", file_path=f"/tmp/doc{n}.pdf",
+                          project_id=project.id) for n in range(count)]
+    db.session.add_all(documents)
+    db.session.commit()
+    return documents
+
+
+def finish(pipeline_id, stage, status, document_id=None):
+    """Put a stage task in a terminal state and advance the pipeline from it"""
+
+    task = pipeline_tasks(pipeline_id)[stage_task_id(pipeline_id, stage, document_id)]
+    task.status = status
+    db.session.commit()
+    return sorted(task.task_type for task in advance_pipeline(task))
+
+
+def test_branches_fan_in_to_project_stages(project, agents):
+    first, second = make_documents(project, 2)
+    pipeline_id = start_pipeline(project.id, [first.id, second.id])['pipeline_id']
+
+    assert finish(pipeline_id, 'document_analysis', 'completed', first.id) == ['requirement_extraction']
+    assert finish(pipeline_id, 'document_analysis', 'completed', second.id) == ['requirement_extraction']
+    assert finish(pipeline_id, 'requirement_extraction', 'completed', first.id) == []
+    assert finish(pipeline_id, 'requirement_extraction', 'completed', second.id) == ['requirement_analysis']
+    assert finish(pipeline_id, 'requirement_analysis', 'completed') == ['dependency_mapping']
+
+
+def test_late_upstream_failure_still_resolves_fan_in(project, agents):
+    first, second = make_documents(project, 2)
+    pipeline_id = start_pipeline(project.id, [first.id, second.id])['pipeline_id']
+
+    finish(pipeline_id, 'document_analysis', 'completed', first.id)
+    # The first branch is done while the second is still being analysed
+    assert finish(pipeline_id, 'requirement_extraction', 'completed', first.id) == []
+    # The second branch dies a stage earlier than the one the fan-in waits for
+    assert finish(pipeline_id, 'document_analysis', 'failed', second.id) == ['requirement_analysis']
+
+
+def test_fan_in_needs_one_successful_branch(project, agents):
+    first, second = make_documents(project, 2)
+    pipeline_id = start_pipeline(project.id, [first.id, second.id])['pipeline_id']
+
+    finish(pipeline_id, 'document_analysis', 'failed', first.id)
+    assert finish(pipeline_id, 'document_analysis', 'failed', second.id) == []
+    assert stage_task_id(pipeline_id, 'requirement_analysis') not in pipeline_tasks(pipeline_id)
+
+
+def test_project_stage_is_created_once(project, agents):
+    first, second = make_documents(project, 2)
+    pipeline_id = start_pipeline(project.id, [first.id, second.id])['pipeline_id']
+
+    finish(pipeline_id, 'document_analysis', 'completed', first.id)
+    finish(pipeline_id, 'document_analysis', 'failed', second.id)
+    assert finish(pipeline_id, 'requirement_extraction', 'completed', first.id) == ['requirement_analysis']
+    # A repeated terminal event must not create it again
+    task = pipeline_tasks(pipeline_id)[stage_task_id(pipeline_id, 'document_analysis', second.id)]
+    assert advance_pipeline(task) == []
@@ -0,0 +1,53 @@
+# tests/test_requirement_candidates.py
+from agents.requirement_candidates import pack_candidates, select_candidates
+
+TENDER = [
+    "TABLE OF CONTENTS\n1. Scope .......... 3\n2. Hosting .......... 4\n",
+    "GLOSSARY\nSupplier: the party that shall deliver the services.\n\n1. Scope\n"
+    "This document describes the platform.\n\nThe Contractor shall:\n- host the platform in the EU;\n"
+    "- keep backups for 30 days.\n\nThe project started in 2019.\n",
+    "2. Hosting\nThe history of the project is long.\nAvailability must be at least 99.9% per month.\n",
+]
+
+
+def _pages(texts):
+    pages, position = [], 0
+    for number, text in enumerate(texts, 1):
+        pages.append({'page': number, 'text': text, 'start': position, 'end': position + len(text)})
+        position += len(text) + 1
+    return pages
+
+
+def test_normative_clauses_are_selected_with_their_section_and_offsets():
+    passages = list(select_candidates(_pages(TENDER)))
+    joined = "\n".join(TENDER)
+
+    assert [(passage['heading'], passage['page'], passage['text']) for passage in passages] == [
+        # The short clause before a lead-in is kept as context
+        ('1. Scope', 2, 'This document describes the platform.\nThe Contractor shall:'),
+        ('1. Scope', 2, '- host the platform in the EU;'),
+        ('1. Scope', 2, '- keep backups for 30 days.'),
+        ('2. Hosting', 3, 'The history of the project is long.\nAvailability must be at least 99.9% per month.'),
+    ]
+    # Contents, the glossary's "shall" and unrelated prose are skipped
+    for passage in passages:
+        assert passage['text'].split("\n")[-1] in joined[passage['start']:passage['end']]
+
+
+def test_long_clauses_are_cut_to_their_normative_sentences():
+    filler = ' '.join(f"Background sentence {number}." for number in range(60))
+    passage, = select_candidates(_pages([f"{filler} The supplier must encrypt all data. {filler} "
+                                         f"Logs shall be kept for a year. {filler}"]))
+
+    assert passage['text'] == ('Background sentence 59. The supplier must encrypt all data. Background sentence 0. '
+                               '[...] Background sentence 59. Logs shall be kept for a year. Background sentence 0.')
+
+
+def test_passages_are_packed_into_labelled_chunks():
+    chunks = list(pack_candidates(select_candidates(_pages(TENDER)), max_tokens=30))
+
+    assert [chunk['text'].split("\n")[0] for chunk in chunks] == \
+        ['[Page 2 | 1. Scope]', '[Page 2 | 1. Scope]', '[Page 3 | 2. Hosting]']
+    assert [chunk['index'] for chunk in chunks] == [0, 1, 2]
+    assert [chunk['last'] for chunk in chunks] == [False, False, True]
+    assert all(chunk['excerpts'] and chunk['tokens'] <= 30 for chunk in chunks)
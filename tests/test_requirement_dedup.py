@@ -0,0 +1,47 @@
+# tests/test_requirement_dedup.py
+import pytest
+
+from agents import requirement_dedup
+from agents.requirement_dedup import NearDuplicateIndex, find_duplicates, minhash, similarity
+
+BASE = ("The system shall encrypt all customer data at rest using AES-256 and rotate "
+        "the encryption keys at least once every ninety days through the managed key service")
+REWORDED = BASE.replace('ninety days', 'ninety calendar days')
+UNRELATED = ("Vendor must provide on-site training for up to forty administrators "
+             "during the first month after go-live, including printed manuals")
+
+
+def test_pure_python_signature_matches_numpy(monkeypatch):
+    pytest.importorskip('numpy')
+    vectorised = minhash(BASE)
+    monkeypatch.setattr(requirement_dedup, 'np', None)
+
+    assert minhash(BASE) == vectorised
+
+
+def test_signature_estimates_similarity():
+    assert minhash('') is None
+    assert minhash('  --  ') is None
+    assert similarity(minhash(BASE), minhash(BASE.upper())) == 1.0
+    assert similarity(minhash(BASE), minhash(REWORDED)) >= 0.7
+    assert similarity(minhash(BASE), minhash(UNRELATED)) < 0.3
+
+
+def test_duplicates_point_at_first_copy():
+    items = [('a', BASE), ('b', UNRELATED), ('c', REWORDED), ('d', BASE), ('e', '')]
+
+    found = {key: (original, round(score, 2)) for key, original, score in find_duplicates(items)}
+
+    assert set(found) == {'c', 'd'}
+    assert found['c'][0] == 'a'
+    assert found['d'] == ('a', 1.0)
+
+
+def test_index_only_keeps_originals():
+    index = NearDuplicateIndex()
+
+    assert index.add_or_match(1, BASE) is None
+    assert index.add_or_match(2, REWORDED)[0] == 1
+    assert index.add_or_match(3, UNRELATED) is None
+    assert len(index) == 2
+    assert index.match(None) is None
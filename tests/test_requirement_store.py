@@ -0,0 +1,142 @@
+# tests/test_requirement_store.py
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from agents.requirements_engineering import RequirementsEngineeringAgent
+from models import db, Document, Requirement, SystemLog
+from requirement_store import RequirementNumbers, RequirementWriter, upsert_requirements
+
+ITEMS_PER_DOCUMENT = 15
+
+
+def _row(project, requirement_id, **values):
+    return dict({'project_id': project.id, 'requirement_id': requirement_id,
+                 'title': requirement_id, 'description': f"{requirement_id} text"}, **values)
+
+
+def _stored(project):
+    return {requirement.requirement_id: requirement
+            for requirement in Requirement.query.filter_by(project_id=project.id)}
+
+
+def test_upsert_inserts_new_rows_and_updates_existing(app, project):
+    upsert_requirements([_row(project, 'REQ-001', priority='must_have', acceptance_criteria=['a']),
+                         _row(project, 'REQ-002')])
+    db.session.commit()
+
+    upsert_requirements([
+        _row(project, 'REQ-002', title='Renamed'),
+        _row(project, 'REQ-003'),
+        # Partial rows only touch the columns they name
+        {'project_id': project.id, 'requirement_id': 'REQ-001', 'priority': 'could_have'},
+    ])
+    db.session.commit()
+    db.session.expire_all()
+
+    stored = _stored(project)
+    assert sorted(stored) == ['REQ-001', 'REQ-002', 'REQ-003']
+    assert stored['REQ-001'].priority == 'could_have'
+    assert stored['REQ-001'].acceptance_criteria == ['a']
+    assert stored['REQ-001'].title == 'REQ-001'
+    assert stored['REQ-002'].title == 'Renamed'
+    assert stored['REQ-003'].status == 'identified'
+
+
+def test_writer_drops_rows_that_failed_to_write(app, project):
+    upsert_requirements([_row(project, 'REQ-001')])
+    db.session.commit()
+
+    writer = RequirementWriter()
+    writer.add(_row(project, 'REQ-001'))
+    with pytest.raises(IntegrityError):
+        writer.flush()
+
+    # The failed row does not poison later writes
+    writer.add(_row(project, 'REQ-002'))
+    writer.flush()
+    assert writer.id_of('REQ-002') is not None
+    assert writer.id_of('REQ-001') is None
+    assert sorted(_stored(project)) == ['REQ-001', 'REQ-002']
+
+
+def test_numbers_start_above_those_in_use(app, project):
+    numbers = RequirementNumbers(project.id, floor=7, block=2)
+    assert [next(numbers), next(numbers), next(numbers)] == [8, 9, 10]
+
+    # A lower floor never moves the counter back; 11 was reserved and is skipped
+    assert next(RequirementNumbers(project.id, floor=3, block=2)) == 12
+
+
+def test_writer_batches_rows_by_size_and_age(app, project):
+    writer = RequirementWriter(batch_size=3, max_delay=0.05)
+    writer.add(_row(project, 'REQ-001'))
+    writer.add(_row(project, 'REQ-002'))
+    assert _stored(project) == {}
+
+    writer.add(_row(project, 'REQ-003'))
+    assert sorted(_stored(project)) == ['REQ-001', 'REQ-002', 'REQ-003']
+
+    writer.add(_row(project, 'REQ-004'))
+    assert not writer.due()
+    time.sleep(0.06)
+    assert writer.due()
+    writer.add(_row(project, 'REQ-005'))
+    assert sorted(_stored(project))[-2:] == ['REQ-004', 'REQ-005']
+
+
+class StreamingAgent(RequirementsEngineeringAgent):
+    """Answers every extraction prompt with a fixed list of requirements, slowly"""
+
+    async def stream_claude_json_array(self, prompt, system_prompt=None, max_tokens=4000, use_cache=True):
+        document = 'alpha' if 'alpha.pdf' in prompt else 'beta'
+        for number in range(1, ITEMS_PER_DOCUMENT + 1):
+            time.sleep(0.002)  # let the other extraction's thread interleave
+            await asyncio.sleep(0)
+            yield {'requirement_id': f"REQ-{number:03d}", 'title': f"{document} requirement {number}",
+                   'description': "The system shall provide " + ' '.join(f"{document}{number}term{word}" for word in range(6))}
+
+    def refresh_search_index(self, project_id):
+        pass
+
+
+def test_parallel_extractions_number_requirements_uniquely(app, project, agents):
+    upsert_requirements([_row(project, 'REQ-007')])
+    documents = [Document(filename=name, original_filename=name, file_path=f"/tmp/{name}",
+                          project_id=project.id, processing_status='completed',
+                          extracted_text='The supplier shall deliver the platform.')
+                 for name in ('alpha.pdf', 'beta.pdf')]
+    db.session.add_all(documents)
+    db.session.commit()
+    agent_id = agents['Requirements Engineering'].id
+    jobs = [(project.id, document.id) for document in documents]
+
+    results, errors = [], []
+
+    def extract(project_id, document_id):
+        with app.app_context():
+            try:
+                agent = StreamingAgent(agent_id)
+                results.append(asyncio.run(agent._extract_requirements(project_id, [document_id])))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=extract, args=job) for job in jobs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert [result['total_requirements'] for result in results] == [ITEMS_PER_DOCUMENT] * 2
+    db.session.expire_all()
+    stored = _stored(project)
+    numbers = sorted(int(requirement_id.split('-')[1]) for requirement_id in stored)
+    assert len(numbers) == 1 + 2 * ITEMS_PER_DOCUMENT
+    assert numbers[0] == 7 and numbers[1] > 7
+    assert not any(log.event_type == 'extraction_failed' for log in db.session.query(SystemLog))
@@ -0,0 +1,193 @@
+# tests/test_task_leases.py
+import time
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from agents import base_agent
+from agents.base_agent import BaseAgent
+from config import Config
+from models import db, AgentTask
+from task_leases import LeaseLost, claim_next_tasks, claim_task, heartbeat, reclaim_expired_tasks
+
+
+def make_task(agents, project, title='Task', priority='medium', status='pending'):
+    task = AgentTask(task_type='document_analysis', title=title, priority=priority, status=status,
+                     agent_id=agents['Document Intelligence'].id, project_id=project.id, input_data={})
+    db.session.add(task)
+    db.session.commit()
+    return task
+
+
+def steal(task, worker_id='other-worker'):
+    db.session.execute(db.update(AgentTask).where(AgentTask.id == task.id).values(lease_owner=worker_id))
+    db.session.commit()
+
+
+def test_claim_task_is_exclusive(project, agents):
+    task = make_task(agents, project)
+
+    assert claim_task(task.task_id, 'worker-a')
+    assert not claim_task(task.task_id, 'worker-b')
+
+    db.session.refresh(task)
+    assert task.status == 'in_progress'
+    assert task.lease_owner == 'worker-a'
+    assert task.attempts == 1
+    assert task.lease_expires_at > datetime.utcnow()
+
+
+def test_claim_next_tasks_takes_highest_priority_first(project, agents):
+    low = make_task(agents, project, 'low', priority='low')
+    high = make_task(agents, project, 'high', priority='high')
+    make_task(agents, project, 'done', priority='high', status='completed')
+
+    assert claim_next_tasks('worker-a', limit=1) == [high.task_id]
+    assert claim_next_tasks('worker-b', limit=5) == [low.task_id]
+    assert claim_next_tasks('worker-c', limit=5) == []
+
+
+def test_heartbeat_only_extends_own_lease(project, agents):
+    task = make_task(agents, project)
+    claim_task(task.task_id, 'worker-a')
+
+    assert heartbeat(task.task_id, 'worker-a', progress=40)
+    assert not heartbeat(task.task_id, 'worker-b')
+
+    db.session.refresh(task)
+    assert task.progress_percentage == 40
+
+
+def test_expired_leases_are_requeued_then_failed(project, agents):
+    task = make_task(agents, project)
+    claim_task(task.task_id, 'worker-a')
+    expired = datetime.utcnow() - timedelta(seconds=1)
+    db.session.execute(db.update(AgentTask).where(AgentTask.id == task.id).values(lease_expires_at=expired))
+    db.session.commit()
+
+    assert reclaim_expired_tasks(max_attempts=2) == {'requeued': [task.task_id], 'failed': []}
+    db.session.refresh(task)
+    assert task.status == 'pending'
+    assert task.lease_owner is None
+
+    # Second attempt also dies: no attempts left
+    claim_task(task.task_id, 'worker-b')
+    db.session.execute(db.update(AgentTask).where(AgentTask.id == task.id).values(lease_expires_at=expired))
+    db.session.commit()
+
+    assert reclaim_expired_tasks(max_attempts=2) == {'requeued': [], 'failed': [task.task_id]}
+    db.session.refresh(task)
+    assert task.status == 'failed'
+
+
+class ScriptedAgent(BaseAgent):
+    def __init__(self, agent_id, work):
+        super().__init__(agent_id)
+        self.work = work
+
+    async def _execute_task(self, task):
+        return await self.work(task)
+
+
+def run_leased(agent, task, worker_id='worker-a'):
+    claim_task(task.task_id, worker_id)
+    return asyncio.run(agent.process_task(task.task_id, worker_id=worker_id))
+
+
+def test_completed_task_releases_lease(project, agents):
+    task = make_task(agents, project)
+
+    async def work(task):
+        return {'answer': 42}
+
+    assert run_leased(ScriptedAgent(task.agent_id, work), task) == {'answer': 42}
+
+    db.session.refresh(task)
+    assert task.status == 'completed'
+    assert task.output_data == {'answer': 42}
+    assert task.lease_owner is None
+
+
+def test_result_is_discarded_when_lease_was_taken_over(project, agents):
+    task = make_task(agents, project)
+
+    async def work(running):
+        # Lease expired and another worker picked the task up meanwhile
+        steal(running)
+        return {'answer': 42}
+
+    with pytest.raises(LeaseLost):
+        run_leased(ScriptedAgent(task.agent_id, work), task)
+
+    db.session.refresh(task)
+    assert task.status == 'in_progress'
+    assert task.lease_owner == 'other-worker'
+    assert task.output_data is None
+
+
+def test_work_is_cancelled_when_heartbeat_fails(project, agents, monkeypatch):
+    monkeypatch.setattr(Config, 'TASK_LEASE_SECONDS', 3)
+    task = make_task(agents, project)
+    finished = []
+
+    async def work(running):
+        steal(running)
+        await asyncio.sleep(10)
+        finished.append(True)
+        return {}
+
+    with pytest.raises(LeaseLost):
+        run_leased(ScriptedAgent(task.agent_id, work), task)
+
+    assert not finished
+    db.session.refresh(task)
+    assert task.lease_owner == 'other-worker'
+
+
+def test_heartbeat_errors_are_retried(project, agents, monkeypatch):
+    monkeypatch.setattr(Config, 'TASK_LEASE_SECONDS', 3)
+    task = make_task(agents, project)
+    calls = []
+
+    def flaky_heartbeat(task_id, worker_id, **kwargs):
+        calls.append(task_id)
+        if len(calls) <= 2:
+            raise OperationalError('UPDATE agent_task', {}, Exception('database is locked'))
+        return heartbeat(task_id, worker_id, **kwargs)
+
+    monkeypatch.setattr(base_agent, 'heartbeat', flaky_heartbeat)
+
+    async def work(running):
+        await asyncio.sleep(3.2)
+        return {'answer': 42}
+
+    assert run_leased(ScriptedAgent(task.agent_id, work), task) == {'answer': 42}
+    assert len(calls) >= 3
+    db.session.refresh(task)
+    assert task.status == 'completed'
+
+
+def test_work_is_cancelled_when_renewal_keeps_failing(project, agents, monkeypatch):
+    monkeypatch.setattr(Config, 'TASK_LEASE_SECONDS', 3)
+    task = make_task(agents, project)
+    finished = []
+
+    def broken_heartbeat(task_id, worker_id, **kwargs):
+        raise OperationalError('UPDATE agent_task', {}, Exception('server closed the connection'))
+
+    monkeypatch.setattr(base_agent, 'heartbeat', broken_heartbeat)
+
+    async def work(running):
+        await asyncio.sleep(10)
+        finished.append(True)
+        return {}
+
+    started = time.monotonic()
+    with pytest.raises(LeaseLost):
+        run_leased(ScriptedAgent(task.agent_id, work), task)
+
+    # Given up before the 3 second lease could run out under another worker
+    assert time.monotonic() - started < 3
+    assert not finished
@@ -0,0 +1,82 @@
+# tests/test_task_queue.py
+import threading
+from datetime import datetime, timedelta
+
+import task_queue
+from agents.base_agent import BaseAgent
+from agents.llm_clients import LLMClientPool
+from models import db, AgentTask
+from task_leases import claim_task
+from task_queue import _thread_loops, close_thread_loops, run_in_thread_loop
+
+
+def test_thread_loop_is_reused_and_closed_with_its_clients():
+    seen = {}
+
+    async def open_client():
+        return LLMClientPool.anthropic('test-key')
+
+    def worker():
+        first = run_in_thread_loop(open_client())
+        second = run_in_thread_loop(open_client())
+        seen['clients'] = (first, second)
+        seen['loop'] = _thread_loops[threading.current_thread()]
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    first, second = seen['clients']
+    assert first is second
+    assert not seen['loop'].is_closed()
+
+    close_thread_loops(finished_only=True)
+
+    assert seen['loop'].is_closed()
+    assert first.is_closed()
+
+
+class RerunAgent(BaseAgent):
+    async def _execute_task(self, task):
+        return {'attempt': task.attempts}
+
+
+def test_expired_lease_is_reclaimed_and_run_again(app, project, agents, monkeypatch):
+    monkeypatch.setattr(task_queue, 'TASK_QUEUE_BACKEND', 'thread')
+    monkeypatch.setitem(task_queue.AGENT_CLASSES, 'Document Intelligence', RerunAgent)
+    monkeypatch.setattr(task_queue.LeaseReaper, 'start', classmethod(lambda cls, app, interval=None: None))
+
+    task = AgentTask(task_type='document_analysis', title='Analyze', status='pending', input_data={},
+                     agent_id=agents['Document Intelligence'].id, project_id=project.id)
+    db.session.add(task)
+    db.session.commit()
+    # The worker holding it died: the lease runs out with no heartbeat
+    claim_task(task.task_id, 'dead-worker')
+    db.session.execute(db.update(AgentTask).where(AgentTask.id == task.id)
+                       .values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+
+    try:
+        assert task_queue.reclaim_and_dispatch(app)['requeued'] == [task.task_id]
+    finally:
+        executor, task_queue.InProcessQueue._executor = task_queue.InProcessQueue._executor, None
+        executor.shutdown(wait=True)
+
+    db.session.refresh(task)
+    assert task.status == 'completed'
+    assert task.output_data == {'attempt': 2}
+    assert task.lease_owner is None
+
+
+def test_lease_reaper_reclaims_until_stopped(app, monkeypatch):
+    calls = threading.Semaphore(0)
+    monkeypatch.setattr(task_queue, 'reclaim_and_dispatch', lambda app: calls.release())
+
+    task_queue.LeaseReaper.start(app, interval=0.01)
+    task_queue.LeaseReaper.start(app, interval=0.01)  # already running: no second thread
+    try:
+        assert calls.acquire(timeout=2) and calls.acquire(timeout=2)
+        assert sum(thread.name == 'lease-reaper' for thread in threading.enumerate()) == 1
+    finally:
+        task_queue.LeaseReaper.stop()
+    assert not any(thread.name == 'lease-reaper' for thread in threading.enumerate())
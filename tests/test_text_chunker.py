@@ -0,0 +1,106 @@
+# tests/test_text_chunker.py
+from itertools import count
+
+from agents.text_chunker import RequirementMerger, SectionSplitter, chunk_pages, chunk_text
+
+CLAUSES = [f"{number}. Clause {number}\nThe supplier shall provide service level {number} for all users. "
+           "It shall be monitored." for number in range(1, 21)]
+
+
+def _pages(paragraphs, separator="\n\n", **fields):
+    pages, position = [], 0
+    for number, text in enumerate(paragraphs, 1):
+        pages.append(dict({'page': number, 'text': text, 'start': position, 'end': position + len(text)},
+                          **{name: values[number - 1] for name, values in fields.items()}))
+        position += len(text) + len(separator)
+    return pages
+
+
+def _split(pages):
+    splitter = SectionSplitter()
+    sections = [section for page in pages for section in splitter.add(page)]
+    return sections + splitter.finish()
+
+
+def test_chunks_fit_the_budget_and_cover_the_text_with_overlap():
+    text = "\n\n".join(CLAUSES)
+    chunks = chunk_text(text, max_tokens=60, overlap_tokens=25)
+
+    assert len(chunks) > 1
+    assert [chunk['index'] for chunk in chunks] == list(range(len(chunks)))
+    assert chunks[0]['start'] == 0 and chunks[-1]['end'] == len(text)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk['start'] < previous['end']  # the seam is seen twice
+        assert chunk['end'] > previous['end']
+    for chunk in chunks:
+        assert chunk['text'] == text[chunk['start']:chunk['end']]
+        assert chunk['tokens'] <= 60
+        # Cuts fall before a clause heading, never inside a sentence
+        assert chunk['text'].split('.', 1)[0].isdigit()
+
+
+def test_short_text_is_one_chunk_and_empty_text_none():
+    assert chunk_text('The supplier shall comply.', max_tokens=60) == [
+        {'index': 0, 'text': 'The supplier shall comply.', 'start': 0, 'end': 26, 'tokens': 7}]
+    assert chunk_text('', max_tokens=60) == []
+
+
+def test_text_without_sentences_is_cut_hard_within_budget():
+    chunks = chunk_text('x' * 1000, max_tokens=50)
+
+    assert all(chunk['tokens'] <= 50 for chunk in chunks)
+    assert ''.join(chunk['text'] for chunk in chunks) == 'x' * 1000
+
+
+def test_streamed_pages_chunk_like_the_joined_text():
+    text = "\n\n".join(CLAUSES)
+    streamed = list(chunk_pages(_pages(CLAUSES), max_tokens=60, overlap_tokens=25, window_chunks=2))
+
+    assert [(chunk['start'], chunk['end']) for chunk in streamed] == \
+        [(chunk['start'], chunk['end']) for chunk in chunk_text(text, max_tokens=60, overlap_tokens=25)]
+    assert all(chunk['text'] == text[chunk['start']:chunk['end']] for chunk in streamed)
+    assert [chunk['last'] for chunk in streamed] == [False] * (len(streamed) - 1) + [True]
+    assert [chunk['index'] for chunk in streamed] == list(range(len(streamed)))
+
+
+def test_merger_collapses_overlap_duplicates_and_renumbers():
+    merger = RequirementMerger(count(8))
+
+    first = merger.add({'requirement_id': 'REQ-001', 'description': 'The supplier shall provide 24/7 support.'})
+    assert first == ('new', {'requirement_id': 'REQ-008', 'description': 'The supplier shall provide 24/7 support.'})
+    assert merger.add({'requirement_id': 'REQ-001', 'description': 'the supplier shall provide 24/7 SUPPORT'}) == \
+        ('duplicate', None)
+
+    richer = {'requirement_id': 'REQ-004', 'description': 'The supplier shall provide 24/7 support',
+              'acceptance_criteria': ['Response within 1 hour']}
+    assert merger.add(richer) == ('replaced', richer)
+    assert richer['requirement_id'] == 'REQ-008'
+
+    assert merger.add({'requirement_id': 'REQ-002', 'title': 'Hosting in the EU'})[1]['requirement_id'] == 'REQ-009'
+    assert merger.add({'requirement_id': 'REQ-003', 'description': ' '}) == ('duplicate', None)
+    assert [requirement['requirement_id'] for requirement in merger.requirements] == ['REQ-008', 'REQ-009']
+    assert merger.requirements[0] is richer
+
+
+def test_sections_follow_headings_across_pages():
+    texts = ["Cover letter for the tender.\n1. Scope\nThe supplier shall host the platform.\n",
+             "It shall run in the EU.\n1.1 Support\nSupport is 24/7.\n",
+             "2. Pricing\nFixed price."]
+    joined = "\n".join(texts)
+    sections = _split(_pages(texts, separator="\n"))
+
+    assert [(section['heading'], section['level'], section['page'], section['end_page']) for section in sections] == [
+        (None, None, 1, 1), ('1. Scope', 1, 1, 2), ('1.1 Support', 2, 2, 2), ('2. Pricing', 1, 3, 3)]
+    for section in sections:
+        assert section['text'] == joined[section['start']:section['end']]
+    assert 'It shall run in the EU.' in sections[1]['text']
+
+
+def test_sections_use_structured_heading_blocks_and_sheet_names():
+    pages = _pages(['Hosting\nEU only', 'a\tb', 'c\td'], separator="\n",
+                   blocks=[[{'type': 'heading', 'text': 'Hosting', 'level': 2},
+                            {'type': 'paragraph', 'text': 'EU only'}], None, None],
+                   sheet=[None, 'Prices', 'Terms'])
+
+    assert [(section['heading'], section['level'], section['text']) for section in _split(pages)] == [
+        ('Hosting', 2, 'Hosting\nEU only'), ('Sheet: Prices', 1, 'a\tb'), ('Sheet: Terms', 1, 'c\td')]
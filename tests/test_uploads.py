@@ -0,0 +1,105 @@
+# tests/test_uploads.py
+import hashlib
+import threading
+
+import pytest
+
+from uploads import ChunkedUploadStore, UploadError
+
+DATA = b'%PDF-1.7 ' + bytes(range(256)) * 4
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChunkedUploadStore(str(tmp_path), max_size=len(DATA) * 2)
+
+
+def _data(store, upload_id):
+    with open(store._data_path(upload_id), 'rb') as f:
+        return f.read()
+
+
+def test_resumed_upload_ignores_resent_bytes(store, tmp_path):
+    upload_id = store.init('spec.pdf', len(DATA), project_id=1, user_id=1)['upload_id']
+
+    store.put_chunk(upload_id, 0, DATA[:100])
+    # The client never saw the acknowledgement and resends an overlapping chunk
+    assert store.put_chunk(upload_id, 50, DATA[50:300])['offset'] == 300
+    assert store.put_chunk(upload_id, 0, DATA[:300])['offset'] == 300
+    resume_at = store.status(upload_id)['offset']
+    store.put_chunk(upload_id, resume_at, DATA[resume_at:])
+
+    info = store.finalize(upload_id, str(tmp_path / 'spec.pdf'))
+    assert (tmp_path / 'spec.pdf').read_bytes() == DATA
+    assert info['file_hash'] == hashlib.sha256(DATA).hexdigest()
+    assert info['mime_type'] == 'application/pdf'
+    with pytest.raises(UploadError):
+        store.status(upload_id)
+
+
+def test_negative_offset_is_rejected(store):
+    upload_id = store.init('spec.pdf', len(DATA), project_id=1, user_id=1)['upload_id']
+    store.put_chunk(upload_id, 0, b'01234')
+
+    with pytest.raises(UploadError):
+        store.put_chunk(upload_id, -1, b'abcdefgh')
+
+    assert _data(store, upload_id) == b'01234'
+    assert store.status(upload_id)['offset'] == 5
+
+
+def test_chunk_ahead_of_offset_is_rejected(store):
+    upload_id = store.init('spec.pdf', len(DATA), project_id=1, user_id=1)['upload_id']
+    store.put_chunk(upload_id, 0, DATA[:10])
+
+    with pytest.raises(UploadError, match='ahead'):
+        store.put_chunk(upload_id, 20, DATA[20:30])
+    with pytest.raises(UploadError, match='total_size'):
+        store.put_chunk(upload_id, 10, DATA[10:] + b'extra')
+    with pytest.raises(UploadError, match='incomplete'):
+        store.finalize(upload_id, '/nonexistent/spec.pdf')
+
+    assert store.status(upload_id)['offset'] == 10
+
+
+def test_concurrent_chunks_are_applied_one_at_a_time(store, tmp_path):
+    upload_id = store.init('spec.pdf', len(DATA), project_id=1, user_id=1)['upload_id']
+    chunks = [(start, DATA[start:start + 64]) for start in range(0, len(DATA), 64)]
+    errors = []
+
+    def client():
+        # Every client retries the whole upload, racing the others
+        for start, chunk in chunks:
+            for _ in range(1000):
+                try:
+                    store.put_chunk(upload_id, start, chunk)
+                    break
+                except Exception as e:
+                    if not (isinstance(e, UploadError) and 'ahead' in str(e)):
+                        errors.append(e)
+                        return
+            else:
+                errors.append(f"offset {start} never became writable")
+                return
+
+    threads = [threading.Thread(target=client) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert store.status(upload_id)['offset'] == len(DATA)
+    assert _data(store, upload_id) == DATA
+    assert store.finalize(upload_id, str(tmp_path / 'spec.pdf'))['file_hash'] == hashlib.sha256(DATA).hexdigest()
+
+
+def test_abort_removes_the_session(store):
+    upload_id = store.init('spec.pdf', len(DATA), project_id=1, user_id=1)['upload_id']
+    store.abort(upload_id)
+    store.abort(upload_id)
+
+    with pytest.raises(UploadError):
+        store.put_chunk(upload_id, 0, DATA[:10])
+    with pytest.raises(UploadError):
+        store.abort('../../etc')
@@ -0,0 +1,115 @@
+# tests/test_vector_index.py
+from datetime import datetime, timedelta
+
+import pytest
+
+import vector_index
+from config import Config
+from models import Document, DocumentChunk, Requirement, db
+from vector_index import VectorIndex, project_index, relevant_passages, search_project
+
+PASSAGES = {
+    'page:1': 'The platform shall be hosted in an EU data centre with nightly backups.',
+    'page:2': 'Invoices are issued monthly and paid within thirty days.',
+    'requirement:1': 'Single sign-on via SAML for all staff accounts.',
+    'requirement:2': 'Backups are kept for ninety days in a second EU data centre.',
+}
+
+
+def _index():
+    index = VectorIndex()
+    for key, text in PASSAGES.items():
+        index.add(key, text, {'text': text})
+    return index
+
+
+def test_search_ranks_by_similarity_and_filters_kinds():
+    index = _index()
+
+    hits = index.search('nightly backups in the EU', k=3)
+    assert [hit['key'] for hit in hits] == ['page:1', 'requirement:2']
+    assert hits[0]['score'] > hits[1]['score'] > 0
+    assert hits[0]['text'] == PASSAGES['page:1']
+    assert [hit['key'] for hit in index.search('nightly backups', kinds=('requirement',))] == ['requirement:2']
+    assert [hit['key'] for hit in index.search('nightly backups in the EU', k=1)] == ['page:1']
+    assert index.search('quantum teleportation') == []
+    assert index.search('') == []
+
+
+def test_rows_can_be_replaced_and_removed():
+    index = _index()
+
+    index.add('page:1', 'Invoices are paid by bank transfer.', {})
+    assert [hit['key'] for hit in index.search('backups', k=5)] == ['requirement:2']
+    assert {hit['key'] for hit in index.search('invoices')} == {'page:1', 'page:2'}
+
+    assert index.remove('page:2') and not index.remove('page:2')
+    assert index.remove('requirement:1')
+    assert len(index) == 2 and 'page:2' not in index
+    # Removed rows are dropped for good once they pile up
+    assert [hit['key'] for hit in index.search('invoices')] == ['page:1']
+    assert index.keys == ['requirement:2', 'page:1']
+
+
+def test_saved_index_loads_back_and_rejects_other_versions(tmp_path, monkeypatch):
+    index = _index()
+    index.remove('page:2')
+    index.state = {'probe': {'pages': [1, 1]}}
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+
+    loaded = VectorIndex.load(path)
+    assert loaded.state == index.state
+    assert len(loaded) == 3 and 'page:2' not in loaded
+    assert loaded.search('EU data centre backups') == index.search('EU data centre backups')
+
+    monkeypatch.setattr(vector_index, 'INDEX_VERSION', vector_index.INDEX_VERSION + 1)
+    assert VectorIndex.load(path) is None
+    assert VectorIndex.load(str(tmp_path / 'missing.npz')) is None
+
+
+@pytest.fixture
+def indexed_project(app, project, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'VECTOR_INDEX_DIR', str(tmp_path / 'indexes'))
+    monkeypatch.setattr(vector_index, '_indexes', {})
+
+    document = Document(filename='rfp.pdf', original_filename='rfp.pdf', file_path='/tmp/rfp.pdf',
+                        project_id=project.id, processing_status='completed')
+    db.session.add(document)
+    db.session.flush()
+    copy = Document(filename='copy.pdf', original_filename='copy.pdf', file_path='/tmp/copy.pdf',
+                    project_id=project.id, processing_status='completed', duplicate_of_id=document.id)
+    db.session.add(copy)
+    for number, text in enumerate([PASSAGES['page:1'], PASSAGES['page:2']], 1):
+        db.session.add(DocumentChunk(document_id=document.id, chunk_type='page', sequence=number - 1,
+                                     page_number=number, start_offset=0, end_offset=len(text), text=text))
+    db.session.add(Requirement(project_id=project.id, requirement_id='REQ-001', title='SSO',
+                               description=PASSAGES['requirement:1'], updated_at=datetime.utcnow()))
+    db.session.commit()
+    return project
+
+
+def test_project_index_follows_the_database(indexed_project):
+    project_id = indexed_project.id
+    index = project_index(project_id)
+    assert project_index(project_id) is index
+
+    hits = search_project(project_id, 'EU data centre backups', k=5)
+    assert [(hit['kind'], hit['page']) for hit in hits] == [('page', 1)]
+    assert hits[0]['document_id'] == min(document.id for document in Document.query)
+    assert relevant_passages(project_id, 'invoices')[0]['text'] == PASSAGES['page:2']
+
+    requirement = Requirement.query.one()
+    requirement.description = 'Backups shall be restorable within four hours from the EU data centre.'
+    requirement.updated_at = datetime.utcnow() + timedelta(seconds=1)
+    DocumentChunk.query.filter_by(page_number=1).delete()
+    db.session.commit()
+
+    hits = search_project(project_id, 'EU data centre backups', k=5)
+    assert [(hit['kind'], hit.get('requirement_id')) for hit in hits] == [('requirement', 'REQ-001')]
+
+    # Another process starts from the saved copy without re-indexing
+    vector_index._indexes.clear()
+    reloaded = project_index(project_id)
+    assert reloaded is not index
+    assert reloaded.search('restorable backups')[0]['requirement_id'] == 'REQ-001'
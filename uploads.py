@@ -0,0 +1,307 @@
+# uploads.py - Streaming and resumable upload handling
+import os
+import json
+import uuid
+import hashlib
+import mimetypes
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Optional, BinaryIO
+
+try:
+    import fcntl
+except ImportError:  # no flock on Windows; writers are then only serialized per process
+    fcntl = None
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1MB read buffer for streaming writes
+PARTIAL_DIR = '.partial'
+
+# Leading-byte signatures used to sniff the real content type while writing
+MAGIC_SIGNATURES = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/x-ole-storage'),  # doc, xls, ppt
+    (b'PK\x03\x04', 'application/zip'),  # docx, xlsx, pptx
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+]
+
+OLE_TYPES = {
+    'doc': 'application/msword',
+    'xls': 'application/vnd.ms-excel',
+    'ppt': 'application/vnd.ms-powerpoint',
+}
+
+OOXML_TYPES = {
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+}
+
+
+class UploadError(Exception):
+    """Raised when an upload stream or session is invalid"""
+    pass
+
+
+def sniff_mime_type(head: bytes, filename: str) -> Optional[str]:
+    """Detect MIME type from the leading bytes, refined by the file extension"""
+
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    guessed = mimetypes.guess_type(filename)[0]
+
+    for signature, mime_type in MAGIC_SIGNATURES:
+        if head.startswith(signature):
+            # Container formats need the extension to tell the Office types apart
+            if mime_type == 'application/zip':
+                return OOXML_TYPES.get(extension, mime_type)
+            if mime_type == 'application/x-ole-storage':
+                return OLE_TYPES.get(extension, mime_type)
+            return mime_type
+
+    if extension == 'txt' and b'\x00' not in head:
+        return 'text/plain'
+
+    return guessed
+
+
+def save_upload_stream(stream: BinaryIO, file_path: str, filename: str,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       max_size: Optional[int] = None) -> Dict[str, Any]:
+    """Write a stream to disk while hashing, sizing and sniffing it in one pass"""
+
+    hash_sha256 = hashlib.sha256()
+    file_size = 0
+    head = b''
+
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+
+    try:
+        with open(file_path, 'wb') as f:
+            for chunk in iter(lambda: stream.read(chunk_size), b''):
+                if not head:
+                    head = chunk[:64]
+                file_size += len(chunk)
+                if max_size is not None and file_size > max_size:
+                    raise UploadError(f'Upload exceeds maximum size of {max_size} bytes')
+                hash_sha256.update(chunk)
+                f.write(chunk)
+    except Exception:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+
+    return {
+        'file_path': file_path,
+        'file_hash': hash_sha256.hexdigest(),
+        'file_size': file_size,
+        'mime_type': sniff_mime_type(head, filename)
+    }
+
+
+class ChunkedUploadStore:
+    """Disk-backed upload sessions supporting init / put-chunk / finalize
+
+    Chunks must be appended in order; a client that loses its connection asks
+    for the current offset and resumes from there. Session metadata lives next
+    to the partial data so any worker process can continue an upload.
+    """
+
+    # Running SHA-256 state per session; lets finalize skip re-reading the file
+    # when every chunk of an upload was received by this process.
+    _hashers: Dict[str, Any] = {}
+    _session_locks: Dict[str, threading.Lock] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, upload_folder: str, max_size: Optional[int] = None):
+        self.root = os.path.join(upload_folder, PARTIAL_DIR)
+        self.max_size = max_size
+
+    def _session_dir(self, upload_id: str) -> str:
+        # upload_id is always a uuid4 we issued; reject anything else
+        try:
+            uuid.UUID(upload_id)
+        except ValueError:
+            raise UploadError(f'Invalid upload id: {upload_id}')
+        return os.path.join(self.root, upload_id)
+
+    def _data_path(self, upload_id: str) -> str:
+        return os.path.join(self._session_dir(upload_id), 'data')
+
+    def _read_meta(self, upload_id: str) -> Dict[str, Any]:
+        meta_path = os.path.join(self._session_dir(upload_id), 'meta.json')
+        if not os.path.exists(meta_path):
+            raise UploadError(f'Upload {upload_id} not found')
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self, upload_id: str, meta: Dict[str, Any]):
+        session_dir = self._session_dir(upload_id)
+        tmp_path = os.path.join(session_dir, 'meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(session_dir, 'meta.json'))
+
+    @contextmanager
+    def _locked(self, upload_id: str):
+        """Hold a session exclusively: chunk writes read-modify-write its metadata"""
+
+        session_dir = self._session_dir(upload_id)
+        with self._lock:
+            lock = self._session_locks.setdefault(upload_id, threading.Lock())
+        with lock:
+            if not os.path.isdir(session_dir):
+                raise UploadError(f'Upload {upload_id} not found')
+            if fcntl is None:
+                yield
+                return
+            # Other worker processes may be serving the same session
+            with open(os.path.join(session_dir, 'lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def init(self, filename: str, total_size: int, project_id: int, user_id: int) -> Dict[str, Any]:
+        """Open a new upload session"""
+
+        # JSON bodies can carry strings, floats or booleans here
+        if not isinstance(total_size, int) or isinstance(total_size, bool) or total_size < 0:
+            raise UploadError('total_size must be a non-negative integer')
+        if self.max_size is not None and total_size > self.max_size:
+            raise UploadError(f'Upload exceeds maximum size of {self.max_size} bytes')
+
+        upload_id = str(uuid.uuid4())
+        os.makedirs(self._session_dir(upload_id), exist_ok=True)
+        open(self._data_path(upload_id), 'wb').close()
+
+        meta = {
+            'upload_id': upload_id,
+            'filename': filename,
+            'total_size': total_size,
+            'project_id': project_id,
+            'user_id': user_id,
+            'offset': 0,
+            'mime_type': None,
+            'created_at': datetime.utcnow().isoformat()
+        }
+        self._write_meta(upload_id, meta)
+
+        with self._lock:
+            self._hashers[upload_id] = (0, hashlib.sha256())
+
+        return meta
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        """Return session metadata including the offset to resume from"""
+        return self._read_meta(upload_id)
+
+    def put_chunk(self, upload_id: str, offset: int, data: bytes) -> Dict[str, Any]:
+        """Append a chunk at the given offset
+
+        Re-sending bytes that were already stored is accepted and ignored so a
+        client that never saw the previous acknowledgement can safely retry.
+        Concurrent chunks for one session are applied one at a time.
+        """
+
+        if not isinstance(offset, int) or offset < 0:
+            raise UploadError('Chunk offset must be a non-negative integer')
+
+        with self._locked(upload_id):
+            return self._put_chunk(upload_id, offset, data)
+
+    def _put_chunk(self, upload_id: str, offset: int, data: bytes) -> Dict[str, Any]:
+        meta = self._read_meta(upload_id)
+        current = meta['offset']
+
+        if offset > current:
+            raise UploadError(f'Chunk offset {offset} is ahead of received offset {current}')
+
+        # Drop the prefix we already have from a retried chunk
+        skip = current - offset
+        data = data[skip:]
+        if not data:
+            return meta
+
+        if current + len(data) > meta['total_size']:
+            raise UploadError('Chunk extends past declared total_size')
+
+        with open(self._data_path(upload_id), 'r+b') as f:
+            f.seek(current)
+            f.write(data)
+
+        if current == 0:
+            meta['mime_type'] = sniff_mime_type(data[:64], meta['filename'])
+
+        with self._lock:
+            hasher_state = self._hashers.get(upload_id)
+            if hasher_state and hasher_state[0] == current:
+                hasher_state[1].update(data)
+                self._hashers[upload_id] = (current + len(data), hasher_state[1])
+            else:
+                self._hashers.pop(upload_id, None)
+
+        meta['offset'] = current + len(data)
+        self._write_meta(upload_id, meta)
+        return meta
+
+    def finalize(self, upload_id: str, file_path: str) -> Dict[str, Any]:
+        """Move a complete upload into place and return its file metadata"""
+
+        with self._locked(upload_id):
+            return self._finalize(upload_id, file_path)
+
+    def _finalize(self, upload_id: str, file_path: str) -> Dict[str, Any]:
+        meta = self._read_meta(upload_id)
+        if meta['offset'] != meta['total_size']:
+            raise UploadError(f"Upload incomplete: {meta['offset']} of {meta['total_size']} bytes received")
+
+        with self._lock:
+            hasher_state = self._hashers.pop(upload_id, None)
+
+        if hasher_state and hasher_state[0] == meta['total_size']:
+            file_hash = hasher_state[1].hexdigest()
+        else:
+            # Chunks were spread across processes; hash once from disk
+            hash_sha256 = hashlib.sha256()
+            with open(self._data_path(upload_id), 'rb') as f:
+                for chunk in iter(lambda: f.read(DEFAULT_CHUNK_SIZE), b''):
+                    hash_sha256.update(chunk)
+            file_hash = hash_sha256.hexdigest()
+
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        os.replace(self._data_path(upload_id), file_path)
+        self._remove_session(upload_id)
+
+        return {
+            'file_path': file_path,
+            'file_hash': file_hash,
+            'file_size': meta['total_size'],
+            'mime_type': meta['mime_type'] or mimetypes.guess_type(meta['filename'])[0],
+            'filename': meta['filename'],
+            'project_id': meta['project_id'],
+            'user_id': meta['user_id']
+        }
+
+    def abort(self, upload_id: str):
+        """Discard an upload session and its partial data"""
+
+        self._session_dir(upload_id)  # rejects ids we never issued
+        try:
+            with self._locked(upload_id):
+                self._remove_session(upload_id)
+        except UploadError:
+            pass  # already gone
+
+    def _remove_session(self, upload_id: str):
+        session_dir = self._session_dir(upload_id)
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+            self._session_locks.pop(upload_id, None)
+        if os.path.isdir(session_dir):
+            for name in os.listdir(session_dir):
+                os.remove(os.path.join(session_dir, name))
+            os.rmdir(session_dir)
@@ -0,0 +1,451 @@
+# vector_index.py - local hashed TF-IDF search over document pages and requirements, kept per project
+import json
+import math
+import os
+import re
+import threading
+import uuid
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import func
+
+try:
+    import numpy as np
+except ImportError:  # search is unavailable without it
+    np = None
+
+from agents.conflict_blocking import STOPWORDS, SUFFIXES
+from agents.requirement_dedup import requirement_text
+from config import Config
+from models import db, Document, DocumentChunk, Requirement
+
+# Bump when tokenizing or the file layout changes; older index files are rebuilt
+INDEX_VERSION = 1
+# Hashed feature space for words and word pairs; collisions are rare at 2**20
+DIMENSIONS = 1 << 20
+# Rows fetched per query while indexing
+FETCH_BATCH = 500
+
+KINDS = ('page', 'requirement')
+WORD = re.compile(r'[a-z0-9]+')
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _tokens(text: str) -> List[str]:
+    tokens = []
+    for word in WORD.findall((text or '').lower()):
+        if len(word) < 2 or word in STOPWORDS:
+            continue
+        # Same crude suffix folding as conflict blocking
+        for suffix in SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 4 and not word.endswith('ss'):
+                word = word[:-len(suffix)]
+                break
+        tokens.append(word)
+    return tokens
+
+
+def features(text: str) -> Dict[int, float]:
+    """Hashed words and adjacent word pairs of a text, with log-scaled counts"""
+
+    tokens = _tokens(text)
+    counts = Counter(tokens)
+    counts.update(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+    hashed: Dict[int, float] = {}
+    for term, count in counts.items():
+        feature = zlib.crc32(term.encode('utf-8')) & (DIMENSIONS - 1)
+        hashed[feature] = hashed.get(feature, 0.0) + 1.0 + math.log(count)
+    return hashed
+
+
+def snippet(text: str, query: str, width: int = 240) -> str:
+    """A window of ``text`` around the first query word it contains"""
+
+    text = ' '.join((text or '').split())
+    lowered = text.lower()
+    positions = [lowered.find(word) for word in _tokens(query)]
+    positions = [position for position in positions if position >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    excerpt = text[start:start + width]
+    return ('...' if start else '') + excerpt + ('...' if start + width < len(text) else '')
+
+
+class VectorIndex:
+    """Sparse TF-IDF vectors searched by cosine similarity
+
+    Vectors are stored as postings (feature, row, term weight) and scored
+    with NumPy: a query only touches the postings of its own features, so
+    a search over tens of thousands of passages takes milliseconds. Term
+    weights do not depend on the rest of the index, which makes adding and
+    removing rows cheap; IDF and row norms are recomputed in one vectorized
+    pass the first time the index is searched after a change.
+    """
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.meta: List[Optional[Dict[str, Any]]] = []
+        self.rows: Dict[str, int] = {}
+        # Sync markers of the database state the index reflects
+        self.state: Dict[str, Any] = {}
+        self.lock = threading.RLock()
+
+        self._features = np.zeros(0, dtype=np.int32)
+        self._rows = np.zeros(0, dtype=np.int32)
+        self._weights = np.zeros(0, dtype=np.float32)
+        self._pending: List[tuple] = []
+        self._prepared: Optional[Dict[str, Any]] = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.rows
+
+    def add(self, key: str, text: str, meta: Dict[str, Any]):
+        """Add a row, replacing any earlier row under the same key"""
+
+        vector = features(text)
+        with self.lock:
+            self.remove(key)
+            row = len(self.keys)
+            self.keys.append(key)
+            self.meta.append(meta)
+            self.rows[key] = row
+            if vector:
+                self._pending.append((list(vector), row, list(vector.values())))
+            self._prepared = None
+
+    def remove(self, key: str) -> bool:
+        with self.lock:
+            row = self.rows.pop(key, None)
+            if row is None:
+                return False
+            # Postings of removed rows are dropped on the next prepare
+            self.meta[row] = None
+            self._prepared = None
+            return True
+
+    def _prepare(self) -> Dict[str, Any]:
+        with self.lock:
+            if self._prepared is not None:
+                return self._prepared
+
+            if self._pending:
+                self._features = np.concatenate(
+                    [self._features] + [np.array(feats, dtype=np.int32) for feats, _, _ in self._pending])
+                self._rows = np.concatenate(
+                    [self._rows] + [np.full(len(feats), row, dtype=np.int32) for feats, row, _ in self._pending])
+                self._weights = np.concatenate(
+                    [self._weights] + [np.array(weights, dtype=np.float32) for _, _, weights in self._pending])
+                self._pending = []
+
+            alive = np.array([meta is not None for meta in self.meta], dtype=bool)
+            keep = alive[self._rows] if len(self._rows) else np.zeros(0, dtype=bool)
+            if not keep.all():
+                self._features, self._rows, self._weights = self._features[keep], self._rows[keep], self._weights[keep]
+            if len(self.keys) - len(self.rows) > len(self.keys) // 4:
+                self._renumber(alive)
+                alive = np.ones(len(self.keys), dtype=bool)
+
+            order = np.argsort(self._features, kind='stable')
+            self._features, self._rows, self._weights = self._features[order], self._rows[order], self._weights[order]
+
+            # Postings are sorted by feature, so each feature's postings are one slice
+            starts = np.flatnonzero(np.diff(self._features, prepend=-1))
+            unique = self._features[starts]
+            counts = np.diff(starts, append=len(self._features))
+            idf = (np.log((1.0 + len(self.rows)) / (1.0 + counts)) + 1.0).astype(np.float32)
+            weighted = self._weights * np.repeat(idf, counts)
+            norms = np.sqrt(np.bincount(self._rows, weights=weighted * weighted, minlength=len(self.keys)))
+
+            kinds = np.array([key.split(':', 1)[0] for key in self.keys]) if self.keys else np.zeros(0, dtype=str)
+            self._prepared = {
+                'features': unique, 'starts': starts, 'counts': counts, 'idf': idf,
+                'rows': self._rows, 'weights': weighted, 'norms': norms, 'kinds': kinds, 'alive': alive
+            }
+            return self._prepared
+
+    def _renumber(self, alive: 'np.ndarray'):
+        """Drop removed rows for good once they make up a quarter of the index"""
+
+        position = np.cumsum(alive) - 1
+        self._rows = position[self._rows].astype(np.int32)
+        self.keys = [key for key, live in zip(self.keys, alive) if live]
+        self.meta = [meta for meta in self.meta if meta is not None]
+        self.rows = {key: row for row, key in enumerate(self.keys)}
+
+    def search(self, query: str, k: int = 10, kinds: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Up to ``k`` rows most similar to ``query``, best first, with their scores"""
+
+        vector = features(query)
+        if not vector or k <= 0:
+            return []
+
+        with self.lock:
+            prepared = self._prepare()
+            unique = prepared['features']
+            wanted = np.fromiter(vector, dtype=np.int64, count=len(vector))
+            positions = np.searchsorted(unique, wanted)
+            found = positions < len(unique)
+            found[found] = unique[positions[found]] == wanted[found]
+            if not found.any():
+                return []
+
+            query_weights = np.fromiter(vector.values(), dtype=np.float32, count=len(vector))[found]
+            positions = positions[found]
+            # Features the index has never seen cannot match anything, so they are left out of the norm too
+            query_weights = query_weights * prepared['idf'][positions]
+            query_norm = float(np.sqrt(np.dot(query_weights, query_weights)))
+
+            slices = [np.arange(start, start + count) for start, count in
+                      zip(prepared['starts'][positions], prepared['counts'][positions])]
+            postings = np.concatenate(slices)
+            contributions = prepared['weights'][postings] * np.repeat(query_weights, prepared['counts'][positions])
+            scores = np.bincount(prepared['rows'][postings], weights=contributions, minlength=len(self.keys))
+
+            norms = prepared['norms']
+            scores = np.divide(scores, norms * query_norm, out=np.zeros_like(scores), where=norms > 0)
+            scores[~prepared['alive']] = 0
+            if kinds:
+                scores[~np.isin(prepared['kinds'], list(kinds))] = 0
+
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+            return [dict(self.meta[row], key=self.keys[row], score=round(float(scores[row]), 4))
+                    for row in candidates if self.meta[row] is not None]
+
+    def save(self, path: str):
+        """Write the index atomically to ``path``"""
+
+        with self.lock:
+            self._prepare()
+            header = {'version': INDEX_VERSION, 'dimensions': DIMENSIONS,
+                      'keys': self.keys, 'meta': self.meta, 'state': self.state}
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    np.savez(f, header=np.array(json.dumps(header)), features=self._features,
+                             rows=self._rows, weights=self._weights)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+
+    @classmethod
+    def load(cls, path: str) -> Optional['VectorIndex']:
+        """Index saved at ``path``, or None if it is missing, unreadable or outdated"""
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                header = json.loads(str(data['header']))
+                if header.get('version') != INDEX_VERSION or header.get('dimensions') != DIMENSIONS:
+                    return None
+                index = cls()
+                index._features = data['features'].astype(np.int32)
+                index._rows = data['rows'].astype(np.int32)
+                index._weights = data['weights'].astype(np.float32)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        index.keys = header['keys']
+        index.meta = header['meta']
+        index.state = header['state']
+        index.rows = {key: row for row, key in enumerate(index.keys) if index.meta[row] is not None}
+        return index
+
+
+class _CachedIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index: Optional[VectorIndex] = None
+        self.mtime: Optional[float] = None
+
+
+_indexes: Dict[int, _CachedIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def index_path(project_id: int) -> str:
+    return os.path.join(Config.VECTOR_INDEX_DIR, f"project_{project_id}.npz")
+
+
+def _content_documents(project_id: int) -> Dict[int, int]:
+    """Document whose chunks hold the text, mapped to the project document using it"""
+
+    documents = {}
+    for document_id, duplicate_of_id in db.session.query(Document.id, Document.duplicate_of_id) \
+            .filter(Document.project_id == project_id).order_by(Document.id):
+        documents.setdefault(duplicate_of_id or document_id, document_id)
+    return documents
+
+
+def _probe(project_id: int, documents: Dict[int, int]) -> Dict[str, Any]:
+    """Cheap summary of the project's pages and requirements that changes whenever they do
+
+    Chunks are only ever inserted or deleted, so their count and highest id
+    cover every change; requirements are edited in place, so their latest
+    ``updated_at`` is used instead.
+    """
+
+    pages = [0, None]
+    if documents:
+        pages = list(db.session.query(func.count(DocumentChunk.id), func.max(DocumentChunk.id)).filter(
+            DocumentChunk.document_id.in_(list(documents)), DocumentChunk.chunk_type == 'page').one())
+    count, updated_at = db.session.query(func.count(Requirement.id), func.max(Requirement.updated_at)) \
+        .filter(Requirement.project_id == project_id).one()
+    return {
+        'documents': sorted(documents.items()),
+        'pages': pages,
+        'requirements': [count, updated_at.isoformat() if updated_at else None]
+    }
+
+
+def _indexed_ids(index: VectorIndex, kind: str) -> set:
+    prefix = f"{kind}:"
+    return {int(key[len(prefix):]) for key in index.rows if key.startswith(prefix)}
+
+
+def _batches(ids: Iterable[int]) -> Iterable[List[int]]:
+    ids = sorted(ids)
+    for start in range(0, len(ids), FETCH_BATCH):
+        yield ids[start:start + FETCH_BATCH]
+
+
+def _sync_pages(index: VectorIndex, documents: Dict[int, int]) -> int:
+    current = set()
+    if documents:
+        current = {chunk_id for (chunk_id,) in db.session.query(DocumentChunk.id).filter(
+            DocumentChunk.document_id.in_(list(documents)), DocumentChunk.chunk_type == 'page')}
+
+    indexed = _indexed_ids(index, 'page')
+    for chunk_id in indexed - current:
+        index.remove(f"page:{chunk_id}")
+
+    for batch in _batches(current - indexed):
+        for chunk in DocumentChunk.query.options(db.undefer(DocumentChunk.text)) \
+                .filter(DocumentChunk.id.in_(batch)):
+            index.add(f"page:{chunk.id}", f"{chunk.heading or ''}\n{chunk.text or ''}", {
+                'kind': 'page',
+                'chunk_id': chunk.id,
+                'document_id': documents[chunk.document_id],
+                'page': chunk.page_number,
+                'heading': chunk.heading
+            })
+    return len(current ^ indexed)
+
+
+def _sync_requirements(index: VectorIndex, project_id: int, since: Optional[str]) -> int:
+    current = {row_id for (row_id,) in db.session.query(Requirement.id).filter(Requirement.project_id == project_id)}
+    indexed = _indexed_ids(index, 'requirement')
+    for row_id in indexed - current:
+        index.remove(f"requirement:{row_id}")
+
+    columns = (Requirement.id, Requirement.requirement_id, Requirement.title, Requirement.description,
+               Requirement.requirement_type, Requirement.priority, Requirement.source_document_id,
+               Requirement.duplicate_of_id)
+
+    def add(row):
+        index.add(f"requirement:{row.id}", requirement_text(row.title, row.description), {
+            'kind': 'requirement',
+            'id': row.id,
+            'requirement_id': row.requirement_id,
+            'title': row.title,
+            'type': row.requirement_type,
+            'priority': row.priority,
+            'document_id': row.source_document_id,
+            'duplicate_of_id': row.duplicate_of_id
+        })
+
+    # Rows edited since the last sync, then any new rows carrying older timestamps
+    changed = 0
+    seen = set()
+    if since is not None and indexed:
+        for row in db.session.query(*columns).filter(Requirement.project_id == project_id,
+                                                     Requirement.updated_at >= datetime.fromisoformat(since)) \
+                .yield_per(FETCH_BATCH):
+            add(row)
+            seen.add(row.id)
+        changed += len(seen)
+
+    for batch in _batches(current - indexed - seen):
+        for row in db.session.query(*columns).filter(Requirement.id.in_(batch)):
+            add(row)
+            changed += 1
+    return changed + len(indexed - current)
+
+
+def project_index(project_id: int) -> VectorIndex:
+    """Search index of a project, brought up to date with the database
+
+    The index is kept in memory and saved under ``VECTOR_INDEX_DIR``, so
+    other processes and restarts start from the saved copy. A probe query
+    tells whether pages or requirements changed; only the rows that did are
+    re-indexed. Raises RuntimeError when NumPy is not installed.
+    """
+
+    if np is None:
+        raise RuntimeError('Vector search needs numpy')
+
+    with _indexes_lock:
+        cached = _indexes.setdefault(project_id, _CachedIndex())
+
+    with cached.lock:
+        documents = _content_documents(project_id)
+        probe = _probe(project_id, documents)
+        if cached.index is not None and cached.index.state.get('probe') == probe:
+            return cached.index
+
+        path = index_path(project_id)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        index = cached.index
+        if mtime is not None and (index is None or cached.mtime is None or mtime > cached.mtime):
+            # Another process may have indexed the changes already
+            index = VectorIndex.load(path) or index
+        if index is None:
+            index = VectorIndex()
+
+        previous = index.state.get('probe') or {}
+        changed = 0
+        if previous.get('pages') != probe['pages'] or previous.get('documents') != probe['documents']:
+            changed += _sync_pages(index, documents)
+        if previous.get('requirements') != probe['requirements']:
+            changed += _sync_requirements(index, project_id, (previous.get('requirements') or [None, None])[1])
+        index.state['probe'] = probe
+
+        if changed or mtime is None:
+            index.save(path)
+            mtime = os.path.getmtime(path)
+        cached.index, cached.mtime = index, mtime
+        return index
+
+
+def search_project(project_id: int, query: str, k: int = None,
+                   kinds: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Pages and requirements of a project most similar to ``query``"""
+
+    return project_index(project_id).search(query, k or Config.VECTOR_SEARCH_K, kinds)
+
+
+def relevant_passages(project_id: int, query: str, k: int = None) -> List[Dict[str, Any]]:
+    """Document pages most similar to ``query``, with their text"""
+
+    hits = search_project(project_id, query, k, kinds=('page',))
+    texts = dict(db.session.query(DocumentChunk.id, DocumentChunk.text)
+                 .filter(DocumentChunk.id.in_([hit['chunk_id'] for hit in hits])))
+    return [dict(hit, text=texts[hit['chunk_id']]) for hit in hits if texts.get(hit['chunk_id'])]